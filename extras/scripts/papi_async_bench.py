@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Measure request throughput of the asyncio vpp_papi client.
+
+Connects to a running VPP and sends --requests control_ping requests,
+keeping up to N of them outstanding for each concurrency level given
+with -c. Reports the median requests per second of --repeat runs for
+each level, and their range: single runs vary by more than 20%.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from vpp_papi.vpp_papi_async import VPPApiClient
+
+
+async def run(vpp, requests, concurrency):
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < requests:
+            sent += 1
+            r = await vpp.api.control_ping()
+            assert r.retval == 0
+
+    t = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - t)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default="/run/vpp/api.sock")
+    parser.add_argument("-n", "--requests", type=int, default=100000)
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 64, 512],
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    args = parser.parse_args()
+
+    vpp = VPPApiClient(server_address=args.socket, max_in_flight=args.max_in_flight)
+    if await vpp.connect("papi-async-bench", asyncio.Queue()) != 0:
+        print("Cannot connect to", args.socket, file=sys.stderr)
+        return 1
+    try:
+        for c in args.concurrency:
+            rates = [await run(vpp, args.requests, c) for _ in range(args.repeat)]
+            print(
+                "concurrency %-5d %10.0f requests/s (%.0f-%.0f)"
+                % (c, statistics.median(rates), min(rates), max(rates))
+            )
+    finally:
+        await vpp.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Compare programming routes one call at a time and in vpp_papi batches.
+
+Connects to a running VPP and adds --routes IPv4 drop routes to a table
+of their own, --table, first with one ip_route_add_del call per route,
+then with VPPApiClient.batch() for each window given with -w, and with
+add_columns(). The routes are removed again after each run. Reports the
+time per route added.
+"""
+
+import argparse
+import ipaddress
+import sys
+import time
+
+from vpp_papi import VPPApiClient
+
+# FIB_API_PATH_TYPE_DROP, a path needing no interface or next hop
+DROP = 2
+
+NO_LABELS = [{}] * 16
+
+
+def prefixes(n):
+    base = int(ipaddress.IPv4Address("10.0.0.0"))
+    return [ipaddress.IPv4Network((base + i, 32)) for i in range(n)]
+
+
+def route(table, prefix):
+    return {
+        "table_id": table,
+        "prefix": prefix,
+        "n_paths": 1,
+        "paths": [{"sw_if_index": 0xFFFFFFFF, "type": DROP, "label_stack": NO_LABELS}],
+    }
+
+
+def single(vpp, table, nets, window):
+    for p in nets:
+        r = vpp.api.ip_route_add_del(is_add=True, route=route(table, p))
+        assert r.retval == 0
+
+
+def batch(vpp, table, nets, window):
+    with vpp.batch(window=window) as b:
+        for p in nets:
+            b.api.ip_route_add_del(is_add=True, route=route(table, p))
+    assert not any(b.retvals)
+
+
+def columns(vpp, table, nets, window):
+    with vpp.batch(window=window) as b:
+        b.add_columns(
+            "ip_route_add_del",
+            {"route.prefix": nets},
+            is_add=True,
+            route=route(table, nets[0]),
+        )
+    assert not any(b.retvals)
+
+
+def timed(vpp, table, nets, add, window):
+    t = time.perf_counter()
+    add(vpp, table, nets, window)
+    elapsed = time.perf_counter() - t
+    with vpp.batch() as b:
+        for p in nets:
+            b.api.ip_route_add_del(is_add=False, route=route(table, p))
+    return elapsed / len(nets) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default="/run/vpp/api.sock")
+    parser.add_argument("-n", "--routes", type=int, default=20000)
+    parser.add_argument("-w", "--windows", type=int, nargs="+", default=[16, 256])
+    parser.add_argument("--table", type=int, default=1000)
+    parser.add_argument("--apidir", help="API definitions, if not installed")
+    args = parser.parse_args()
+
+    vpp = VPPApiClient(server_address=args.socket, apidir=args.apidir)
+    if vpp.connect("papi-batch-bench") != 0:
+        print("Cannot connect to", args.socket, file=sys.stderr)
+        return 1
+    table = {"table_id": args.table, "is_ip6": False}
+    vpp.api.ip_table_add_del(is_add=True, table=table)
+    nets = prefixes(args.routes)
+    try:
+        us = timed(vpp, args.table, nets, single, None)
+        print("%-20s %8.1f us/route" % ("one call at a time", us))
+        for window in args.windows:
+            for name, add in (("batch", batch), ("columns", columns)):
+                us = timed(vpp, args.table, nets, add, window)
+                print("%-20s %8.1f us/route" % ("%s, window %d" % (name, window), us))
+    finally:
+        vpp.api.ip_table_add_del(is_add=False, table=table)
+        vpp.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Compare generic and compiled vpp_papi pack/unpack codecs.
+
+Messages are built from the API definitions in --apidir and packed and
+unpacked --count times, first with the generic codecs, then after
+VPPType.compiled(). Nothing is connected to VPP. Reported times are per
+call.
+"""
+
+import argparse
+import ipaddress
+import sys
+import time
+
+from vpp_papi.vpp_papi import VPPApiJSONFiles
+
+
+def route_add_del():
+    return {
+        "is_add": True,
+        "is_multipath": False,
+        "route": {
+            "table_id": 0,
+            "prefix": ipaddress.IPv4Network("10.0.0.0/24"),
+            "n_paths": 1,
+            "paths": [
+                {
+                    "sw_if_index": 1,
+                    "proto": 0,
+                    "nh": {"address": {"ip4": b"\x0a\0\0\1"}},
+                    "label_stack": [{}] * 16,
+                }
+            ],
+        },
+    }
+
+
+def acl_add_replace(rules=10):
+    rule = {
+        "is_permit": 1,
+        "src_prefix": ipaddress.IPv4Network("10.0.0.0/8"),
+        "dst_prefix": ipaddress.IPv4Network("192.168.0.0/16"),
+        "proto": 6,
+        "srcport_or_icmptype_first": 0,
+        "srcport_or_icmptype_last": 65535,
+        "dstport_or_icmpcode_first": 80,
+        "dstport_or_icmpcode_last": 80,
+    }
+    return {
+        "acl_index": 0xFFFFFFFF,
+        "tag": "bench",
+        "count": rules,
+        "r": [rule] * rules,
+    }
+
+
+MESSAGES = {
+    "ip_route_add_del": route_add_del,
+    "acl_add_replace": acl_add_replace,
+}
+
+
+def timed(f, n):
+    t = time.perf_counter()
+    for _ in range(n):
+        f()
+    return (time.perf_counter() - t) / n * 1e6
+
+
+def measure(msg, data, n):
+    b = msg.pack(data)
+    return timed(lambda: msg.pack(data), n), timed(lambda: msg.unpack(b), n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apidir", default="/usr/share/vpp/api")
+    parser.add_argument("-n", "--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    _, messages, _ = VPPApiJSONFiles.load_api(apidir=args.apidir)
+    print("%-20s %-7s %10s %10s" % ("message", "", "generic", "compiled"))
+    for name, make in MESSAGES.items():
+        msg = messages.get(name)
+        if msg is None:
+            print("%-20s not found" % name)
+            continue
+        data = make()
+        generic = measure(msg, data, args.count)
+        compiled = measure(msg.compiled(), data, args.count)
+        for i, op in enumerate(("pack", "unpack")):
+            print("%-20s %-7s %8.1fus %8.1fus" % (name, op, generic[i], compiled[i]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Measure the request latency of the vpp_papi socket transport.
+
+Connects to a running VPP and sends --requests control_ping requests one
+at a time, each waiting for its reply, so that every request makes a
+round trip through the message thread and the reply queue. Reports the
+median, 99th percentile and maximum round trip time, and the time taken
+by disconnect() to stop the message thread.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from vpp_papi import VPPApiClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default="/run/vpp/api.sock")
+    parser.add_argument("-n", "--requests", type=int, default=100000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument(
+        "--bootstrap",
+        action="store_true",
+        help="load API definitions from VPP rather than from JSON files",
+    )
+    parser.add_argument("--apidir", help="API definitions, if not installed")
+    args = parser.parse_args()
+
+    vpp = VPPApiClient(
+        server_address=args.socket, bootstrapapi=args.bootstrap, apidir=args.apidir
+    )
+    if vpp.connect("papi-latency-bench") != 0:
+        print("Cannot connect to", args.socket, file=sys.stderr)
+        return 1
+    ping = vpp.api.control_ping
+    for _ in range(args.warmup):
+        ping()
+    rtts = []
+    for _ in range(args.requests):
+        t = time.perf_counter()
+        r = ping()
+        rtts.append(time.perf_counter() - t)
+        assert r.retval == 0
+    t = time.perf_counter()
+    vpp.disconnect()
+    stop = time.perf_counter() - t
+
+    rtts.sort()
+    p99 = rtts[min(len(rtts) - 1, int(len(rtts) * 0.99))]
+    print("%-12s %8.1f us" % ("median", statistics.median(rtts) * 1e6))
+    print("%-12s %8.1f us" % ("99th", p99 * 1e6))
+    print("%-12s %8.1f us" % ("max", rtts[-1] * 1e6))
+    print("%-12s %8.1f us" % ("disconnect", stop * 1e6))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
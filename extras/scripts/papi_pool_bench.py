@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Measure aggregate request throughput of a vpp_papi connection pool.
+
+For each pool size given with -s, connects that many API sockets to a
+running VPP and sends --requests control_ping requests from as many
+threads. Reports requests per second for each pool size.
+"""
+
+import argparse
+import concurrent.futures
+import sys
+import time
+
+from vpp_papi import VPPApiClientPool
+
+
+def run(size, args):
+    pool = VPPApiClientPool(
+        size=size, server_address=args.socket, bootstrapapi=args.bootstrap
+    )
+    pool.connect("papi-pool-bench")
+    per_thread = args.requests // size
+
+    def worker():
+        for _ in range(per_thread):
+            r = pool.api.control_ping()
+            assert r.retval == 0
+
+    try:
+        t = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=size) as executor:
+            for f in [executor.submit(worker) for _ in range(size)]:
+                f.result()
+        rate = per_thread * size / (time.perf_counter() - t)
+    finally:
+        pool.disconnect()
+    return rate, pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default="/run/vpp/api.sock")
+    parser.add_argument("-n", "--requests", type=int, default=100000)
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument(
+        "--bootstrap",
+        action="store_true",
+        help="load API definitions from VPP rather than from JSON files",
+    )
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rate, pool = run(size, args)
+        print("connections %-3d %10.0f requests/s" % (size, rate))
+        if args.stats:
+            print(pool.get_stats())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
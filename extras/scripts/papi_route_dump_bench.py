@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Measure packing and unpacking of a large IP route table with vpp_papi.
+
+A table of --routes ip_route_details messages, with a mix of IPv4 and
+IPv6 prefixes and one or two paths each, is built from the API
+definitions in --apidir. Nothing is connected to VPP. Reported times
+are per route.
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+import time
+
+from vpp_papi.vpp_papi import VPPApiJSONFiles
+from vpp_papi.vpp_serializer import vpp_get_type
+
+NO_LABELS = [{}] * 16
+
+
+def make_prefixes(n):
+    rnd = random.Random(1)
+    prefixes = []
+    for i in range(n):
+        if i % 4 == 3:
+            a = ipaddress.IPv6Address(rnd.getrandbits(64) << 64)
+            prefixes.append(ipaddress.IPv6Network((a, 64)))
+        else:
+            a = ipaddress.IPv4Address(rnd.getrandbits(24) << 8)
+            prefixes.append(ipaddress.IPv4Network((a, 24)))
+    return prefixes
+
+
+def make_route(prefix, i):
+    paths = [
+        {
+            "sw_if_index": 1 + i % 2,
+            "proto": 0,
+            "nh": {"address": {"ip4": b"\x0a\0\0\1"}},
+            "label_stack": NO_LABELS,
+        }
+        for i in range(1 + i % 2)
+    ]
+    return {"table_id": 0, "prefix": prefix, "n_paths": len(paths), "paths": paths}
+
+
+def timed(f, n):
+    t = time.perf_counter()
+    f()
+    return (time.perf_counter() - t) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apidir", default="/usr/share/vpp/api")
+    parser.add_argument("-n", "--routes", type=int, default=1000000)
+    parser.add_argument(
+        "--compile", action="store_true", help="use compiled pack/unpack codecs"
+    )
+    args = parser.parse_args()
+
+    _, messages, _ = VPPApiJSONFiles.load_api(apidir=args.apidir)
+    details = messages["ip_route_details"]
+    if args.compile:
+        details = details.compiled()
+    n = args.routes
+    prefixes = make_prefixes(n)
+    routes = [make_route(p, i) for i, p in enumerate(prefixes)]
+    prefix = vpp_get_type("vl_api_prefix_t")
+
+    def pack_prefixes():
+        return [prefix.pack(p) for p in prefixes]
+
+    def unpack_prefixes(raw_addresses=False):
+        for b in prefix_bufs:
+            prefix.unpack(b, raw_addresses=raw_addresses)
+
+    def pack():
+        return [details.pack({"_vl_msg_id": 1, "route": r}) for r in routes]
+
+    results = [("prefix pack", timed(pack_prefixes, n))]
+    prefix_bufs = pack_prefixes()
+    results.append(("prefix unpack", timed(unpack_prefixes, n)))
+    results.append(("pack", timed(pack, n)))
+    bufs = pack()
+
+    def pack_columns():
+        template = make_route(None, 0)
+        del template["prefix"]
+        columns = {
+            "route.prefix": prefixes,
+            "route.paths.0.sw_if_index": [1 + i % 2 for i in range(n)],
+        }
+        return details.pack_columns(columns, {"_vl_msg_id": 1, "route": template})
+
+    results.append(("pack columns", timed(pack_columns, n)))
+
+    def unpack(raw_addresses=False):
+        for b in bufs:
+            details.unpack(b, raw_addresses=raw_addresses)
+
+    results.append(("unpack", timed(unpack, n)))
+    results.append(("unpack again", timed(unpack, n)))
+
+    def view_prefix():
+        for b in bufs:
+            details.view(b).route.prefix
+
+    results.append(("view prefix", timed(view_prefix, n)))
+    results.append(("prefix raw", timed(lambda: unpack_prefixes(True), n)))
+    results.append(("unpack raw", timed(lambda: unpack(True), n)))
+
+    for name, us in results:
+        print("%-14s %8.2f us/route" % (name, us))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Measure cold start time of VPPApiClient, with and without API cache
+and lazy construction of messages.
+
+Each sample is a fresh interpreter creating a VPPApiClient from the
+API definitions in --apidir; nothing is connected to VPP.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import time
+t = time.perf_counter()
+from vpp_papi import VPPApiClient
+t1 = time.perf_counter()
+VPPApiClient(apidir={apidir!r}, api_cache_dir={cache_dir!r}, lazy={lazy!r})
+t2 = time.perf_counter()
+print(t1 - t, t2 - t1)
+"""
+
+
+def run(apidir, cache_dir, samples, lazy=False):
+    code = CHILD.format(apidir=apidir, cache_dir=cache_dir, lazy=lazy)
+    imports, loads = [], []
+    for _ in range(samples):
+        out = subprocess.check_output([sys.executable, "-c", code], text=True)
+        i, l = (float(x) for x in out.split())
+        imports.append(i)
+        loads.append(l)
+    return statistics.median(imports), statistics.median(loads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apidir", default="/usr/share/vpp/api")
+    parser.add_argument("-n", "--samples", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = [("json", run(args.apidir, None, args.samples))]
+        # Populate the cache, then measure hits only
+        run(args.apidir, cache_dir, 1)
+        results.append(("cache", run(args.apidir, cache_dir, args.samples)))
+        results.append(("lazy", run(args.apidir, None, args.samples, True)))
+        results.append(("both", run(args.apidir, cache_dir, args.samples, True)))
+
+    print("%-6s %10s %10s %10s" % ("", "import ms", "client ms", "total ms"))
+    for name, (i, l) in results:
+        print("%-6s %10.1f %10.1f %10.1f" % (name, i * 1e3, l * 1e3, (i + l) * 1e3))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Measure how many counter reads per second vpp_papi.VPPStats achieves.
+
+Connects to the stats segment of a running VPP and reads each counter
+given with -c repeatedly for --seconds. Reports reads per second along
+with the counter type and size.
+"""
+
+import argparse
+import sys
+import time
+
+from vpp_papi.vpp_stats import VPPStats
+
+TYPES = {1: "scalar", 2: "simple", 3: "combined", 4: "name", 6: "symlink"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default=VPPStats.default_socketname)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument(
+        "-c",
+        "--counters",
+        nargs="+",
+        default=[
+            "/sys/num_worker_threads",
+            "/if/drops",
+            "/if/rx",
+            "/if/names",
+            "/interfaces/local0/rx",
+        ],
+    )
+    args = parser.parse_args()
+
+    stats = VPPStats(args.socket)
+    stats.connect()
+    try:
+        for name in args.counters:
+            entry = stats.directory.get(name)
+            if entry is None:
+                print("%-30s not found" % name)
+                continue
+            stats[name]
+            n = 0
+            end = time.perf_counter() + args.seconds
+            t = time.perf_counter()
+            while time.perf_counter() < end:
+                for _ in range(100):
+                    stats[name]
+                n += 100
+            rate = n / (time.perf_counter() - t)
+            print(
+                "%-30s %-8s %10.0f reads/s"
+                % (name, TYPES.get(entry.type, entry.type), rate)
+            )
+    finally:
+        stats.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,6 +29,7 @@ setup(
     license="Apache-2.0",
     test_suite="vpp_papi.tests",
     install_requires=requirements,
+    extras_require={"numpy": ["numpy"]},
     packages=find_packages(),
     package_data={"vpp_papi": ["data/*.json"]},
     long_description="""VPP Python language binding.""",
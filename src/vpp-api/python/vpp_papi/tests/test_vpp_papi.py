@@ -12,14 +12,26 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import concurrent.futures
 import ctypes
+import importlib.resources as resources
+import json
 import multiprocessing as mp
+import os
+import queue
+import socket
+import struct
 import sys
+import tempfile
+import threading
 import unittest
 from unittest import mock
 
 from vpp_papi import vpp_papi
+from vpp_papi import vpp_papi_pool
+from vpp_papi import vpp_papi_metrics
 from vpp_papi import vpp_transport_shmem
+from vpp_papi import vpp_transport_socket
 
 
 class TestVppPapiVPPApiClient(unittest.TestCase):
@@ -229,6 +241,639 @@ class TestVppTypes(unittest.TestCase):
         self.assertEqual(t.name, type_name)
 
 
+class TestVppApiCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.apidir = os.path.join(self.tmp.name, "api")
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        os.mkdir(self.apidir)
+        with resources.open_text("vpp_papi.data", "memclnt.api.json") as f:
+            self.memclnt = json.load(f)
+        self.write_api("memclnt", self.memclnt)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_api(self, name, api):
+        path = os.path.join(self.apidir, name + ".api.json")
+        with open(path, "w") as f:
+            json.dump(api, f)
+        return path
+
+    def load(self):
+        return vpp_papi.VPPApiJSONFiles.load_api(
+            apidir=self.apidir, cache_dir=self.cache_dir
+        )
+
+    def test_cache(self):
+        _, messages, services = self.load()
+        (cache_file,) = os.listdir(self.cache_dir)
+        with open(os.path.join(self.cache_dir, cache_file)) as f:
+            self.assertIn("control_ping", json.load(f)["services"])
+        _, cached_messages, cached_services = self.load()
+        self.assertEqual(cached_services, services)
+        self.assertEqual(
+            {k: v.crc for k, v in cached_messages.items()},
+            {k: v.crc for k, v in messages.items()},
+        )
+        self.assertIn("control_ping", cached_messages)
+
+    def test_cache_invalidated(self):
+        self.load()
+        self.memclnt["messages"].append(
+            ["cache_test", ["u16", "_vl_msg_id"], {"crc": "0x12345678"}]
+        )
+        path = self.write_api("memclnt", self.memclnt)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        _, messages, _ = self.load()
+        self.assertIn("cache_test", messages)
+
+    def test_sort_definitions(self):
+        types = {
+            "vl_api_b_t": {"type": "type", "data": ["vl_api_b_t", ["vl_api_c_t", "c"]]},
+            "vl_api_c_t": {"type": "alias", "data": {"type": "vl_api_a_t"}},
+            "vl_api_a_t": {"type": "enum", "data": ["vl_api_a_t", ["A", 0], {}]},
+        }
+        self.assertEqual(
+            list(vpp_papi.VPPApiJSONFiles._sort_definitions(types)),
+            ["vl_api_a_t", "vl_api_c_t", "vl_api_b_t"],
+        )
+
+
+class FakeTransport:
+    """Loopback transport answering every request with its reply."""
+
+    socket_index = 1
+    connected = False
+
+    def __init__(self, vpp):
+        self.vpp = vpp
+        self.message_table = {}
+        for n, name in enumerate(sorted(vpp.messages)):
+            self.message_table[name + "_" + vpp.messages[name].crc[2:]] = n + 1
+        self.replies = []
+        self.writes = 0
+
+    def get_msg_index(self, name):
+        return self.message_table.get(name, 0)
+
+    def suspend(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def write(self, buf):
+        self.write_many([buf])
+
+    def write_many(self, bufs):
+        self.writes += 1
+        for buf in bufs:
+            r = self.vpp.decode_incoming_msg(buf)
+            name = self.vpp.services[type(r).__name__]["reply"]
+            reply = self.vpp.messages[name]
+            i = self.get_msg_index(name + "_" + reply.crc[2:])
+            self.replies.append(
+                reply.pack(
+                    {"_vl_msg_id": i, "context": r.context, "retval": -r.context}
+                )
+            )
+
+    def read(self, timeout=None):
+        if self.replies:
+            return self.replies.pop(0)
+
+
+class TestVppPapiBatch(unittest.TestCase):
+    def setUp(self):
+        self.vpp = vpp_papi.VPPApiClient(bootstrapapi=True)
+        self.vpp.transport = FakeTransport(self.vpp)
+        self.vpp.vpp_dictionary_maxid = len(self.vpp.transport.message_table)
+        self.vpp._register_functions()
+
+    def test_batch(self):
+        with self.vpp.batch(window=4) as b:
+            for i in range(10):
+                self.assertEqual(b.api.control_ping(context=100 + i), i)
+        self.assertEqual(len(b.results), 10)
+        self.assertEqual(b.retvals, [-100 - i for i in range(10)])
+        self.assertEqual(type(b.results[0]).__name__, "control_ping_reply")
+        self.assertGreater(self.vpp.transport.writes, 1)
+
+    def test_batch_columns(self):
+        with self.vpp.batch(window=4) as b:
+            b.api.control_ping(context=1000)
+            names = ["plugin_%d" % i for i in range(10)]
+            self.assertEqual(
+                b.add_columns("get_first_msg_id", {"name": names}), range(1, 11)
+            )
+            self.assertEqual(len(b), 11)
+        self.assertEqual(b.retvals[0], -1000)
+        contexts = [-r for r in b.retvals[1:]]
+        self.assertEqual(contexts, list(range(contexts[0], contexts[0] + 10)))
+        self.assertEqual(type(b.results[1]).__name__, "get_first_msg_id_reply")
+
+    def test_batch_invalid(self):
+        b = self.vpp.batch()
+        with self.assertRaises(vpp_papi.VPPValueError):
+            b.api.control_ping(foo=1)
+        with self.assertRaises(vpp_papi.VPPValueError):
+            b.api.no_such_message()
+        self.assertEqual(b.execute(), [])
+
+    def test_batch_duplicate_context(self):
+        b = self.vpp.batch()
+        b.api.control_ping(context=1)
+        b.api.control_ping(context=1)
+        with self.assertRaises(vpp_papi.VPPValueError):
+            b.execute()
+
+    def test_batch_read_failure(self):
+        resumed = []
+        self.vpp.transport.resume = lambda: resumed.append(True)
+        self.vpp.transport.write_many = lambda bufs: None
+        b = self.vpp.batch()
+        b.api.control_ping(context=1)
+        with self.assertRaises(vpp_papi.VPPIOError):
+            b.execute(timeout=0)
+        self.assertEqual(resumed, [True])
+        self.assertEqual(len(b), 0)
+        self.assertEqual(b.unanswered, [0])
+
+    def test_batch_partial_failure(self):
+        transport = self.vpp.transport
+        write_many = transport.write_many
+        # Answer the first request written only, as if VPP went away
+        transport.write_many = lambda bufs: write_many(bufs[:1])
+        b = self.vpp.batch(window=4)
+        b.api.control_ping(context=1)
+        b.api.control_ping(context=2)
+        b.add_columns("get_first_msg_id", {"name": ["a", "b", "c", "d", "e"]})
+        with self.assertRaises(vpp_papi.VPPIOError):
+            b.execute(timeout=0)
+        self.assertEqual(b.results[0].retval, -1)
+        self.assertEqual(b.results[1:], [None] * 6)
+        self.assertEqual(b.unanswered, [1, 2, 3])
+        self.assertEqual(len(b), 3)
+
+        transport.write_many = write_many
+        retvals = [-r.retval for r in b.execute()]
+        self.assertEqual(len(retvals), 3)
+        self.assertEqual(retvals, list(range(retvals[0], retvals[0] + 3)))
+        self.assertEqual(b.unanswered, [])
+
+    def test_batch_without_write_many(self):
+        class WriteOnlyTransport:
+            def __init__(self, transport):
+                self.transport = transport
+
+            def __getattr__(self, name):
+                if name == "write_many":
+                    raise AttributeError(name)
+                return getattr(self.transport, name)
+
+        self.vpp.transport = WriteOnlyTransport(self.vpp.transport)
+        with self.vpp.batch() as b:
+            b.api.control_ping(context=1)
+            b.api.control_ping(context=2)
+        self.assertEqual(b.retvals, [-1, -2])
+
+
+class TestVppPapiRawAddresses(unittest.TestCase):
+    def test_raw_addresses(self):
+        for raw in (False, True):
+            vpp = vpp_papi.VPPApiClient(bootstrapapi=True, raw_addresses=raw)
+            vpp.transport = FakeTransport(vpp)
+            vpp.vpp_dictionary_maxid = len(vpp.transport.message_table)
+            vpp._register_functions()
+            msg = vpp.messages["control_ping_reply"]
+            with mock.patch.object(msg, "unpack", wraps=msg.unpack) as unpack:
+                vpp.api.control_ping()
+            self.assertIs(unpack.call_args.kwargs["ntc"], False)
+            self.assertIs(unpack.call_args.kwargs["raw_addresses"], raw)
+
+
+class TestVppPapiCompiledCodecs(unittest.TestCase):
+    def test_compiled_codecs_per_client(self):
+        clients = []
+        for compile_codecs in (False, True):
+            vpp = vpp_papi.VPPApiClient(
+                bootstrapapi=True, compile_codecs=compile_codecs
+            )
+            vpp.transport = FakeTransport(vpp)
+            vpp.vpp_dictionary_maxid = len(vpp.transport.message_table)
+            vpp._register_functions()
+            clients.append(vpp)
+        generic, compiled = clients
+        msg = compiled.messages["control_ping_reply"]
+        i = compiled.transport.get_msg_index("control_ping_reply_" + msg.crc[2:])
+        self.assertIs(compiled.id_msgdef[i], msg.compiled())
+        self.assertIs(generic.id_msgdef[i], generic.messages["control_ping_reply"])
+        # The shared definition keeps its generic codec
+        self.assertNotIn("unpack", vars(msg))
+        r = compiled.api.control_ping()
+        self.assertEqual(r.retval, -r.context)
+
+
+class TestVppPapiMetrics(unittest.TestCase):
+    def setUp(self):
+        self.vpp = vpp_papi.VPPApiClient(bootstrapapi=True)
+        self.vpp.transport = FakeTransport(self.vpp)
+        self.vpp.vpp_dictionary_maxid = len(self.vpp.transport.message_table)
+        self.vpp._register_functions()
+
+    def test_disabled(self):
+        self.vpp.api.control_ping()
+        self.assertIsNone(self.vpp.metrics)
+        with self.assertRaises(vpp_papi.VPPApiError):
+            self.vpp.get_metrics()
+
+    def test_metrics(self):
+        self.vpp.enable_metrics()
+        for i in range(3):
+            self.vpp.api.control_ping(context=i + 1)
+        m = self.vpp.get_metrics()
+        self.assertEqual(m["calls"], 3)
+        self.assertEqual(m["queue_depth"], 0)
+        self.assertGreater(m["bytes_sent"], 0)
+        self.assertGreater(m["bytes_received"], 0)
+        ping = m["messages"]["control_ping"]
+        self.assertEqual(
+            sorted(ping), sorted(["pack", "write", "wait", "decode", "total"])
+        )
+        self.assertEqual(ping["total"]["count"], 3)
+        self.assertEqual(ping["total"]["buckets"][-1][1], 3)
+
+    def test_hooks(self):
+        sent = []
+        received = []
+        self.vpp.register_hook("before_send", lambda n, b: sent.append(n))
+        self.vpp.register_hook("after_recv", lambda r, b: received.append(r))
+        self.assertEqual(self.vpp.api.control_ping(context=9).retval, -9)
+        self.assertEqual(sent, ["control_ping"])
+        self.assertEqual([r.retval for r in received], [-9])
+        with self.assertRaises(vpp_papi.VPPValueError):
+            self.vpp.register_hook("no_such_hook", print)
+
+    def test_histogram(self):
+        h = vpp_papi_metrics.LatencyHistogram()
+        for us in range(1, 1001):
+            i = h.bucket(us)
+            self.assertLessEqual(us, h.upper_bound(i))
+            self.assertLessEqual(h.upper_bound(i) - us, us // 16)
+            h.record(us / 1e6)
+        self.assertEqual(h.count, 1000)
+        self.assertAlmostEqual(h.percentile(50), 500e-6, delta=32e-6)
+        self.assertAlmostEqual(h.percentile(100), 1000e-6)
+
+
+class TestVppPapiLazy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with resources.open_text("vpp_papi.data", "memclnt.api.json") as f:
+            memclnt = json.load(f)
+        memclnt["enums"] = [
+            ["address_family", ["ADDRESS_IP4", 0], ["ADDRESS_IP6", 1]],
+        ]
+        with open(os.path.join(self.tmp.name, "memclnt.api.json"), "w") as f:
+            json.dump(memclnt, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lazy(self):
+        vpp = vpp_papi.VPPApiClient(apidir=self.tmp.name, lazy=True)
+        self.assertIsInstance(vpp.messages, vpp_papi.VPPMessages)
+        self.assertEqual(vpp.messages.crc("control_ping"), "0x51077d14")
+        self.assertEqual(vpp.messages._messages, {})
+
+        vpp.transport = FakeTransport(vpp_papi.VPPApiClient(bootstrapapi=True))
+        vpp.transport.vpp = vpp
+        vpp.vpp_dictionary_maxid = len(vpp.transport.message_table)
+        vpp._register_functions()
+        self.assertEqual(vpp.messages._messages, {})
+
+        ping = vpp.api.control_ping
+        self.assertEqual(list(vpp.messages._messages), ["control_ping"])
+        self.assertIs(vpp.api.control_ping_pack._func.msg, ping._func.msg)
+        with self.assertRaises(AttributeError):
+            vpp.api.no_such_message
+
+        i = vpp.transport.get_msg_index(
+            "control_ping_reply_" + vpp.messages.crc("control_ping_reply")[2:]
+        )
+        self.assertIsNone(vpp.id_msgdef[i])
+        with vpp.batch() as b:
+            b.api.control_ping(context=3)
+        self.assertEqual(b.retvals, [-3])
+        self.assertEqual(vpp.id_msgdef[i].name, "control_ping_reply")
+        self.assertNotIn("sockclnt_create", vpp.messages._messages)
+
+    def test_lazy_no_crc(self):
+        messages = vpp_papi.VPPMessages([["no_crc", ["u16", "_vl_msg_id"]]])
+        with self.assertRaisesRegex(vpp_papi.VPPValueError, "no_crc"):
+            messages.crc("no_crc")
+
+    def test_lazy_threads(self):
+        vpp = vpp_papi.VPPApiClient(apidir=self.tmp.name, lazy=True)
+        names = list(vpp.messages)
+        barrier = threading.Barrier(4)
+
+        def lookup():
+            barrier.wait()
+            return [vpp.messages[name] for name in names]
+
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            results = [executor.submit(lookup) for _ in range(4)]
+            msgs = [r.result() for r in results]
+        for m in msgs[1:]:
+            self.assertEqual([id(x) for x in m], [id(x) for x in msgs[0]])
+
+
+class TestVppApiClientPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = vpp_papi_pool.VPPApiClientPool(size=3, bootstrapapi=True)
+        for i in range(self.pool.size):
+            if i:
+                self.pool._add_client()
+            vpp = self.pool.clients[i]
+            vpp.transport = FakeTransport(vpp)
+            vpp.vpp_dictionary_maxid = len(vpp.transport.message_table)
+            vpp._register_functions()
+            self.pool.idle.put(i)
+        self.pool.connected = True
+
+    def tearDown(self):
+        if self.pool.executor is not None:
+            self.pool.executor.shutdown()
+
+    def test_shared_definitions(self):
+        clients = self.pool.clients
+        self.assertEqual(len(clients), 3)
+        self.assertIs(clients[1].messages, clients[0].messages)
+        self.assertIs(clients[2].services, clients[0].services)
+
+    def test_call(self):
+        self.assertEqual(self.pool.api.control_ping(context=5).retval, -5)
+        with self.assertRaises(AttributeError):
+            self.pool.api.no_such_message
+        with self.pool.connection() as vpp:
+            self.assertIn(vpp, self.pool.clients)
+            self.assertEqual(self.pool.idle.qsize(), 2)
+        self.assertEqual(self.pool.idle.qsize(), 3)
+
+    def test_submit(self):
+        futures = [self.pool.submit("control_ping", context=100 + i) for i in range(30)]
+        self.assertEqual(
+            [f.result().retval for f in futures], [-100 - i for i in range(30)]
+        )
+        self.assertEqual(sum(self.pool.calls), 30)
+        self.assertIn("total", self.pool.get_stats())
+
+    def test_not_connected(self):
+        self.pool.connected = False
+        with self.assertRaises(vpp_papi.VPPApiError):
+            self.pool.api.control_ping()
+
+
+class StreamTransport(FakeTransport):
+    """Loopback transport also serving test_dump and test_get."""
+
+    def pack(self, name, **kwargs):
+        msg = self.vpp.messages[name]
+        kwargs["_vl_msg_id"] = self.get_msg_index(name + "_" + msg.crc[2:])
+        return msg.pack(kwargs)
+
+    def write_many(self, bufs):
+        for buf in bufs:
+            r = self.vpp.decode_incoming_msg(buf)
+            name = type(r).__name__
+            if name == "test_dump":
+                for value in range(r.count):
+                    self.replies.append(
+                        self.pack("test_details", context=r.context, value=value)
+                    )
+            elif name == "test_get":
+                end = min(r.cursor + 2, 5)
+                for value in range(r.cursor, end):
+                    self.replies.append(
+                        self.pack("test_details", context=r.context, value=value)
+                    )
+                retval = -165 if end < 5 else 0
+                self.replies.append(
+                    self.pack(
+                        "test_get_reply", context=r.context, retval=retval, cursor=end
+                    )
+                )
+            else:
+                super().write_many([buf])
+
+
+class TestVppPapiStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with resources.open_text("vpp_papi.data", "memclnt.api.json") as f:
+            memclnt = json.load(f)
+        header = [["u16", "_vl_msg_id"], ["u32", "client_index"], ["u32", "context"]]
+        memclnt["messages"] += [
+            ["test_dump", *header, ["u32", "count"], {"crc": "0x00000001"}],
+            ["test_details", *header, ["u32", "value"], {"crc": "0x00000002"}],
+            ["test_get", *header, ["u32", "cursor"], {"crc": "0x00000003"}],
+            [
+                "test_get_reply",
+                *header,
+                ["i32", "retval"],
+                ["u32", "cursor"],
+                {"crc": "0x00000004"},
+            ],
+        ]
+        memclnt["services"]["test_dump"] = {"reply": "test_details", "stream": True}
+        memclnt["services"]["test_get"] = {
+            "reply": "test_get_reply",
+            "stream": True,
+            "stream_msg": "test_details",
+        }
+        with open(os.path.join(self.tmp.name, "memclnt.api.json"), "w") as f:
+            json.dump(memclnt, f)
+        self.vpp = vpp_papi.VPPApiClient(apidir=self.tmp.name)
+        self.vpp.transport = StreamTransport(self.vpp)
+        self.vpp.vpp_dictionary_maxid = len(self.vpp.transport.message_table)
+        self.vpp._register_functions()
+        self.vpp.control_ping_msgdef = self.vpp.messages["control_ping"]
+        self.vpp.control_ping_index = self.vpp.transport.get_msg_index(
+            "control_ping_" + self.vpp.control_ping_msgdef.crc[2:]
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_iter(self):
+        stream = self.vpp.api.test_dump.iter(count=5)
+        self.assertIsInstance(stream, vpp_papi.VPPApiStream)
+        self.assertEqual([d.value for d in stream], [0, 1, 2, 3, 4])
+        self.assertIsNone(stream.reply)
+        self.assertEqual(
+            [d.value for d in self.vpp.api.test_dump(count=5)], [0, 1, 2, 3, 4]
+        )
+        self.assertFalse(hasattr(self.vpp.api.control_ping, "iter"))
+
+    def test_iter_reply(self):
+        stream = self.vpp.api.test_get.iter(cursor=3)
+        self.assertEqual([d.value for d in stream], [3, 4])
+        self.assertEqual(stream.reply.retval, 0)
+
+    def test_iter_close(self):
+        stream = self.vpp.api.test_dump.iter(count=10)
+        self.assertEqual(next(stream).value, 0)
+        stream.close()
+        self.assertEqual(self.vpp.transport.replies, [])
+        self.assertTrue(self.vpp.message_queue.empty())
+        self.assertEqual(self.vpp.api.control_ping(context=7).retval, -7)
+
+        with self.vpp.api.test_dump.iter(count=10) as stream:
+            pass
+        self.assertEqual(self.vpp.transport.replies, [])
+        self.assertEqual(self.vpp.api.control_ping(context=7).retval, -7)
+
+    def test_iter_other_call(self):
+        with self.vpp.api.test_dump.iter(count=10) as stream:
+            next(stream)
+            with self.assertRaises(vpp_papi.VPPRuntimeError):
+                self.vpp.api.control_ping()
+            with self.assertRaises(vpp_papi.VPPRuntimeError):
+                self.vpp.api.test_dump.iter(count=1)
+            with self.assertRaises(vpp_papi.VPPRuntimeError):
+                self.vpp.batch().execute()
+        self.assertEqual(self.vpp.api.control_ping(context=7).retval, -7)
+
+    def test_details_iter(self):
+        self.assertEqual(
+            [d.value for d in self.vpp.details_iter(self.vpp.api.test_get)],
+            [0, 1, 2, 3, 4],
+        )
+
+        def test_get(**kwargs):
+            return self.vpp.api.test_get(**kwargs)
+
+        self.assertEqual(
+            [d.value for d in self.vpp.details_iter(test_get)], [0, 1, 2, 3, 4]
+        )
+
+    def test_message_views(self):
+        self.vpp.message_views = True
+        details = self.vpp.api.test_dump(count=3)
+        self.assertEqual([d.value for d in details], [0, 1, 2])
+        self.assertEqual(type(details[0]).__name__, "test_details")
+        self.assertEqual(self.vpp.api.control_ping(context=7).retval, -7)
+
+
+class TestVppTransportSocket(unittest.TestCase):
+    def setUp(self):
+        self.transport = vpp_transport_socket.VppTransport(None, 5, None)
+        self.sock, self.peer = socket.socketpair()
+        self.transport.socket = self.sock
+        self.transport.connected = True
+
+    def tearDown(self):
+        self.sock.close()
+        self.peer.close()
+
+    def frame(self, msg):
+        return struct.pack(">QII", 0, len(msg), 0) + msg
+
+    def test_write(self):
+        self.transport.write(b"hello")
+        self.assertEqual(self.peer.recv(100), self.frame(b"hello"))
+        self.transport.write_many([b"a", b"bc"])
+        self.assertEqual(self.peer.recv(100), self.frame(b"a") + self.frame(b"bc"))
+
+    def test_read_messages(self):
+        data = b"".join(self.frame(bytes([i]) * i) for i in range(1, 20))
+        # Split frames across receives
+        self.peer.sendall(data[:50])
+        msgs = self.transport._read_messages()
+        self.peer.sendall(data[50:])
+        while sum(len(m) for m in msgs) < sum(range(1, 20)):
+            msgs += self.transport._read_messages()
+        self.assertEqual(
+            [bytes(m) for m in msgs], [bytes([i]) * i for i in range(1, 20)]
+        )
+        self.assertEqual(self.transport.rbuf, b"")
+
+    def test_read_large(self):
+        self.transport.read_chunk_size = 64
+        big = bytes(range(256)) * 10
+        self.peer.sendall(self.frame(b"x") + self.frame(big) + self.frame(b"y"))
+        self.assertEqual(bytes(self.transport._read()), b"x")
+        self.assertEqual(bytes(self.transport._read()), big)
+        self.assertEqual(bytes(self.transport._read()), b"y")
+        self.peer.close()
+        self.assertIsNone(self.transport._read())
+
+    def test_queue_bounded(self):
+        self.transport.max_queued = 2
+        self.transport.q = queue.Queue(self.transport.max_queued)
+        t = threading.Thread(target=lambda: [self.transport._put(i) for i in range(3)])
+        t.start()
+        t.join(0.3)
+        # Waiting for the reader
+        self.assertTrue(t.is_alive())
+        self.assertEqual(self.transport.read(), 0)
+        t.join()
+        self.assertEqual([self.transport.read(), self.transport.read()], [1, 2])
+
+        # Given up once disconnected
+        self.transport._put(3)
+        self.transport._put(4)
+        self.transport.connected = False
+        self.transport._put(5)
+        self.assertEqual(list(self.transport.q.queue), [3, 4])
+
+    def start_message_thread(self):
+        self.transport.parent = mock.Mock(VPPApiError=vpp_papi.VPPApiError)
+        self.transport.parent.api.sockclnt_delete.side_effect = IOError
+        self.transport.do_async = False
+        self.transport.socket_index = 1
+        self.transport.read_timeout = None
+        self.transport.sque = socket.socketpair()
+        thread = threading.Thread(target=self.transport.msg_thread_func)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def blocked_read(self):
+        replies = []
+        t = threading.Thread(target=lambda: replies.append(self.transport.read()))
+        t.start()
+        t.join(0.1)
+        # Nothing received, waiting without a timeout
+        self.assertTrue(t.is_alive())
+        return t, replies
+
+    def test_disconnect_wakes_read(self):
+        thread = self.start_message_thread()
+        t, replies = self.blocked_read()
+        self.transport.message_thread = thread
+        self.transport.disconnect()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(replies, [None])
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.transport.sque)
+
+    def test_peer_close_wakes_read(self):
+        thread = self.start_message_thread()
+        t, replies = self.blocked_read()
+        self.peer.close()
+        t.join(5)
+        self.assertEqual(replies, [None])
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        for s in self.transport.sque:
+            s.close()
+
+
 class TestVppPapiLogging(unittest.TestCase):
     def test_logger(self):
         class Transport:
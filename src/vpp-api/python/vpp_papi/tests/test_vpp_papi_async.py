@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import asyncio
+import collections
+import struct
+import unittest
+
+from vpp_papi import vpp_papi_async
+
+
+class FakeWriter:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+
+    async def drain(self):
+        pass
+
+
+def frame(msg):
+    return struct.pack(">QII", 0, len(msg), 0) + msg
+
+
+class TestVppPapiAsync(unittest.TestCase):
+    def setUp(self):
+        self.vpp = vpp_papi_async.VPPApiClient(max_in_flight=2)
+
+    def test_read_messages(self):
+        async def read():
+            self.vpp.reader = asyncio.StreamReader()
+            self.vpp.read_chunk_size = 16
+            data = frame(b"a" * 5) + frame(b"b" * 20) + frame(b"")
+            self.vpp.reader.feed_data(data)
+            self.vpp.reader.feed_eof()
+            msgs = []
+            while True:
+                m = await self.vpp._read_messages()
+                if m is None:
+                    return msgs
+                msgs += [bytes(x) for x in m]
+
+        self.assertEqual(asyncio.run(read()), [b"a" * 5, b"b" * 20, b""])
+
+    def test_queue_worker(self):
+        """Queued requests are written together, up to max_in_flight"""
+
+        async def run():
+            vpp = self.vpp
+            vpp.writer = FakeWriter()
+            vpp.window = asyncio.Semaphore(vpp.max_in_flight)
+            requests = {}
+            futures = []
+            for context in range(1, 5):
+                futures.append(asyncio.Future())
+                vpp.message_queue.put_nowait(
+                    vpp_papi_async.QueueObject(b"%d" % context, context, futures[-1])
+                )
+            worker = asyncio.create_task(vpp.queue_worker(requests))
+            await asyncio.sleep(0)
+            self.assertEqual(vpp.writer.writes, [frame(b"1") + frame(b"2")])
+            self.assertEqual(sorted(requests), [1, 2])
+
+            vpp._request_done(requests, 1)
+            await asyncio.sleep(0)
+            self.assertEqual(vpp.writer.writes[1:], [frame(b"3")])
+            vpp._request_done(requests, 2)
+            vpp._request_done(requests, 3)
+            await vpp.message_queue.put(None)
+            await worker
+            self.assertEqual(vpp.writer.writes[2:], [frame(b"4")])
+
+        asyncio.run(run())
+
+    def test_dispatch(self):
+        """Replies complete their request, even if it was cancelled"""
+        reply = collections.namedtuple("control_ping_reply", ["context"])
+        details = collections.namedtuple("test_details", ["context"])
+
+        async def run():
+            vpp = self.vpp
+            vpp.window = asyncio.Semaphore(vpp.max_in_flight)
+            events = asyncio.Queue()
+            cancelled, stream = asyncio.Future(), asyncio.Future()
+            requests = {
+                1: (cancelled, None, None, []),
+                2: (stream, "control_ping_reply", "test_details", []),
+            }
+            for _ in requests:
+                await vpp.window.acquire()
+            cancelled.cancel()
+            vpp._dispatch(reply(1), requests, events)
+            vpp._dispatch(details(2), requests, events)
+            vpp._dispatch(reply(2), requests, events)
+            vpp._dispatch(reply(0), requests, events)
+            self.assertEqual(requests, {})
+            self.assertEqual(vpp.window._value, vpp.max_in_flight)
+            self.assertEqual(stream.result(), (reply(2), [details(2)]))
+            self.assertEqual(events.get_nowait(), reply(0))
+            self.assertTrue(events.empty())
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,11 +5,18 @@ from vpp_papi.vpp_serializer import VPPType, VPPEnumType, VPPEnumFlagType
 from vpp_papi.vpp_serializer import VPPUnionType, VPPMessage
 from vpp_papi.vpp_serializer import VPPTypeAlias, VPPSerializerValueError
 from vpp_papi import MACAddress
+from vpp_papi import vpp_format
 from socket import inet_pton, AF_INET, AF_INET6
 import logging
+import struct
 import sys
 from ipaddress import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestLimits(unittest.TestCase):
     def test_string(self):
@@ -641,6 +648,347 @@ class TestAddType(unittest.TestCase):
         self.assertIsNone(nt.address.prefix)
 
 
+class TestCompiledCodec(unittest.TestCase):
+    def setUp(self):
+        VPPEnumType(
+            "vl_api_address_family_t",
+            [["ADDRESS_IP4", 0], ["ADDRESS_IP6", 1], {"enumtype": "u8"}],
+        )
+        VPPEnumType(
+            "vl_api_fib_path_type_t",
+            [["FIB_API_PATH_TYPE_NORMAL", 0], ["FIB_API_PATH_TYPE_LOCAL", 1]],
+        )
+        VPPTypeAlias("vl_api_ip4_address_t", {"type": "u8", "length": 4})
+        VPPTypeAlias("vl_api_ip6_address_t", {"type": "u8", "length": 16})
+        VPPTypeAlias("vl_api_interface_index_t", {"type": "u32"})
+        VPPUnionType(
+            "vl_api_address_union_t",
+            [["vl_api_ip4_address_t", "ip4"], ["vl_api_ip6_address_t", "ip6"]],
+        )
+        VPPType(
+            "vl_api_address_t",
+            [["vl_api_address_family_t", "af"], ["vl_api_address_union_t", "un"]],
+        )
+        VPPType("vl_api_prefix_t", [["vl_api_address_t", "address"], ["u8", "len"]])
+        VPPType(
+            "vl_api_fib_mpls_label_t",
+            [["u8", "is_uniform"], ["u32", "label"], ["u8", "ttl"], ["u8", "exp"]],
+        )
+        VPPType(
+            "vl_api_fib_path_nh_t",
+            [
+                ["vl_api_address_union_t", "address"],
+                ["u32", "via_label"],
+                ["u32", "obj_id"],
+                ["u32", "classify_table_index"],
+            ],
+        )
+        VPPType(
+            "vl_api_fib_path_t",
+            [
+                ["vl_api_interface_index_t", "sw_if_index"],
+                ["u32", "table_id"],
+                ["u32", "rpf_id"],
+                ["u8", "weight"],
+                ["u8", "preference"],
+                ["vl_api_fib_path_type_t", "type"],
+                ["vl_api_fib_path_nh_t", "nh"],
+                ["u8", "n_labels"],
+                ["vl_api_fib_mpls_label_t", "label_stack", 16],
+            ],
+        )
+        VPPType(
+            "vl_api_ip_route_t",
+            [
+                ["u32", "table_id"],
+                ["u32", "stats_index"],
+                ["vl_api_prefix_t", "prefix"],
+                ["u8", "n_paths"],
+                ["vl_api_fib_path_t", "paths", 0, "n_paths"],
+            ],
+        )
+        self.msg = VPPMessage(
+            "ip_route_add_del",
+            [
+                ["u16", "_vl_msg_id"],
+                ["u32", "client_index"],
+                ["u32", "context"],
+                ["bool", "is_add", {"default": "true"}],
+                ["bool", "is_multipath"],
+                ["vl_api_ip_route_t", "route"],
+                ["string", "tag", 64],
+                ["u32", "n_ids"],
+                ["u32", "ids", 0, "n_ids"],
+                {"crc": "0xb8ecfe0d"},
+            ],
+        )
+        label = {"is_uniform": 0, "label": 3, "ttl": 64, "exp": 0}
+        path = {
+            "sw_if_index": 1,
+            "weight": 1,
+            "type": 1,
+            "nh": {"address": {"ip4": b"\x0a\x00\x00\x01"}},
+            "label_stack": [label] * 16,
+        }
+        self.route = {
+            "_vl_msg_id": 100,
+            "context": 5,
+            "route": {
+                "table_id": 2,
+                "prefix": IPv4Network("10.1.2.0/24"),
+                "n_paths": 2,
+                "paths": [path, path],
+            },
+            "tag": "foobar",
+            "n_ids": 3,
+            "ids": [1, 2, 3],
+        }
+
+    def test_pack(self):
+        b = self.msg.pack(self.route)
+        empty = self.msg.pack({})
+        self.msg = self.msg.compiled()
+        self.assertEqual(self.msg.pack(self.route), b)
+        self.assertEqual(self.msg.pack({}), empty)
+        nt, size = self.msg.unpack(b)
+        self.assertTrue(nt.is_add)
+        self.assertEqual(nt.route.paths[1].type, 1)
+
+    def test_unpack(self):
+        b = self.msg.pack(self.route)
+        nt, size = self.msg.unpack(b)
+        raw, _ = self.msg.unpack(b, ntc=True)
+        self.msg = self.msg.compiled()
+        self.assertEqual(self.msg.unpack(b), (nt, size))
+        self.assertEqual(self.msg.unpack(b, ntc=True), (raw, size))
+        self.assertEqual(size, len(b))
+        self.assertEqual(nt.route.prefix, IPv4Network("10.1.2.0/24"))
+        self.assertEqual(nt.ids, [1, 2, 3])
+
+    def test_errors(self):
+        self.msg = self.msg.compiled()
+        self.route["n_ids"] = 2
+        with self.assertRaises(VPPSerializerValueError):
+            self.msg.pack(self.route)
+        with self.assertRaises(VPPSerializerValueError):
+            self.msg.pack({"tag": "x" * 64})
+        b = self.msg.pack({"_vl_msg_id": 1})
+        with self.assertRaises(struct.error):
+            self.msg.unpack(b[:10])
+
+    def test_shared_types_unchanged(self):
+        msg = self.msg.compiled()
+        self.assertIsNot(msg, self.msg)
+        self.assertIs(self.msg.compiled(), msg)
+        self.assertIs(msg.compiled(), msg)
+        # Neither the message nor the types it uses from the registry
+        # are modified
+        route = self.msg.packers[self.msg.fields.index("route")]
+        for t in (self.msg, route, route.packers[-1].packer):
+            self.assertNotIn("pack", vars(t))
+            self.assertNotIn("unpack", vars(t))
+        self.assertEqual(msg.pack(self.route), self.msg.pack(self.route))
+
+
+class TestMessageView(unittest.TestCase):
+    setUp = TestCompiledCodec.setUp
+
+    def test_view(self):
+        b = self.msg.pack(self.route)
+        nt, size = self.msg.unpack(b)
+        v = self.msg.view(memoryview(b"xx" + b), 2)
+        self.assertEqual(type(v).__name__, "ip_route_add_del")
+        self.assertEqual(v.context, 5)
+        self.assertTrue(v.is_add)
+        self.assertEqual(v.route.table_id, 2)
+        self.assertEqual(v.route.prefix, IPv4Network("10.1.2.0/24"))
+        # Nothing so far needed a full decode
+        self.assertIsNone(v._tuple)
+        self.assertEqual(v.route.paths, nt.route.paths)
+        self.assertEqual(v.tag, "foobar")
+        self.assertEqual(v.ids, [1, 2, 3])
+        self.assertEqual(v, nt)
+        self.assertEqual(len(v), len(nt))
+        self.assertEqual(v._asdict(), nt._asdict())
+        self.assertIn("context", v._fields)
+
+    def test_view_ntc(self):
+        b = self.msg.pack(self.route)
+        raw, _ = self.msg.unpack(b, ntc=True)
+        self.msg = self.msg.compiled()
+        v = self.msg.view(b, ntc=True)
+        self.assertEqual(v.route.prefix.len, 24)
+        self.assertEqual(v.route.prefix, raw.route.prefix)
+        self.assertEqual(tuple(v), raw)
+
+
+class TestPackColumns(unittest.TestCase):
+    setUp = TestCompiledCodec.setUp
+
+    def test_pack_columns(self):
+        route = self.route["route"]
+        route["n_paths"] = 1
+        route["paths"] = route["paths"][:1]
+        prefixes = [IPv4Network("10.%d.0.0/16" % i) for i in range(5)]
+        columns = {
+            "context": range(1, 6),
+            "route.prefix": prefixes,
+            "route.paths.0.sw_if_index": [10, 11, 12, 13, 14],
+            "tag": ["route%d" % i for i in range(5)],
+        }
+        header = b"abcd"
+        buf = self.msg.pack_columns(columns, self.route, prefix=header)
+        size = len(buf) // 5
+        for i in range(5):
+            self.route["context"] = i + 1
+            self.route["tag"] = "route%d" % i
+            route["prefix"] = prefixes[i]
+            route["paths"][0] = dict(route["paths"][0], sw_if_index=10 + i)
+            msg = buf[i * size : (i + 1) * size]
+            self.assertEqual(msg, header + self.msg.pack(self.route))
+
+    def test_pack_columns_fixed_array(self):
+        route = self.route["route"]
+        route["n_paths"] = 1
+        route["paths"] = route["paths"][:1]
+        columns = {
+            "route.paths.0.label_stack.1.label": [7, 8],
+            "route.paths.0.label_stack.15.ttl": [64, 65],
+        }
+        buf = self.msg.pack_columns(columns, self.route)
+        size = len(buf) // 2
+        for i in range(2):
+            nt, _ = self.msg.unpack(buf[i * size : (i + 1) * size])
+            labels = nt.route.paths[0].label_stack
+            self.assertEqual(labels[1].label, 7 + i)
+            self.assertEqual(labels[15].ttl, 64 + i)
+            # Neighbours keep the template values
+            self.assertEqual(labels[0].label, 3)
+            self.assertEqual(labels[2].label, 3)
+            self.assertEqual(labels[15].label, 3)
+
+    @unittest.skipIf(numpy is None, "requires numpy")
+    def test_pack_columns_numpy(self):
+        columns = {"context": numpy.arange(3, dtype=numpy.uint32)}
+        buf = self.msg.pack_columns(columns, self.route)
+        size = len(buf) // 3
+        self.assertEqual(
+            [self.msg.view(buf, i * size).context for i in range(3)], [0, 1, 2]
+        )
+
+    def test_pack_columns_invalid(self):
+        for path in ("route.n_paths", "route.paths.2.weight", "ids", "foo"):
+            with self.assertRaises(VPPSerializerValueError):
+                self.msg.pack_columns({path: [1]}, self.route)
+        with self.assertRaises(VPPSerializerValueError):
+            self.msg.pack_columns({"context": [1], "tag": ["a", "b"]}, self.route)
+
+
+class TestDirectConversion(unittest.TestCase):
+    def setUp(self):
+        VPPEnumType(
+            "vl_api_address_family_t",
+            [["ADDRESS_IP4", 0], ["ADDRESS_IP6", 1], {"enumtype": "u8"}],
+        )
+        VPPTypeAlias("vl_api_ip4_address_t", {"type": "u8", "length": 4})
+        VPPTypeAlias("vl_api_ip6_address_t", {"type": "u8", "length": 16})
+        VPPUnionType(
+            "vl_api_address_union_t",
+            [["vl_api_ip4_address_t", "ip4"], ["vl_api_ip6_address_t", "ip6"]],
+        )
+        address = VPPType(
+            "vl_api_address_t",
+            [["vl_api_address_family_t", "af"], ["vl_api_address_union_t", "un"]],
+        )
+        prefix = VPPType(
+            "vl_api_prefix_t", [["vl_api_address_t", "address"], ["u8", "len"]]
+        )
+        prefix4 = VPPType(
+            "vl_api_ip4_prefix_t", [["vl_api_ip4_address_t", "address"], ["u8", "len"]]
+        )
+        awp = VPPTypeAlias("vl_api_address_with_prefix_t", {"type": "vl_api_prefix_t"})
+        VPPType(
+            "vl_api_ip6_prefix_t", [["vl_api_ip6_address_t", "address"], ["u8", "len"]]
+        )
+        awp6 = VPPTypeAlias(
+            "vl_api_ip6_address_with_prefix_t", {"type": "vl_api_ip6_prefix_t"}
+        )
+        self.values = [
+            (address, IPv4Address("1.2.3.4")),
+            (address, IPv6Address("2001:db8::1")),
+            (address, "10.0.0.1"),
+            (address, "2001:db8::2"),
+            (prefix, IPv4Network("10.1.0.0/16")),
+            (prefix, IPv6Network("2001:db8::/32")),
+            (prefix, "192.168.1.0/24"),
+            (prefix4, IPv4Network("10.1.2.0/24")),
+            (prefix4, "10.1.3.0/24"),
+            (awp, IPv4Interface("10.1.2.3/24")),
+            (awp, IPv6Interface("2001:db8::3/64")),
+            (awp, "2001:db8::4/64"),
+            (awp6, IPv6Interface("2001:db8::5/64")),
+        ]
+
+    def generic_pack(self, t, v):
+        d = vpp_format.conversion_table[t.name][type(v).__name__](v)
+        if isinstance(t, VPPTypeAlias):
+            return t.packer.pack(d)
+        return t.pack(d)
+
+    def generic_unpack(self, t, b, table=vpp_format.conversion_unpacker_table):
+        nt, size = t.unpack(b, ntc=True)
+        return table[t.name](nt), size
+
+    def test_pack(self):
+        for t, v in self.values:
+            self.assertIsNotNone(t.direct_conversion(), t.name)
+            self.assertEqual(t.pack(v), self.generic_pack(t, v), (t.name, v))
+
+    def test_unpack(self):
+        for t, v in self.values:
+            b = t.pack(v)
+            r, size = t.unpack(b)
+            self.assertEqual((r, size), self.generic_unpack(t, b), (t.name, v))
+            self.assertEqual(type(r), type(self.generic_unpack(t, b)[0]))
+            # Repeated values are interned
+            self.assertIs(t.unpack(b)[0], r)
+
+    def test_unpack_raw(self):
+        for t, v in self.values:
+            b = t.pack(v)
+            self.assertEqual(
+                t.unpack(b, raw_addresses=True),
+                self.generic_unpack(t, b, vpp_format.raw_conversion_unpacker_table),
+                (t.name, v),
+            )
+        t, v = self.values[4]
+        self.assertEqual(
+            t.unpack(t.pack(v), raw_addresses=True)[0], (b"\x0a\x01\x00\x00", 16)
+        )
+        self.assertEqual(t.unpack(t.pack(v))[0], v)
+
+    def test_unpack_raw_nested(self):
+        route = VPPType("route_raw", [["u32", "table_id"], ["vl_api_prefix_t", "p"]])
+        b = route.pack({"table_id": 3, "p": IPv4Network("10.1.0.0/16")})
+        for _ in range(2):
+            r, _ = route.unpack(b, raw_addresses=True)
+            self.assertEqual(r.p, (b"\x0a\x01\x00\x00", 16))
+            self.assertEqual(route.view(b, raw_addresses=True).p, r.p)
+            self.assertEqual(route.unpack(b)[0].p, IPv4Network("10.1.0.0/16"))
+            # No conversion at all takes precedence
+            self.assertEqual(
+                route.unpack(b, ntc=True, raw_addresses=True),
+                route.unpack(b, ntc=True),
+            )
+            route = route.compiled()
+
+    def test_short_buffer(self):
+        # Falls back to the generic path, which reports the error
+        t, v = self.values[1]
+        with self.assertRaises(VPPSerializerValueError):
+            t.unpack(t.pack(v)[:-1])
+
+
 class TestVppSerializerLogging(unittest.TestCase):
     def test_logger(self):
         # test logger name 'vpp_papi.serializer'
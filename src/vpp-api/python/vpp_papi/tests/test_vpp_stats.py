@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+import asyncio
+import re
+import struct
+import threading
+import unittest
+from unittest import mock
+
+from vpp_papi.vpp_stats import VPPStats, literal_prefix
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BASE = 0x100000000
+
+
+class StatSegment:
+    """Build a version 2 stats segment in memory"""
+
+    header = struct.Struct("QPQQPP")
+
+    def __init__(self):
+        self.buf = bytearray(self.header.size)
+        self.entries = []
+
+    def vector(self, fmt, items):
+        """Append a VPP vector and return its pointer"""
+        self.buf += bytes(-len(self.buf) % 8)
+        self.buf += struct.pack("Q", len(items))
+        ptr = BASE + len(self.buf)
+        for item in items:
+            self.buf += struct.pack(fmt, *item)
+        return ptr
+
+    def string(self, s):
+        return self.vector("B", [(c,) for c in s.encode("ascii") + b"\x00"])
+
+    def counter(self, name, stattype, data):
+        fmt = "Q" if stattype == 2 else "QQ"
+        rows = []
+        for thread in data:
+            items = [(v,) if stattype == 2 else v for v in thread]
+            rows.append((self.vector(fmt, items),))
+        self.entries.append((stattype, self.vector("P", rows), name))
+
+    def simple(self, name, data):
+        self.counter(name, 2, data)
+
+    def combined(self, name, data):
+        self.counter(name, 3, data)
+
+    def scalar(self, name, value):
+        self.entries.append((1, value, name))
+
+    def names(self, name, names):
+        ptrs = [(self.string(n),) for n in names]
+        self.entries.append((4, self.vector("P", ptrs), name))
+
+    def symlink(self, name, target, index):
+        value = struct.unpack("Q", struct.pack("II", target, index))[0]
+        self.entries.append((6, value, name))
+
+    def publish(self, epoch=1):
+        """Write the directory vector and point the header at it"""
+        entries = [(t, v, n.encode("ascii")) for t, v, n in self.entries]
+        directory = self.vector("IQ128s", entries)
+        self.buf += bytes(4096)
+        self.header.pack_into(self.buf, 0, 2, BASE, epoch, 0, directory, 0)
+
+    def stats(self, epoch=1):
+        """Return a VPPStats object reading this segment"""
+        self.publish(epoch)
+        stats = VPPStats()
+        stats.statseg = self.buf
+        stats.size = len(self.buf)
+        stats.connected = True
+        return stats
+
+
+def segment():
+    seg = StatSegment()
+    seg.simple("/if/drops", [[1, 2, 3], [10, 20, 30]])
+    seg.combined("/if/rx", [[(1, 64), (2, 128)], [(3, 192), (4, 256)]])
+    seg.scalar("/sys/last_update", 7)
+    seg.names("/if/names", ["local0", "pg0"])
+    seg.symlink("/interfaces/pg0/rx", 1, 1)
+    return seg
+
+
+class TestVPPStats(unittest.TestCase):
+    def setUp(self):
+        self.stats = segment().stats()
+
+    def test_counters(self):
+        self.assertEqual(self.stats["/if/drops"], [[1, 2, 3], [10, 20, 30]])
+        self.assertEqual(self.stats["/if/drops"][:, 1].sum(), 22)
+        self.assertEqual(self.stats["/if/rx"][:, 1].sum_octets(), 384)
+        self.assertEqual(self.stats["/if/names"], ["local0", "pg0"])
+        self.assertEqual(self.stats["/interfaces/pg0/rx"].packets(), [2, 4])
+        with self.assertRaises(KeyError):
+            self.stats["/no/such/counter"]
+
+    def test_symlink(self):
+        seg = segment()
+        seg.symlink("/interfaces/pg0/drops", 0, 1)
+        seg.symlink("/interfaces/pg5/drops", 0, 5)
+        stats = seg.stats()
+        self.assertEqual(stats["/interfaces/pg0/drops"], [2, 20])
+        self.assertEqual(stats["/interfaces/pg0/drops"].sum(), 22)
+        self.assertEqual(stats["/interfaces/pg0/rx"].sum_octets(), 384)
+        self.assertEqual(stats["/interfaces/pg0/rx"][1]["packets"], 4)
+        with self.assertRaises(IndexError):
+            stats["/interfaces/pg5/drops"]
+
+        # The target changes, the symlink does not
+        seg.combined("/if/rx", [[(1, 64), (7, 700)]])
+        seg.entries[1] = seg.entries.pop()
+        seg.publish(epoch=2)
+        stats.size = len(seg.buf)
+        self.assertEqual(stats["/interfaces/pg0/rx"].packets(), [7])
+
+    def test_vector_moved(self):
+        """A thread vector reallocated in a new epoch is found again"""
+        seg = segment()
+        stats = seg.stats()
+        self.assertEqual(stats["/if/drops"][0], [1, 2, 3])
+        ptr = seg.vector("Q", [(7,), (8,), (9,), (10,)])
+        seg.buf += bytes(64)
+        struct.pack_into("Q", seg.buf, seg.entries[0][1] - BASE, ptr)
+        struct.pack_into("Q", seg.buf, 16, 2)
+        stats.size = len(seg.buf)
+        self.assertEqual(stats["/if/drops"], [[7, 8, 9, 10], [10, 20, 30]])
+
+    def test_snapshot(self):
+        snap = self.stats.snapshot(["/if/drops", "/if/rx", "/interfaces/pg0/rx"])
+        self.assertEqual(len(snap), 3)
+        self.assertEqual(snap.epoch, 1)
+        self.assertEqual(snap["/if/drops"], [[1, 2, 3], [10, 20, 30]])
+        self.assertEqual(snap["/interfaces/pg0/rx"].packets(), [2, 4])
+        self.assertEqual(
+            self.stats.dump(["/if/drops"]), {"/if/drops": snap["/if/drops"]}
+        )
+        with self.assertRaises(TypeError):
+            snap["/if/drops"] = []
+        with self.assertRaises(KeyError):
+            self.stats.snapshot(["/if/drops", "/no/such/counter"])
+
+    def test_snapshot_retry(self):
+        """An epoch change while reading retries the whole set"""
+        self.stats.refresh()
+        entry = self.stats.directory["/if/drops"]
+        read = entry.function
+        calls = []
+        bumps = [1]
+
+        def bump_epoch(stats):
+            calls.append(stats)
+            if bumps:
+                bumps.pop()
+                struct.pack_into("Q", stats.statseg, 16, stats.epoch + 1)
+            return read(stats)
+
+        entry.function = bump_epoch
+        snap = self.stats.snapshot(["/if/rx", "/if/drops"])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(snap.epoch, 2)
+        self.assertEqual(snap["/if/drops"], [[1, 2, 3], [10, 20, 30]])
+        bumps.append(1)
+        with self.assertRaises(IOError):
+            self.stats.snapshot(["/if/drops"], blocking=False)
+
+    def test_rate(self):
+        seg = segment()
+        old = seg.stats().snapshot(["/if/drops", "/if/rx"])
+        seg.entries[:2] = []
+        seg.simple("/if/drops", [[2, 4, 6], [10, 20, 30]])
+        seg.combined("/if/rx", [[(1, 64), (2, 128)], [(5, 320), (4, 256)]])
+        new = seg.stats().snapshot(["/if/drops", "/if/rx"])
+        new.monotonic = old.monotonic + 2
+        self.assertEqual(new.interval(old), 2)
+        self.assertEqual(new.delta(old, "/if/drops"), [[1, 2, 3], [0, 0, 0]])
+        self.assertEqual(new.rate(old, "/if/drops")[0], [0.5, 1, 1.5])
+        self.assertEqual(new.rate(old, "/if/rx")[1][0], [1, 64])
+
+    def test_incremental_refresh(self):
+        seg = StatSegment()
+        for i in range(300):
+            seg.scalar("/sys/counter/%d" % i, i)
+        stats = seg.stats()
+        stats.refresh()
+        seg.entries[10] = (0, 0, "")
+        seg.entries[20] = (0, 0, "")
+        seg.entries[30] = (1, 1000, "/sys/counter/30")
+        seg.entries[40] = (1, 1, "/sys/renamed/40")
+        seg.entries[250:] = [(1, 5, "/sys/counter/5")]
+        seg.entries.append((1, 7, "/sys/new"))
+        seg.publish(epoch=2)
+        stats.size = len(seg.buf)
+        stats.refresh()
+
+        full = VPPStats()
+        full.statseg, full.size, full.connected = seg.buf, len(seg.buf), True
+        full.refresh()
+        self.assertEqual(stats.directory.keys(), full.directory.keys())
+        for name, entry in full.directory.items():
+            self.assertEqual(stats.directory[name].type, entry.type)
+            self.assertEqual(stats.directory[name].value, entry.value)
+        self.assertEqual(stats.directory_by_idx, full.directory_by_idx)
+        self.assertEqual(stats.names.sorted, sorted(full.directory))
+        self.assertEqual(stats["/sys/counter/30"], 1000)
+        self.assertEqual(stats["/sys/counter/5"], 5)
+        self.assertNotIn("/sys/counter/10", stats.directory)
+
+    def test_ls(self):
+        seg = segment()
+        for name in ("/err/ip4-input/drop", "/err/ip6-input/drop", "/if/tx"):
+            seg.simple(name, [[1]])
+        stats = seg.stats()
+        self.assertEqual(
+            stats.ls("^/if/"), ["/if/drops", "/if/names", "/if/rx", "/if/tx"]
+        )
+        self.assertEqual(
+            stats.ls(["/err/ip4", "/if/r"]), ["/err/ip4-input/drop", "/if/rx"]
+        )
+        self.assertEqual(
+            stats.ls(".*/drop$"), ["/err/ip4-input/drop", "/err/ip6-input/drop"]
+        )
+        self.assertEqual(stats.ls("/if/t|/if/r"), ["/if/rx", "/if/tx"])
+        self.assertEqual(stats.ls("/ifs?/"), stats.ls("^/if/"))
+        self.assertEqual(stats.ls("^/foobar"), [])
+        self.assertEqual(stats.ls(re.compile("/if/")), stats.ls("^/if/"))
+        self.assertEqual(stats.ls(re.compile("/IF/T", re.I)), ["/if/tx"])
+        self.assertEqual(
+            stats.ls([re.compile(".*drop$"), "/if/t"]),
+            ["/err/ip4-input/drop", "/err/ip6-input/drop", "/if/tx"],
+        )
+
+    def test_literal_prefix(self):
+        self.assertEqual(literal_prefix("^/if/rx"), "/if/rx")
+        self.assertEqual(literal_prefix("/err/ip4-input"), "/err/ip4-input")
+        self.assertEqual(literal_prefix("/if/rx.*"), "/if/rx")
+        self.assertEqual(literal_prefix("/ifs?/"), "/if")
+        self.assertEqual(literal_prefix("/if\\.x"), "/if.x")
+        self.assertEqual(literal_prefix("/if\\d"), "/if")
+        self.assertEqual(literal_prefix("/if[/]"), "/if")
+        self.assertEqual(literal_prefix("/a|/b"), "")
+        self.assertEqual(literal_prefix("(?i)/if"), "")
+
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class TestVPPStatsArray(unittest.TestCase):
+    def setUp(self):
+        self.stats = segment().stats()
+
+    def test_simple(self):
+        a = self.stats.get_array("/if/drops")
+        self.assertEqual(a.shape, (2, 3))
+        self.assertEqual(a.dtype, numpy.uint64)
+        self.assertEqual(a.tolist(), self.stats["/if/drops"])
+        self.assertEqual(a.sum(axis=0).tolist(), [11, 22, 33])
+        self.assertEqual(a.sum(axis=1).tolist(), [6, 60])
+
+    def test_combined(self):
+        a = self.stats.get_array("/if/rx")
+        self.assertEqual(a.shape, (2, 2, 2))
+        self.assertEqual(a[1, 0].tolist(), [3, 192])
+        self.assertEqual(a.sum(axis=0).tolist(), [[4, 256], [6, 384]])
+
+    def test_copy(self):
+        a = self.stats.get_array("/if/drops")
+        self.stats.statseg[:] = bytes(len(self.stats.statseg))
+        self.assertEqual(a[1, 2], 30)
+
+    def test_uneven_threads(self):
+        seg = StatSegment()
+        seg.simple("/if/drops", [[1, 2, 3], [4]])
+        a = seg.stats().get_array("/if/drops")
+        self.assertEqual(a.tolist(), [[1, 2, 3], [4, 0, 0]])
+
+    def test_symlink(self):
+        a = self.stats.get_array("/interfaces/pg0/rx")
+        self.assertEqual(a.tolist(), [[2, 128], [4, 256]])
+
+    def test_not_a_counter(self):
+        with self.assertRaises(ValueError):
+            self.stats.get_array("/if/names")
+        with self.assertRaises(ValueError):
+            self.stats.get_array("/sys/last_update")
+
+
+@unittest.skipIf(numpy is None, "requires numpy")
+class TestVPPStatsSubscription(unittest.TestCase):
+    def setUp(self):
+        self.seg = segment()
+        self.stats = self.seg.stats()
+
+    def set_rx(self, data, epoch):
+        self.seg.combined("/if/rx", data)
+        self.seg.entries[1] = self.seg.entries.pop()
+        self.seg.publish(epoch)
+        self.stats.size = len(self.seg.buf)
+
+    def test_poll(self):
+        sub = self.stats.subscribe(["^/if/", "^/interfaces/"], print, start=False)
+        updates = []
+        sub.callback = updates.append
+        update = sub.poll()
+        self.assertEqual(
+            sorted(update), ["/if/drops", "/if/names", "/if/rx", "/interfaces/pg0/rx"]
+        )
+        self.assertIsNone(update.delta("/if/rx"))
+        self.assertEqual(
+            update["/if/rx"].tolist(), self.stats.get_array("/if/rx").tolist()
+        )
+        self.assertIsNone(sub.poll())
+
+        self.set_rx([[(1, 64), (2, 128)], [(3, 192), (14, 1256)]], 2)
+        update = sub.poll()
+        self.assertEqual(sorted(update), ["/if/rx", "/interfaces/pg0/rx"])
+        self.assertEqual(
+            update.delta("/interfaces/pg0/rx").tolist(), [[0, 0], [10, 1000]]
+        )
+        self.assertEqual(update.delta("/if/rx")[1].tolist(), [[0, 0], [10, 1000]])
+        self.assertIsNotNone(update.rate("/if/rx"))
+
+        # Only interface 0 changes, not the one pg0 links to
+        self.set_rx([[(2, 64), (2, 128)], [(3, 192), (14, 1256)]], 3)
+        update = sub.poll()
+        self.assertEqual(list(update), ["/if/rx"])
+        self.assertEqual(updates[-1], update)
+        self.assertEqual(len(updates), 3)
+
+    def test_thread(self):
+        polled = threading.Event()
+        sub = self.stats.subscribe("^/if/drops$", lambda u: polled.set(), 0.01)
+        self.assertTrue(polled.wait(5))
+        sub.stop()
+        self.assertIsNone(sub.thread)
+
+    def test_thread_error(self):
+        def callback(update):
+            raise ValueError("callback failed")
+
+        sub = self.stats.subscribe("^/if/drops$", callback, 0.01)
+        sub.thread.join(5)
+        self.assertFalse(sub.thread.is_alive())
+        with self.assertRaisesRegex(ValueError, "callback failed"):
+            sub.stop()
+        sub.stop()
+
+    def test_thread_retry(self):
+        sub = self.stats.subscribe("^/if/drops$", print, 0.001, start=False)
+        sub.max_failures = 3
+        reads = []
+
+        def read(blocking=True):
+            self.assertFalse(blocking)
+            reads.append(None)
+            raise IOError("Optimistic lock failed, retry")
+
+        sub._read = read
+        sub.start()
+        sub.thread.join(5)
+        with self.assertRaises(IOError):
+            sub.stop()
+        self.assertEqual(len(reads), 3)
+
+    def test_poll_nonblocking_refresh(self):
+        sub = self.stats.subscribe("^/if/rx$", print, start=False)
+        sub.poll()
+        self.set_rx([[(1, 64), (2, 128)], [(3, 192), (14, 1256)]], 2)
+        with mock.patch.object(
+            self.stats.lock, "release", side_effect=IOError("retry")
+        ) as release:
+            with self.assertRaises(IOError):
+                sub.poll(blocking=False)
+        self.assertEqual(release.call_count, 1)
+        self.assertEqual(list(sub.poll()), ["/if/rx"])
+
+    def test_asyncio(self):
+        updates = []
+        sub = self.stats.subscribe("^/if/drops$", updates.append, 0.01, start=False)
+
+        async def run():
+            task = asyncio.create_task(sub.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(run())
+        self.assertEqual(len(updates), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import gzip
+import threading
+import unittest
+import urllib.request
+from unittest import mock
+
+from vpp_papi.tests.test_vpp_stats import segment
+from vpp_papi.vpp_stats_exporter import StatsExporter, metric_name
+
+
+class TestStatsExporter(unittest.TestCase):
+    def setUp(self):
+        self.seg = segment()
+        self.stats = self.seg.stats()
+
+    def set_rx(self, data, epoch):
+        self.seg.combined("/if/rx", data)
+        self.seg.entries[1] = self.seg.entries.pop()
+        self.seg.publish(epoch)
+        self.stats.size = len(self.seg.buf)
+
+    def test_metric_name(self):
+        self.assertEqual(metric_name("/if/rx"), "vpp_if_rx")
+        self.assertEqual(metric_name("/err/ip4-input/drops"), "vpp_err_ip4_input_drops")
+
+    def test_render(self):
+        text = StatsExporter(self.stats).render().decode()
+        lines = text.splitlines()
+        self.assertIn("# TYPE vpp_if_drops counter", lines)
+        self.assertIn('vpp_if_drops{thread="1",interface="2"} 30', lines)
+        self.assertIn('vpp_if_rx_packets{thread="0",interface="1"} 2', lines)
+        self.assertIn('vpp_if_rx_bytes{thread="1",interface="0"} 192', lines)
+        self.assertIn("vpp_sys_last_update 7.00", lines)
+        self.assertIn('vpp_if_names_info{index="1",name="pg0"} 1', lines)
+        # The interface name is taken out of the path into a label
+        self.assertIn("# TYPE vpp_interfaces_rx_packets counter", lines)
+        self.assertIn('vpp_interfaces_rx_bytes{interface="pg0",thread="1"} 256', lines)
+        # Every metric is one group, after its TYPE line
+        names = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(len(names), 7)
+
+    def test_include_exclude(self):
+        exporter = StatsExporter(self.stats, include=["^/if/"], exclude=[".*names"])
+        text = exporter.render().decode()
+        self.assertIn("vpp_if_rx_packets", text)
+        self.assertNotIn("vpp_if_names_info", text)
+        self.assertNotIn("vpp_sys_last_update", text)
+        self.assertNotIn("interfaces", text)
+
+    def test_label_patterns(self):
+        exporter = StatsExporter(
+            self.stats,
+            include=["^/if/drops$"],
+            label_patterns=[r"^/(?P<kind>[^/]+)/"],
+        )
+        text = exporter.render().decode()
+        self.assertIn('vpp_drops{kind="if",thread="0",interface="1"} 2\n', text)
+
+    def test_used_only(self):
+        self.set_rx([[(0, 0), (2, 128)], [(0, 0), (4, 256)]], 2)
+        text = StatsExporter(self.stats, include=["^/if/rx$"], used_only=True).render()
+        self.assertNotIn(b'interface="0"', text)
+        self.assertIn(b'vpp_if_rx_packets{thread="1",interface="1"} 4\n', text)
+
+    def test_incremental(self):
+        exporter = StatsExporter(self.stats)
+        body = exporter.render()
+        drops = exporter.families["/if/drops"].text
+        self.assertIs(exporter.render(), body)
+
+        self.set_rx([[(1, 64), (2, 128)], [(3, 192), (14, 1256)]], 2)
+        body = exporter.render().decode()
+        self.assertIs(exporter.families["/if/drops"].text, drops)
+        self.assertIn('vpp_if_rx_packets{thread="1",interface="1"} 14\n', body)
+        self.assertIn('vpp_interfaces_rx_bytes{interface="pg0",thread="1"} 1256', body)
+
+        # Vectors grow
+        self.set_rx([[(1, 64), (2, 128), (5, 320)], [(3, 192), (14, 1256)]], 3)
+        body = exporter.render().decode()
+        self.assertIn('vpp_if_rx_packets{thread="0",interface="2"} 5\n', body)
+
+    def test_max_age(self):
+        exporter = StatsExporter(self.stats, max_age=3600)
+        body = exporter.scrape()
+        self.set_rx([[(1, 64), (2, 128)], [(3, 192), (14, 1256)]], 2)
+        self.assertIs(exporter.scrape(), body)
+        self.assertEqual(gzip.decompress(exporter.scrape(gzipped=True)), body)
+        exporter.max_age = 0
+        self.assertIsNot(exporter.scrape(), body)
+
+    def test_read_attempts(self):
+        exporter = StatsExporter(self.stats)
+        with mock.patch.object(
+            self.stats.lock, "release", side_effect=IOError("retry")
+        ) as release:
+            with self.assertRaises(IOError):
+                exporter.render()
+        self.assertEqual(release.call_count, exporter.read_attempts)
+        self.assertIn(b"vpp_if_rx_packets", exporter.render())
+
+    def test_serve(self):
+        from http.server import ThreadingHTTPServer
+        from vpp_papi.vpp_stats_exporter import StatsExporterHandler
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StatsExporterHandler)
+        server.exporter = StatsExporter(self.stats)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:%d" % server.server_address[1]
+            with urllib.request.urlopen(url + "/metrics") as r:
+                self.assertEqual(r.status, 200)
+                self.assertIn(b"vpp_if_rx_packets", r.read())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(url + "/")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import collections
 import datetime
+import functools
 from socket import inet_pton, AF_INET6, AF_INET
 import socket
 import ipaddress
@@ -216,3 +218,283 @@ conversion_unpacker_table = {
     "vl_api_timestamp_t": lambda o: datetime.datetime.fromtimestamp(o),
     "vl_api_timedelta_t": lambda o: datetime.timedelta(seconds=o),
 }
+
+
+#
+# Direct conversions between Python objects and the wire format of the
+# address and prefix types. They skip the intermediate dicts and named
+# tuples of conversion_table and conversion_unpacker_table, and are built
+# from the type definitions on first use.
+#
+# unpack and unpack_raw take (data, offset) and return the value. Values
+# are interned, repeated addresses and prefixes share one object.
+# unpack_raw returns packed addresses as bytes and prefixes as
+# (bytes, length) tuples; it is used when unpacking with raw_addresses
+# set.
+#
+DirectConversion = collections.namedtuple(
+    "DirectConversion", ["packers", "unpack", "unpack_raw"]
+)
+
+CONVERSION_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _ip_address(packed):
+    if len(packed) == 4:
+        return ipaddress.IPv4Address(packed)
+    return ipaddress.IPv6Address(packed)
+
+
+@functools.lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _ip_network(packed, length, strict=True):
+    if len(packed) == 4:
+        return ipaddress.IPv4Network((packed, length), strict)
+    return ipaddress.IPv6Network((packed, length), strict)
+
+
+@functools.lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _ip_interface(packed, length):
+    if len(packed) == 4:
+        return ipaddress.IPv4Interface((packed, length))
+    return ipaddress.IPv6Interface((packed, length))
+
+
+def clear_conversion_cache():
+    """Drop the interned addresses and prefixes."""
+    _ip_address.cache_clear()
+    _ip_network.cache_clear()
+    _ip_interface.cache_clear()
+
+
+def _address_layout(t):
+    """Return (family size, IPv4 family, IPv6 family, IPv4 padding,
+    IPv6 padding) for a vl_api_address_t, or None if the type does not
+    have the expected layout.
+    """
+    if t.fieldtypes != ["vl_api_address_family_t", "vl_api_address_union_t"]:
+        return None
+    af, un = t.packers
+    return (
+        af.size,
+        bytes(af.pack(ADDRESS_IP4)),
+        bytes(af.pack(ADDRESS_IP6)),
+        bytes(un.size - 4),
+        bytes(un.size - 16),
+    )
+
+
+def _address_conversion(t):
+    layout = _address_layout(t)
+    if layout is None:
+        return None
+    n, af4, af6, pad4, pad6 = layout
+
+    def pack_str(s):
+        try:
+            return af6 + inet_pton(AF_INET6, s) + pad6
+        except (socket.error, OSError):
+            return af4 + inet_pton(AF_INET, s) + pad4
+
+    def unpack_raw(data, offset):
+        a = offset + n
+        af = data[offset:a]
+        if af == af6:
+            return bytes(data[a : a + 16])
+        if af == af4:
+            return bytes(data[a : a + 4])
+        return None
+
+    def unpack(data, offset):
+        b = unpack_raw(data, offset)
+        return None if b is None else _ip_address(b)
+
+    packers = {
+        "IPv4Address": lambda o: af4 + o.packed + pad4,
+        "IPv6Address": lambda o: af6 + o.packed + pad6,
+        "str": pack_str,
+    }
+    return DirectConversion(packers, unpack, unpack_raw)
+
+
+def _prefix_conversion(t, interface=False):
+    """Conversion of a vl_api_prefix_t, or of vl_api_address_with_prefix_t
+    if interface is true."""
+    if t.fieldtypes != ["vl_api_address_t", "u8"]:
+        return None
+    address = _address_conversion(t.packers[0])
+    if address is None:
+        return None
+    pack_address = address.packers
+    unpack_address = address.unpack_raw
+    length_offset = t.packers[0].size
+    pack_length = t.packers[1].pack
+
+    def unpack_raw(data, offset):
+        b = unpack_address(data, offset)
+        if b is None:
+            return None
+        return b, data[offset + length_offset]
+
+    if interface:
+
+        def unpack(data, offset):
+            b = unpack_address(data, offset)
+            if b is None:
+                return None
+            return _ip_interface(b, data[offset + length_offset])
+
+        def pack_interface(o):
+            return pack_address[o.ip.__class__.__name__](o.ip) + pack_length(
+                o.network.prefixlen
+            )
+
+        packers = {"IPv4Interface": pack_interface, "IPv6Interface": pack_interface}
+    else:
+
+        def unpack(data, offset):
+            b = unpack_address(data, offset)
+            if b is None:
+                return None
+            return _ip_network(b, data[offset + length_offset], False)
+
+        def pack_network(o):
+            a = o.network_address
+            return pack_address[a.__class__.__name__](a) + pack_length(o.prefixlen)
+
+        packers = {"IPv4Network": pack_network, "IPv6Network": pack_network}
+
+    def pack_str(s):
+        p, length = s.split("/")
+        return pack_address["str"](p) + pack_length(int(length))
+
+    packers["str"] = pack_str
+    return DirectConversion(packers, unpack, unpack_raw)
+
+
+def _ip_address_conversion(af, size):
+    def conversion(t):
+        if t.msgdef != {"type": "u8", "length": size}:
+            return None
+
+        def unpack_raw(data, offset):
+            return bytes(data[offset : offset + size])
+
+        def unpack(data, offset):
+            return _ip_address(bytes(data[offset : offset + size]))
+
+        packers = {
+            "IPv%dAddress" % (4 if af == AF_INET else 6): lambda o: o.packed,
+            "str": lambda s: inet_pton(af, s),
+        }
+        return DirectConversion(packers, unpack, unpack_raw)
+
+    return conversion
+
+
+def _ip_prefix_conversion(af, size, interface=False):
+    """Conversion of a vl_api_ip[46]_prefix_t, or of the corresponding
+    address_with_prefix type if interface is true."""
+    version = 4 if af == AF_INET else 6
+
+    def conversion(t):
+        if t.fieldtypes != ["vl_api_ip%d_address_t" % version, "u8"]:
+            return None
+        pack_length = t.packers[1].pack
+
+        def unpack_raw(data, offset):
+            return bytes(data[offset : offset + size]), data[offset + size]
+
+        if interface:
+
+            def unpack(data, offset):
+                return _ip_interface(*unpack_raw(data, offset))
+
+            packers = {
+                "IPv%dInterface"
+                % version: lambda o: o.packed + pack_length(o.network.prefixlen)
+            }
+        else:
+
+            def unpack(data, offset):
+                return _ip_network(*unpack_raw(data, offset))
+
+            packers = {
+                "IPv%dNetwork"
+                % version: lambda o: o.network_address.packed
+                + pack_length(o.prefixlen)
+            }
+
+        def pack_str(s):
+            p, length = s.split("/")
+            return inet_pton(af, p) + pack_length(int(length))
+
+        packers["str"] = pack_str
+        return DirectConversion(packers, unpack, unpack_raw)
+
+    return conversion
+
+
+def _alias_conversion(conversion):
+    """Apply a conversion of a type to an alias of it."""
+    return lambda t: conversion(t.packer)
+
+
+direct_conversion_table = {
+    "vl_api_ip4_address_t": _ip_address_conversion(AF_INET, 4),
+    "vl_api_ip6_address_t": _ip_address_conversion(AF_INET6, 16),
+    "vl_api_address_t": _address_conversion,
+    "vl_api_prefix_t": _prefix_conversion,
+    "vl_api_ip4_prefix_t": _ip_prefix_conversion(AF_INET, 4),
+    "vl_api_ip6_prefix_t": _ip_prefix_conversion(AF_INET6, 16),
+    "vl_api_address_with_prefix_t": _alias_conversion(
+        functools.partial(_prefix_conversion, interface=True)
+    ),
+    "vl_api_ip4_address_with_prefix_t": _alias_conversion(
+        _ip_prefix_conversion(AF_INET, 4, interface=True)
+    ),
+    "vl_api_ip6_address_with_prefix_t": _alias_conversion(
+        _ip_prefix_conversion(AF_INET6, 16, interface=True)
+    ),
+}
+
+
+def direct_conversion(t):
+    """Return the DirectConversion for type t, or None if there is none."""
+    try:
+        f = direct_conversion_table[t.name]
+    except KeyError:
+        return None
+    try:
+        return f(t)
+    except AttributeError:
+        # Not the expected kind of type
+        return None
+
+
+def _unformat_raw_address(o):
+    if o.af == ADDRESS_IP6:
+        return o.un.ip6
+    if o.af == ADDRESS_IP4:
+        return o.un.ip4
+    return None
+
+
+def _unformat_raw_prefix(o):
+    a = _unformat_raw_address(o.address)
+    return None if a is None else (a, o.len)
+
+
+# Unpackers used instead of conversion_unpacker_table with raw_addresses:
+# addresses are returned as packed bytes, prefixes as (bytes, length)
+raw_conversion_unpacker_table = {
+    "vl_api_ip6_address_t": lambda o: o,
+    "vl_api_ip4_address_t": lambda o: o,
+    "vl_api_ip6_prefix_t": lambda o: (o.address, o.len),
+    "vl_api_ip4_prefix_t": lambda o: (o.address, o.len),
+    "vl_api_address_t": _unformat_raw_address,
+    "vl_api_prefix_t": _unformat_raw_prefix,
+    "vl_api_address_with_prefix_t": _unformat_raw_prefix,
+    "vl_api_ip4_address_with_prefix_t": lambda o: (o.address, o.len),
+    "vl_api_ip6_address_with_prefix_t": lambda o: (o.address, o.len),
+}
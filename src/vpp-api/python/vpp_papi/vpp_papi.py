@@ -26,14 +26,19 @@ import functools
 import json
 import threading
 import fnmatch
+import hashlib
+import tempfile
 import weakref
 import atexit
 import time
+from collections.abc import MutableMapping
 import importlib.resources as resources
 
 from .vpp_format import verify_enum_hint
 from .vpp_serializer import VPPType, VPPEnumType, VPPEnumFlagType, VPPUnionType
 from .vpp_serializer import VPPMessage, vpp_get_type, VPPTypeAlias
+from .vpp_serializer import vpp_add_lazy_type
+from .vpp_papi_metrics import HOOKS, VPPApiMetrics
 
 try:
     import VppTransport
@@ -120,11 +125,34 @@ class VppApiDynamicMethodHolder:
     pass
 
 
+class VppApiLazyMethodHolder(VppApiDynamicMethodHolder):
+    """Creates the function for an API message on first access."""
+
+    def __init__(self, vpp, do_async):
+        self._vpp = vpp
+        self._do_async = do_async
+
+    def __getattr__(self, name):
+        vpp = self._vpp
+        msgname = name
+        if name not in vpp.services and name.endswith("_pack"):
+            msgname = name[: -len("_pack")]
+        if msgname not in vpp.services or msgname not in vpp.messages:
+            raise AttributeError(name)
+        i = vpp.transport.get_msg_index(msgname + "_" + vpp.messages.crc(msgname)[2:])
+        if i <= 0:
+            raise AttributeError(name)
+        vpp._register_function(msgname, i, self._do_async)
+        return self.__dict__[name]
+
+
 class FuncWrapper:
     def __init__(self, func):
         self._func = func
         self.__name__ = func.__name__
         self.__doc__ = func.__doc__
+        if hasattr(func, "iter"):
+            self.iter = func.iter
 
     def __call__(self, **kwargs):
         return self._func(**kwargs)
@@ -133,6 +161,10 @@ class FuncWrapper:
         return "<FuncWrapper(func=<%s(%s)>)>" % (self.__name__, self.__doc__)
 
 
+# Bumped whenever the layout of the API definition cache changes
+API_CACHE_VERSION = 2
+
+
 class VPPApiError(Exception):
     pass
 
@@ -153,6 +185,310 @@ class VPPValueError(ValueError):
     pass
 
 
+class VPPApiBatch:
+    """Pipelined execution of a batch of API requests.
+
+    Requests are queued through the api attribute, mirroring
+    VPPApiClient.api, and sent back-to-back with distinct contexts when
+    the batch is executed. At most window requests are outstanding at any
+    time. Replies are matched by context and returned in request order.
+
+        with vpp.batch() as b:
+            for r in routes:
+                b.api.ip_route_add_del(is_add=True, route=r)
+        failed = [r for r in b.results if r.retval != 0]
+
+    Runs of requests that differ only in a few fields are better added
+    with add_columns(), which packs them without building a dict for
+    each request.
+
+    Streaming (dump) services are not supported.
+    """
+
+    class _Api:
+        def __init__(self, batch):
+            self._batch = batch
+
+        def __getattr__(self, name):
+            return functools.partial(self._batch.add, name)
+
+    def __init__(self, vpp, window=256):
+        self.vpp = vpp
+        self.window = window
+        self.api = self._Api(self)
+        self.requests = []
+        self.count = 0
+        self.results = None
+        self.unanswered = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return self.count
+
+    def _msgdef(self, name, kwargs):
+        """Return the definition of message name, filling in its header."""
+        vpp = self.vpp
+        try:
+            msgdef = vpp.messages[name]
+            service = vpp.services[name]
+        except KeyError:
+            raise VPPValueError("No such API function {}".format(name))
+        if vpp.compile_codecs:
+            msgdef = msgdef.compiled()
+        if "stream" in service:
+            raise VPPValueError("Streaming service {} cannot be batched".format(name))
+        i = vpp.transport.get_msg_index(name + "_" + msgdef.crc[2:])
+        if i <= 0:
+            raise VPPValueError("Message {} not supported by VPP".format(name))
+        kwargs["_vl_msg_id"] = i
+        try:
+            if vpp.transport.socket_index:
+                kwargs["client_index"] = vpp.transport.socket_index
+        except AttributeError:
+            pass
+        vpp.validate_args(msgdef, kwargs)
+        return msgdef
+
+    def add(self, name, **kwargs):
+        """Queue a request, returns its position in the batch."""
+        msgdef = self._msgdef(name, kwargs)
+        self.requests.append((msgdef, kwargs))
+        self.count += 1
+        return self.count - 1
+
+    def add_columns(self, name, columns, **kwargs):
+        """Queue one request for each row of columns.
+
+        columns maps field paths to sequences of values, one per request,
+        and the keyword arguments give the fields shared by all requests;
+        see VPPType.pack_columns(). The requests get consecutive contexts.
+        Returns the range of their positions in the batch.
+
+            b.add_columns(
+                "ip_route_add_del",
+                {"route.prefix": prefixes, "route.paths.0.sw_if_index": ifs},
+                is_add=True,
+                route={"n_paths": 1, "paths": [{"proto": 0}]},
+            )
+        """
+        msgdef = self._msgdef(name, kwargs)
+        count = len(next(iter(columns.values()), ()))
+        if count == 0:
+            return range(self.count, self.count)
+        first = self.vpp.get_context.reserve(count)
+        columns = dict(columns, context=range(first, first + count))
+        buf = msgdef.pack_columns(columns, kwargs)
+        self.requests.append((None, (memoryview(buf), first, count)))
+        self.count += count
+        return range(self.count - count, self.count)
+
+    @property
+    def retvals(self):
+        """Return values of the replies, in request order."""
+        return [r.retval for r in self.results]
+
+    def execute(self, timeout=None):
+        """Send all queued requests and collect their replies.
+
+        Returns the list of replies in request order. Raises VPPValueError
+        if two requests have the same context.
+
+        Raises VPPIOError if a reply is not received within the timeout.
+        Only the requests not sent yet are then kept in the batch, to be
+        sent by the next execute(). results holds the replies received,
+        None for the others, and unanswered the positions of the requests
+        which were sent without a reply: VPP may have applied them.
+        """
+        vpp = self.vpp
+        vpp._check_not_streaming()
+        contexts = {}
+        bufs = []
+
+        def add_context(context):
+            if context in contexts:
+                raise VPPValueError("Duplicate context {} in batch".format(context))
+            contexts[context] = len(bufs)
+
+        for msgdef, kwargs in self.requests:
+            if msgdef is None:
+                # Packed by add_columns()
+                buf, first, count = kwargs
+                size = len(buf) // count
+                for i in range(count):
+                    add_context(first + i)
+                    bufs.append(buf[i * size : (i + 1) * size])
+                continue
+            if "context" not in kwargs:
+                kwargs["context"] = vpp.get_context()
+            add_context(kwargs["context"])
+            bufs.append(msgdef.pack(kwargs))
+        results = [None] * len(bufs)
+        window = max(self.window, 1)
+        sent = 0
+        outstanding = 0
+
+        write_many = getattr(vpp.transport, "write_many", None)
+        if write_many is None:
+
+            def write_many(chunk):
+                for buf in chunk:
+                    vpp.transport.write(buf)
+
+        vpp.transport.suspend()
+        try:
+            while sent < len(bufs) or outstanding:
+                # Refill the window once half of it has been answered
+                if sent < len(bufs) and outstanding <= window // 2:
+                    chunk = bufs[sent : sent + window - outstanding]
+                    write_many(chunk)
+                    sent += len(chunk)
+                    outstanding += len(chunk)
+                r = vpp.read_blocking(timeout=timeout)
+                if r is None:
+                    raise VPPIOError(2, "VPP API client: read failed")
+                n = contexts.pop(getattr(r, "context", 0), None)
+                if n is None:
+                    # Message being queued
+                    vpp.message_queue.put_nowait(r)
+                    continue
+                results[n] = r
+                outstanding -= 1
+        except BaseException:
+            self.results = results
+            self.unanswered = [n for n in range(sent) if results[n] is None]
+            self._keep_unsent(sent)
+            raise
+        finally:
+            vpp.transport.resume()
+
+        self.requests = []
+        self.count = 0
+        self.results = results
+        self.unanswered = []
+        return results
+
+    def _keep_unsent(self, sent):
+        """Drop the first sent requests from the batch."""
+        requests = []
+        position = 0
+        for msgdef, kwargs in self.requests:
+            if msgdef is None:
+                buf, first, count = kwargs
+                skip = min(max(sent - position, 0), count)
+                if skip < count:
+                    size = len(buf) // count
+                    requests.append(
+                        (None, (buf[skip * size :], first + skip, count - skip))
+                    )
+                position += count
+                continue
+            if position >= sent:
+                requests.append((msgdef, kwargs))
+            position += 1
+        self.requests = requests
+        self.count = max(self.count - sent, 0)
+
+
+class VPPApiStream:
+    """Iterator over the details of a dump, yielded as they arrive.
+
+    Once exhausted, reply holds the final reply message of services that
+    have one. Closing the stream early, or leaving a with block, discards
+    the remaining details.
+
+    Other calls on the client raise VPPRuntimeError while the stream is
+    open, as their replies would be read in among the details. Once the
+    transport has max_queued details waiting, VPP is held back until the
+    stream is read further.
+    """
+
+    def __init__(self, gen):
+        self._gen = gen
+        self.reply = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._gen)
+        except StopIteration as e:
+            self.reply = e.value
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the stream, discarding any details not yet read."""
+        self._gen.close()
+
+
+class VPPMessages(MutableMapping):
+    """Message definitions by name, constructed on first access.
+
+    The definitions are kept in their JSON form until a message is looked
+    up, at which point the VPPMessage (and any types it refers to) is
+    created.
+    """
+
+    def __init__(self, msgdefs=()):
+        self._messages = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        for m in msgdefs:
+            self._pending[m[0]] = m
+
+    def __getitem__(self, name):
+        try:
+            return self._messages[name]
+        except KeyError:
+            pass
+        with self._lock:
+            # Another thread may have constructed it meanwhile
+            if name in self._messages:
+                return self._messages[name]
+            m = self._pending[name]
+            msg = self._messages[name] = VPPMessage(m[0], m[1:])
+            del self._pending[name]
+        return msg
+
+    def __setitem__(self, name, msg):
+        self._pending.pop(name, None)
+        self._messages[name] = msg
+
+    def __delitem__(self, name):
+        if self._pending.pop(name, None) is None:
+            del self._messages[name]
+
+    def __contains__(self, name):
+        return name in self._messages or name in self._pending
+
+    def __iter__(self):
+        return iter(list(self._messages) + list(self._pending))
+
+    def __len__(self):
+        return len(self._messages) + len(self._pending)
+
+    def crc(self, name):
+        """Return the CRC of a message without constructing it."""
+        if name in self._messages:
+            return self._messages[name].crc
+        for f in self._pending[name]:
+            if type(f) is dict and "crc" in f:
+                return f["crc"]
+        raise VPPValueError("Message {} has no CRC".format(name))
+
+
 class VPPApiJSONFiles:
     @classmethod
     def find_api_dir(cls, dirs=[]):
@@ -303,10 +639,9 @@ class VPPApiJSONFiles:
         return messages, services
 
     @staticmethod
-    def _process_json(api):  # -> Tuple[Dict, Dict]
+    def _json_definitions(api):  # -> Tuple[Dict, List, Dict]
         types = {}
         services = {}
-        messages = {}
         try:
             for t in api["enums"]:
                 t[0] = "vl_api_" + t[0] + "_t"
@@ -344,6 +679,11 @@ class VPPApiJSONFiles:
         except KeyError:
             pass
 
+        return types, api.get("messages", []), services
+
+    @staticmethod
+    def _process_definitions(types, msgdefs):  # -> Dict
+        messages = {}
         i = 0
         while True:
             unresolved = {}
@@ -382,18 +722,137 @@ class VPPApiJSONFiles:
                 raise VPPValueError("Unresolved type definitions {}".format(unresolved))
             types = unresolved
             i += 1
-        try:
-            for m in api["messages"]:
-                try:
-                    messages[m[0]] = VPPMessage(m[0], m[1:])
-                except VPPNotImplementedError:
-                    logger.error("Not implemented error for {}".format(m[0]))
-        except KeyError:
-            pass
+        for m in msgdefs:
+            try:
+                messages[m[0]] = VPPMessage(m[0], m[1:])
+            except VPPNotImplementedError:
+                logger.error("Not implemented error for {}".format(m[0]))
+        return messages
+
+    @staticmethod
+    def _process_json(api):  # -> Tuple[Dict, Dict]
+        types, msgdefs, services = VPPApiJSONFiles._json_definitions(api)
+        messages = VPPApiJSONFiles._process_definitions(types, msgdefs)
         return messages, services
 
     @staticmethod
-    def load_api(apifiles=None, apidir=None):
+    def _sort_definitions(types):
+        """Order type definitions so that every type follows the types
+        its fields refer to, allowing them to be created in a single pass.
+        """
+        ordered = {}
+
+        def visit(name, v):
+            ordered[name] = None
+            t = v["data"]
+            if v["type"] == "alias":
+                deps = [t["type"]]
+            elif v["type"] == "enum":
+                deps = []
+            else:
+                deps = [f[0] for f in t[1:] if isinstance(f, list)]
+            for d in deps:
+                if d in types and d not in ordered:
+                    visit(d, types[d])
+            # Re-insert after the dependencies
+            del ordered[name]
+            ordered[name] = v
+
+        for k, v in types.items():
+            if k not in ordered:
+                visit(k, v)
+        return ordered
+
+    @staticmethod
+    def _api_files_stamp(apifiles):
+        stamp = []
+        for f in sorted(apifiles):
+            st = os.stat(f)
+            stamp.append([f, st.st_mtime_ns, st.st_size])
+        return stamp
+
+    @staticmethod
+    def _api_cache_file(cache_dir, stamp):
+        key = "\0".join(f for f, _, _ in stamp)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(cache_dir, "vpp_papi-%s.json" % digest)
+
+    @staticmethod
+    def _load_api_cache(cache_file, stamp):
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug("Ignoring API cache %s: %s", cache_file, e)
+            return None
+        if (
+            not isinstance(cache, dict)
+            or cache.get("version") != API_CACHE_VERSION
+            or cache.get("stamp") != stamp
+        ):
+            return None
+        return cache
+
+    @staticmethod
+    def _save_api_cache(cache_file, cache):
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            logger.debug("Failed to write API cache %s: %s", cache_file, e)
+
+    @staticmethod
+    def _merged_definitions(apifiles, cache_dir=None):
+        """Merge the type, message and service tables of all files, with
+        the types ordered by dependency. If cache_dir is given the result
+        is stored there and reused as long as the set of files, their
+        sizes and modification times are unchanged.
+        """
+        stamp = VPPApiJSONFiles._api_files_stamp(apifiles)
+        if cache_dir:
+            cache_file = VPPApiJSONFiles._api_cache_file(cache_dir, stamp)
+            cache = VPPApiJSONFiles._load_api_cache(cache_file, stamp)
+            if cache is not None:
+                return cache
+
+        types = {}
+        msgdefs = []
+        services = {}
+        for file in apifiles:
+            with open(file) as apidef_file:
+                api = json.load(apidef_file)
+            t, m, s = VPPApiJSONFiles._json_definitions(api)
+            for k, v in t.items():
+                types.setdefault(k, v)
+            msgdefs += m
+            services.update(s)
+        cache = {
+            "version": API_CACHE_VERSION,
+            "stamp": stamp,
+            "types": VPPApiJSONFiles._sort_definitions(types),
+            "messages": msgdefs,
+            "services": services,
+        }
+        if cache_dir:
+            VPPApiJSONFiles._save_api_cache(cache_file, cache)
+        return cache
+
+    @staticmethod
+    def load_api(apifiles=None, apidir=None, cache_dir=None, lazy=False):
+        """Load API definitions from apifiles, or from the files found in
+        apidir.
+
+        If cache_dir is given the parsed definitions are cached there. If
+        lazy is true, types and messages are only constructed on first
+        use and the returned messages are a VPPMessages mapping.
+
+        :returns: Tuple of API files, messages and services.
+        """
         messages = {}
         services = {}
         if not apifiles:
@@ -408,6 +867,18 @@ class VPPApiJSONFiles:
             except (RuntimeError, VPPApiError):
                 raise VPPRuntimeError
 
+        if cache_dir or lazy:
+            d = VPPApiJSONFiles._merged_definitions(apifiles, cache_dir)
+            if lazy:
+                for k, v in d["types"].items():
+                    vpp_add_lazy_type(k, v["type"], v["data"])
+                messages = VPPMessages(d["messages"])
+            else:
+                messages = VPPApiJSONFiles._process_definitions(
+                    d["types"], d["messages"]
+                )
+            return apifiles, messages, d["services"]
+
         for file in apifiles:
             with open(file) as apidef_file:
                 m, s = VPPApiJSONFiles.process_json_file(apidef_file)
@@ -449,6 +920,12 @@ class VPPApiClient:
         use_socket=True,
         server_address="/run/vpp/api.sock",
         bootstrapapi=False,
+        compile_codecs=False,
+        api_cache_dir=None,
+        lazy=False,
+        message_views=False,
+        raw_addresses=False,
+        metrics=False,
     ):
         """Create a VPP API object.
 
@@ -461,6 +938,33 @@ class VPPApiClient:
         logger, if supplied, is the logging logger object to log to.
         loglevel, if supplied, is the log level this logger is set
         to report at (from the loglevels in the logging module).
+
+        compile_codecs, if true, uses precompiled pack/unpack codecs
+        (see VPPType.compiled()) for the messages known to VPP. They are
+        kept in the tables of this client only; other clients, which
+        share the message and type definitions, are not affected.
+
+        api_cache_dir, if supplied, is a directory in which the parsed
+        API definitions are cached between runs. It defaults to the value
+        of VPP_API_CACHE_DIR in the environment, if set.
+
+        lazy, if true, keeps message and type definitions in their JSON
+        form until first use: a message is constructed when its function
+        is first accessed through the api attribute or when it is first
+        received from VPP.
+
+        message_views, if true, returns received messages as lazy views
+        (see VPPType.view()) that decode each field on first access,
+        rather than as fully decoded named tuples. This saves time when
+        only a few fields of large or numerous replies are used.
+
+        raw_addresses, if true, returns the addresses in received messages
+        as packed bytes and prefixes as (bytes, length) tuples rather than
+        as ipaddress objects, which is considerably cheaper for large
+        dumps of callers that only compare or hash them.
+
+        metrics, if true, enables latency histograms of API calls; see
+        enable_metrics().
         """
         if logger is None:
             logger = logging.getLogger(
@@ -475,8 +979,14 @@ class VPPApiClient:
         self.id_names = []
         self.id_msgdef = []
         self.header = VPPType("header", [["u16", "msgid"], ["u32", "client_index"]])
+        self.compile_codecs = compile_codecs
+        self.message_views = message_views
+        self.raw_addresses = raw_addresses
         self.apifiles = []
         self.apidir = apidir
+        if api_cache_dir is None:
+            api_cache_dir = os.getenv("VPP_API_CACHE_DIR")
+        self.api_cache_dir = api_cache_dir
         self.event_callback = None
         self.message_queue = queue.Queue()
         self.read_timeout = read_timeout
@@ -486,7 +996,10 @@ class VPPApiClient:
         self.server_address = server_address
         self._apifiles = apifiles
         self.stats = {}
+        self.metrics = VPPApiMetrics() if metrics else None
         self.bootstrapapi = bootstrapapi
+        # Whether a VPPApiStream is reading details
+        self.streaming = False
 
         if not bootstrapapi:
             if self.apidir is None and hasattr(self.__class__, "apidir"):
@@ -494,7 +1007,7 @@ class VPPApiClient:
                 self.apidir = self.__class__.apidir
             try:
                 self.apifiles, self.messages, self.services = VPPApiJSONFiles.load_api(
-                    apifiles, self.apidir
+                    apifiles, self.apidir, cache_dir=self.api_cache_dir, lazy=lazy
                 )
             except VPPRuntimeError as e:
                 if testmode:
@@ -542,6 +1055,16 @@ class VPPApiClient:
                 self.context.value += 1
                 return self.context.value
 
+        def reserve(self, n):
+            """Get the first of n consecutive new contexts."""
+            with self.lock:
+                if self.context.value + n > 0xFFFFFFFF:
+                    # Wrap around early, keeping the block contiguous
+                    self.context.value = 0
+                first = self.context.value + 1
+                self.context.value += n
+                return first
+
     get_context = ContextId()
 
     def get_type(self, name):
@@ -564,6 +1087,13 @@ class VPPApiClient:
             def f(**kwargs):
                 return self._call_vpp(i, msg, multipart, **kwargs)
 
+            if "stream" in multipart:
+
+                def f_iter(**kwargs):
+                    return self._call_vpp_iter(i, msg, multipart, **kwargs)
+
+                f.iter = f_iter
+
         f.__name__ = str(msg.name)
         f.__doc__ = ", ".join(
             ["%s %s" % (msg.fieldtypes[j], k) for j, k in enumerate(msg.fields)]
@@ -579,26 +1109,56 @@ class VPPApiClient:
         f.msg = msg
         return f
 
+    def _register_function(self, name, i, do_async):
+        msg = self.messages[name]
+        if self.compile_codecs:
+            msg = msg.compiled()
+        self.id_msgdef[i] = msg
+        self.id_names[i] = name
+
+        # Create function for client side messages.
+        if name in self.services:
+            f = self.make_function(msg, i, self.services[name], do_async)
+            f_pack = self.make_pack_function(msg, i, self.services[name])
+            setattr(self._api, name, FuncWrapper(f))
+            setattr(self._api, name + "_pack", FuncWrapper(f_pack))
+
     def _register_functions(self, do_async=False):
         self.id_names = [None] * (self.vpp_dictionary_maxid + 1)
         self.id_msgdef = [None] * (self.vpp_dictionary_maxid + 1)
+        if isinstance(self.messages, VPPMessages):
+            # Messages and functions are created on first use
+            self._api = VppApiLazyMethodHolder(self, do_async)
+            for name in self.messages:
+                n = name + "_" + self.messages.crc(name)[2:]
+                i = self.transport.get_msg_index(n)
+                if i > 0:
+                    self.id_names[i] = name
+                else:
+                    self.logger.debug(
+                        "No such message type or failed CRC checksum: %s", n
+                    )
+            return
+
         self._api = VppApiDynamicMethodHolder()
         for name, msg in self.messages.items():
             n = name + "_" + msg.crc[2:]
             i = self.transport.get_msg_index(n)
             if i > 0:
-                self.id_msgdef[i] = msg
-                self.id_names[i] = name
-
-                # Create function for client side messages.
-                if name in self.services:
-                    f = self.make_function(msg, i, self.services[name], do_async)
-                    f_pack = self.make_pack_function(msg, i, self.services[name])
-                    setattr(self._api, name, FuncWrapper(f))
-                    setattr(self._api, name + "_pack", FuncWrapper(f_pack))
+                self._register_function(name, i, do_async)
             else:
                 self.logger.debug("No such message type or failed CRC checksum: %s", n)
 
+    def _get_msgdef(self, i):
+        msgobj = self.id_msgdef[i]
+        if msgobj is None and self.id_names[i] is not None:
+            # Message not constructed yet (lazy mode)
+            msgobj = self.messages[self.id_names[i]]
+            if self.compile_codecs:
+                msgobj = msgobj.compiled()
+            self.id_msgdef[i] = msgobj
+        return msgobj
+
     def get_api_definitions(self):
         """get_api_definition. Bootstrap from the embedded memclnt.api.json file."""
 
@@ -669,6 +1229,9 @@ class VPPApiClient:
 
     def disconnect(self):
         """Detach from VPP."""
+        # Any open stream is abandoned, details still arriving for it are
+        # skipped while waiting for the reply to the delete
+        self.streaming = False
         rv = self.transport.disconnect()
         if self.event_thread is not None:
             self.message_queue.put("terminate event thread")
@@ -712,7 +1275,7 @@ class VPPApiClient:
         #
         # Decode message and returns a tuple.
         #
-        msgobj = self.id_msgdef[i]
+        msgobj = self._get_msgdef(i)
         if "context" in msgobj.field_by_name and context >= 0:
             return True
         return False
@@ -729,11 +1292,15 @@ class VPPApiClient:
         #
         # Decode message and returns a tuple.
         #
-        msgobj = self.id_msgdef[i]
+        msgobj = self._get_msgdef(i)
         if not msgobj:
             raise VPPIOError(2, "Reply message undefined")
 
-        r, size = msgobj.unpack(msg, ntc=no_type_conversion)
+        if self.message_views:
+            return msgobj.view(msg, 0, no_type_conversion, self.raw_addresses)
+        r, size = msgobj.unpack(
+            msg, ntc=no_type_conversion, raw_addresses=self.raw_addresses
+        )
         return r
 
     def msg_handler_async(self, msg):
@@ -780,6 +1347,45 @@ class VPPApiClient:
             )
         return s
 
+    def enable_metrics(self):
+        """Start timing API calls, returning the VPPApiMetrics.
+
+        Each call made through the api attribute is then timed in its
+        pack, write, wait and decode phases. Calls are not timed while
+        metrics are disabled, which is the default.
+        """
+        if self.metrics is None:
+            self.metrics = VPPApiMetrics()
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stop timing API calls, dropping the metrics and hooks."""
+        self.metrics = None
+
+    def register_hook(self, event, callback):
+        """Call callback on every request or reply of an API call.
+
+        event is "before_send", for callback(name, buf) with the message
+        name and packed request, or "after_recv", for callback(msg, buf)
+        with each decoded message and its bytes. Enables metrics.
+        """
+        if event not in HOOKS:
+            raise VPPValueError("No such hook {}".format(event))
+        self.enable_metrics().add_hook(event, callback)
+
+    def get_metrics(self):
+        """Return the metrics of API calls as a dict.
+
+        Per message and phase latency histograms are under "messages";
+        see VPPApiMetrics.as_dict(). "queue_depth" is the number of
+        messages waiting in the message queue.
+        """
+        if self.metrics is None:
+            raise VPPApiError("Metrics are not enabled")
+        d = self.metrics.as_dict()
+        d["queue_depth"] = self.message_queue.qsize()
+        return d
+
     def get_field_options(self, msg, fld_name):
         # when there is an option, the msgdef has 3 elements.
         # ['u32', 'ring_size', {'default': 1024}]
@@ -787,22 +1393,15 @@ class VPPApiClient:
             if isinstance(_def, list) and len(_def) == 3 and _def[1] == fld_name:
                 return _def[2]
 
-    def _call_vpp(self, i, msgdef, service, **kwargs):
-        """Given a message, send the message and await a reply.
-
-        msgdef - the message packing definition
-        i - the message type index
-        multipart - True if the message returns multiple
-        messages in return.
-        context - context number - chosen at random if not
-        supplied.
-        The remainder of the kwargs are the arguments to the API call.
+    def _check_not_streaming(self):
+        if self.streaming:
+            raise VPPRuntimeError(
+                "VPP API client: call made while a stream is open, close it first"
+            )
 
-        The return value is the message or message array containing
-        the response.  It will raise an IOError exception if there was
-        no response within the timeout window.
-        """
-        ts = time.time()
+    def _send_request(self, i, msgdef, kwargs, timer=None):
+        """Pack and send a request, returning its context."""
+        self._check_not_streaming()
         if "context" not in kwargs:
             context = self.get_context()
             kwargs["context"] = context
@@ -810,9 +1409,6 @@ class VPPApiClient:
             context = kwargs["context"]
         kwargs["_vl_msg_id"] = i
 
-        no_type_conversion = kwargs.pop("_no_type_conversion", False)
-        timeout = kwargs.pop("_timeout", None)
-
         try:
             if self.transport.socket_index:
                 kwargs["client_index"] = self.transport.socket_index
@@ -825,38 +1421,74 @@ class VPPApiClient:
         )
         self.logger.debug(s)
 
+        if timer is not None:
+            timer.send(msgdef, kwargs, self.transport)
+            return context
         b = msgdef.pack(kwargs)
         self.transport.suspend()
 
         self.transport.write(b)
+        return context
+
+    def _stream_replies(self, service, context):
+        """Return the reply, details message name and style of a dump."""
+        if "stream_msg" in service:
+            # New service['reply'] = _reply and service['stream_message'] = _details
+            return service["reply"], service["stream_msg"], True
+        # Old  service['reply'] = _details
+        # Send a ping after the request - we use its response
+        # to detect that we have seen all results.
+        self._control_ping(context)
+        return "control_ping_reply", service["reply"], False
+
+    def _read_reply(self, context, no_type_conversion, timeout, timer=None):
+        """Block until a message for context arrives, queueing any others."""
+        while True:
+            if timer is None:
+                r = self.read_blocking(no_type_conversion, timeout)
+            else:
+                r = timer.read(self, no_type_conversion, timeout)
+            if r is None:
+                raise VPPIOError(2, "VPP API client: read failed")
+            if not getattr(r, "context", 0) or r.context != context:
+                # Message being queued
+                self.message_queue.put_nowait(r)
+                if timer is not None:
+                    timer.metrics.queued(self.message_queue.qsize())
+                continue
+            return r
+
+    def _call_vpp(self, i, msgdef, service, **kwargs):
+        """Given a message, send the message and await a reply.
+
+        msgdef - the message packing definition
+        i - the message type index
+        multipart - True if the message returns multiple
+        messages in return.
+        context - context number - chosen at random if not
+        supplied.
+        The remainder of the kwargs are the arguments to the API call.
+
+        The return value is the message or message array containing
+        the response.  It will raise an IOError exception if there was
+        no response within the timeout window.
+        """
+        ts = time.time()
+        no_type_conversion = kwargs.pop("_no_type_conversion", False)
+        timeout = kwargs.pop("_timeout", None)
+        timer = self.metrics.call(msgdef.name) if self.metrics else None
+        context = self._send_request(i, msgdef, kwargs, timer)
 
         msgreply = service["reply"]
         stream = True if "stream" in service else False
         if stream:
-            if "stream_msg" in service:
-                # New service['reply'] = _reply and service['stream_message'] = _details
-                stream_message = service["stream_msg"]
-                modern = True
-            else:
-                # Old  service['reply'] = _details
-                stream_message = msgreply
-                msgreply = "control_ping_reply"
-                modern = False
-                # Send a ping after the request - we use its response
-                # to detect that we have seen all results.
-                self._control_ping(context)
+            msgreply, stream_message, modern = self._stream_replies(service, context)
 
         # Block until we get a reply.
         rl = []
         while True:
-            r = self.read_blocking(no_type_conversion, timeout)
-            if r is None:
-                raise VPPIOError(2, "VPP API client: read failed")
+            r = self._read_reply(context, no_type_conversion, timeout, timer)
             msgname = type(r).__name__
-            if context not in r or r.context == 0 or context != r.context:
-                # Message being queued
-                self.message_queue.put_nowait(r)
-                continue
             if msgname != msgreply and (stream and (msgname != stream_message)):
                 print("REPLY MISMATCH", msgreply, msgname, stream_message, stream)
             if not stream:
@@ -877,8 +1509,55 @@ class VPPApiClient:
         self.logger.debug(s)
         te = time.time()
         self._add_stat(msgdef.name, (te - ts) * 1000)
+        if timer is not None:
+            timer.done()
         return rl
 
+    def _call_vpp_iter(self, i, msgdef, service, **kwargs):
+        """Send a dump request and return a VPPApiStream of its details."""
+        ts = time.time()
+        no_type_conversion = kwargs.pop("_no_type_conversion", False)
+        timeout = kwargs.pop("_timeout", None)
+        timer = self.metrics.call(msgdef.name) if self.metrics else None
+        context = self._send_request(i, msgdef, kwargs, timer)
+        msgreply, _, modern = self._stream_replies(service, context)
+        gen = self._stream_details(
+            msgdef, ts, context, msgreply, modern, no_type_conversion, timeout, timer
+        )
+        # Run up to the first yield, so that closing always drains the stream
+        next(gen)
+        return VPPApiStream(gen)
+
+    def _stream_details(
+        self, msgdef, ts, context, msgreply, modern, no_type_conversion, timeout, timer
+    ):
+        """Yield the details of a sent dump request as they arrive.
+
+        Returns the final reply message for services that have one. When
+        closed early the rest of the details are read and discarded, so
+        the connection can be used again straight away.
+        """
+        self.streaming = True
+        try:
+            yield
+            while True:
+                r = self._read_reply(context, no_type_conversion, timeout, timer)
+                if type(r).__name__ == msgreply:
+                    return r if modern else None
+                yield r
+        except GeneratorExit:
+            while True:
+                r = self._read_reply(context, no_type_conversion, timeout, timer)
+                if type(r).__name__ == msgreply:
+                    raise
+        finally:
+            self.streaming = False
+            self.transport.resume()
+            te = time.time()
+            self._add_stat(msgdef.name, (te - ts) * 1000)
+            if timer is not None:
+                timer.done()
+
     def _call_vpp_async(self, i, msg, **kwargs):
         """Given a message, send the message and return the context.
 
@@ -892,6 +1571,7 @@ class VPPApiClient:
         The returned context will help with assigning which call
         the reply belongs to.
         """
+        self._check_not_streaming()
         if "context" not in kwargs:
             context = self.get_context()
             kwargs["context"] = context
@@ -1019,13 +1699,27 @@ class VPPApiClient:
             )
         )
 
+    def batch(self, window=256):
+        """Return a VPPApiBatch for pipelined execution of requests."""
+        return VPPApiBatch(self, window)
+
     def details_iter(self, f, **kwargs):
+        """Yield all details of a cursor based _get call.
+
+        The call is repeated with the returned cursor for as long as VPP
+        has more to send. Functions from the api namespace are streamed,
+        yielding details as they are received.
+        """
         cursor = 0
         while True:
             kwargs["cursor"] = cursor
-            rv, details = f(**kwargs)
-            for d in details:
-                yield d
+            if hasattr(f, "iter"):
+                details = f.iter(**kwargs)
+                yield from details
+                rv = details.reply
+            else:
+                rv, details = f(**kwargs)
+                yield from details
             if rv.retval == 0 or rv.retval != -165:
                 break
             cursor = rv.cursor
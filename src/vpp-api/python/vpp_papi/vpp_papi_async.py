@@ -278,6 +278,7 @@ class VPPApiClient:
         loglevel=None,
         read_timeout=5,
         server_address="/run/vpp/api.sock",
+        max_in_flight=None,
     ):
         """Create a VPP API object.
 
@@ -290,6 +291,9 @@ class VPPApiClient:
         logger, if supplied, is the logging logger object to log to.
         loglevel, if supplied, is the log level this logger is set
         to report at (from the loglevels in the logging module).
+        max_in_flight, if supplied, is the maximum number of requests
+        sent to VPP and not yet answered. Further requests wait in the
+        client until replies come back.
         """
         if logger is None:
             logger = logging.getLogger(
@@ -312,6 +316,9 @@ class VPPApiClient:
         self.connected = False
         self.message_table = {}
         self.header_struct = struct.Struct(">QII")
+        self.max_in_flight = max_in_flight
+        self.window = None
+        self.rbuf = b""
 
         # Bootstrap the API (memclnt.api bundled with VPP PAPI)
         with resources.open_text("vpp_papi.data", "memclnt.api.json") as f:
@@ -455,6 +462,9 @@ class VPPApiClient:
 
         # self.worker_task = asyncio.create_task(self.message_handler(event_queue))
         requests = {}
+        self.rbuf = b""
+        if self.max_in_flight:
+            self.window = asyncio.Semaphore(self.max_in_flight)
         self.queue_task = asyncio.create_task(self.queue_worker(requests))
         self.socket_task = asyncio.create_task(
             self.socket_reader(requests, event_queue)
@@ -583,58 +593,91 @@ class VPPApiClient:
                 return _def[2]
 
     async def queue_worker(self, requests):
-        """Process items from an asyncio.Queue."""
+        """Process items from an asyncio.Queue.
+
+        All items queued by the time the worker runs are written to the
+        socket together. With max_in_flight set, the worker waits for
+        replies before sending more requests.
+        """
         queue = self.message_queue
         while True:
             item = await queue.get()
-            if item is None:  # Stop signal
-                logger.debug("Stopping queue worker...")
-                return
-            if item.context not in requests:
-                requests[item.context] = (
-                    item.future,
-                    item.details_msg,
-                    item.eof_stream,
-                    [],
-                )
-            await self._write(item.b)
-            queue.task_done()
+            batch = []
+            while True:
+                if item is None:  # Stop signal
+                    logger.debug("Stopping queue worker...")
+                    await self._write_many(batch)
+                    return
+                if item.future is not None and self.window is not None:
+                    if self.window.locked():
+                        await self._write_many(batch)
+                        batch = []
+                    await self.window.acquire()
+                if item.context not in requests:
+                    requests[item.context] = (
+                        item.future,
+                        item.details_msg,
+                        item.eof_stream,
+                        [],
+                    )
+                batch.append(item.b)
+                queue.task_done()
+                if queue.empty():
+                    break
+                item = queue.get_nowait()
+            await self._write_many(batch)
+
+    def _request_done(self, requests, context):
+        """Forget a completed request and open the window for another."""
+        del requests[context]
+        if self.window is not None:
+            self.window.release()
 
     async def socket_reader(self, requests, event_queue):
         """Read data from the socket asynchronously and match requests."""
         while True:
             try:
-                # Await a line of data from the socket
-                item = await self._read()
-                if not item:
+                msgs = await self._read_messages()
+                if msgs is None:
                     logger.error("Socket closed.")
                     break
-
-                # self.message_queue.task_done()
-                msgname = type(item).__name__
-                logger.debug(f"socket reader: {msgname} {item.context}")
-                try:
-                    req = requests[item.context]
-                    if req[1]:  # stream
-                        logger.debug(f"Streaming message {msgname}: {req[1]} {req[2]}")
-                        if msgname == req[1]:
-                            req[0].set_result((item, req[3]))
-                            del requests[item.context]
-                            continue
-                        elif msgname == req[2] or req[2] is None:
-                            req[3].append(item)
-                        else:
-                            raise VPPIOError(1, f"Unexpected message {msgname}")
-                    else:
-                        req[0].set_result(item)
-                        del requests[item.context]
-                except Exception as e:
-                    # Add to event queue
-                    logger.debug("Adding {msgname} to event queue")
-                    event_queue.put_nowait(item)
+                for msg in msgs:
+                    item = self.decode_incoming_msg(msg)
+                    if item is not None:
+                        self._dispatch(item, requests, event_queue)
             except asyncio.CancelledError:
                 break
 
+    def _dispatch(self, item, requests, event_queue):
+        """Hand a received message to its request, or to the event queue.
+
+        The request is completed even if its future was cancelled, e.g. by
+        a timeout, so that it does not keep its place in the window.
+        """
+        msgname = type(item).__name__
+        context = item.context
+        logger.debug(f"socket reader: {msgname} {context}")
+        try:
+            future, eof_stream, details_msg, details = requests[context]
+        except KeyError:
+            logger.debug(f"Adding {msgname} to event queue")
+            event_queue.put_nowait(item)
+            return
+        if eof_stream:  # stream
+            logger.debug(f"Streaming message {msgname}: {eof_stream} {details_msg}")
+            if msgname == eof_stream:
+                item = (item, details)
+            elif msgname == details_msg or details_msg is None:
+                details.append(item)
+                return
+            else:
+                logger.debug(f"Unexpected message {msgname}, adding to event queue")
+                event_queue.put_nowait(item)
+                return
+        if not future.done():
+            future.set_result(item)
+        self._request_done(requests, context)
+
     def _call_vpp_async(self, i, msgdef, service, **kwargs):
         if "context" not in kwargs:
             context = self.get_context()
@@ -683,9 +726,17 @@ class VPPApiClient:
 
     async def _write(self, b):
         """Send a binary-packed message to VPP."""
-        hdr = self.header_struct.pack(0, len(b), 0)
-        self.writer.write(hdr)
-        self.writer.write(b)
+        await self._write_many([b])
+
+    async def _write_many(self, bufs):
+        """Send a list of binary-packed messages to VPP in one go."""
+        if not bufs:
+            return
+        data = bytearray()
+        for b in bufs:
+            data += self.header_struct.pack(0, len(b), 0)
+            data += b
+        self.writer.write(data)
         await self.writer.drain()
 
     async def _read(self, timeout=5, no_type_conversion=False):
@@ -703,15 +754,47 @@ class VPPApiClient:
 
     async def _read_exactly(self, n):
         """Read exactly n bytes from the reader."""
-        data = bytearray()
-        while len(data) < n:
-            packet = await self.reader.readexactly(n - len(data))
-            if not packet:
-                raise IOError(
-                    1, f"Unexpected end of stream, read {len(data)} bytes out of {n}"
-                )
-            data.extend(packet)
-        return bytes(data)
+        try:
+            return await self.reader.readexactly(n)
+        except asyncio.IncompleteReadError as e:
+            raise IOError(
+                1,
+                f"Unexpected end of stream, read {len(e.partial)} bytes out of {n}",
+            )
+
+    read_chunk_size = 65536
+
+    async def _read_messages(self):
+        """Receive what is available on the socket, up to read_chunk_size.
+
+        Return the list of complete messages received, possibly empty,
+        or None at end of stream. Messages are memoryview slices of the
+        received chunk; only a trailing partial message is copied.
+        """
+        chunk = await self.reader.read(self.read_chunk_size)
+        if not chunk:
+            return None
+        data = self.rbuf + chunk if self.rbuf else chunk
+        view = memoryview(data)
+        size = len(data)
+        msgs = []
+        offset = 0
+        while size - offset >= 16:
+            (_, msglen, _) = self.header_struct.unpack_from(data, offset)
+            if size - offset - 16 < msglen:
+                break
+            msgs.append(view[offset + 16 : offset + 16 + msglen])
+            offset += 16 + msglen
+        self.rbuf = bytes(view[offset:])
+
+        # Read the rest of a large message directly
+        if len(self.rbuf) >= 16:
+            (_, msglen, _) = self.header_struct.unpack_from(self.rbuf)
+            if msglen > self.read_chunk_size:
+                rest = await self._read_exactly(msglen - (len(self.rbuf) - 16))
+                msgs.append(self.rbuf[16:] + rest)
+                self.rbuf = b""
+        return msgs
 
     def validate_message_table(self, namecrctable):
         """Take a dictionary of name_crc message names
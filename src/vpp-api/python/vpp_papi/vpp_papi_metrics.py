@@ -0,0 +1,218 @@
+#
+# Copyright (c) 2024 Cisco and/or its affiliates.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Latency histograms and hooks for VPP API calls.
+
+Enabled with VPPApiClient.enable_metrics(). Every call is timed in
+four phases, and in total:
+
+    pack    packing the request
+    write   writing it to the transport
+    wait    waiting for the reply, or for all details of a dump
+    decode  decoding the received messages
+
+The timings are kept in a histogram per message and phase. Together
+with byte counts and the depth of the client's message queue, they can
+be exported with VPPApiClient.get_metrics().
+"""
+
+import time
+
+PHASES = ("pack", "write", "wait", "decode", "total")
+HOOKS = ("before_send", "after_recv")
+
+
+class LatencyHistogram:
+    """A log-linear histogram of durations, in the manner of HDR.
+
+    Durations are recorded with microsecond resolution into buckets
+    that are exact below 32 us and then split each power of two into 16,
+    so every bucket is within 6.25% of the values it holds.
+    """
+
+    SUB_BUCKETS = 16
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def bucket(cls, us):
+        """Return the index of the bucket holding us microseconds."""
+        if us < cls.SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - 5
+        return shift * cls.SUB_BUCKETS + (us >> shift)
+
+    @classmethod
+    def upper_bound(cls, index):
+        """Return the largest number of microseconds in a bucket."""
+        if index < cls.SUB_BUCKETS:
+            return index
+        shift, mantissa = divmod(index, cls.SUB_BUCKETS)
+        shift -= 1
+        return ((mantissa + cls.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        if us < 16:
+            i = us
+        else:
+            # bucket(), inlined
+            shift = us.bit_length() - 5
+            i = (shift << 4) + (us >> shift)
+        counts = self.counts
+        counts[i] = counts.get(i, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Return the q-th percentile in seconds, from the upper bound of
+        its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                break
+        return min(self.upper_bound(i) / 1e6, self.max)
+
+    def as_dict(self):
+        """Return the histogram with cumulative bucket counts.
+
+        buckets is a list of (upper bound in seconds, count of durations
+        up to it) for the buckets in use, as in a Prometheus histogram.
+        """
+        buckets = []
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            buckets.append(((self.upper_bound(i) + 1) / 1e6, seen))
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class CallTimer:
+    """Times the phases of one call."""
+
+    __slots__ = ("metrics", "name", "start", "pack", "write", "wait", "decode")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = time.perf_counter()
+        self.pack = self.write = self.wait = self.decode = 0.0
+
+    def send(self, msgdef, kwargs, transport):
+        """Pack and write a request."""
+        t0 = time.perf_counter()
+        b = msgdef.pack(kwargs)
+        t1 = time.perf_counter()
+        for hook in self.metrics.hooks["before_send"]:
+            hook(self.name, b)
+        transport.suspend()
+        transport.write(b)
+        t2 = time.perf_counter()
+        self.pack += t1 - t0
+        self.write += t2 - t1
+        self.metrics.bytes_sent += len(b)
+
+    def read(self, vpp, no_type_conversion, timeout):
+        """Read and decode a message, as VPPApiClient.read_blocking()."""
+        t0 = time.perf_counter()
+        msg = vpp.transport.read(timeout=timeout)
+        t1 = time.perf_counter()
+        self.wait += t1 - t0
+        if not msg:
+            return None
+        r = vpp.decode_incoming_msg(msg, no_type_conversion)
+        self.decode += time.perf_counter() - t1
+        self.metrics.bytes_received += len(msg)
+        for hook in self.metrics.hooks["after_recv"]:
+            hook(r, msg)
+        return r
+
+    def done(self):
+        total = time.perf_counter() - self.start
+        self.metrics.record(
+            self.name, self.pack, self.write, self.wait, self.decode, total
+        )
+
+
+class VPPApiMetrics:
+    """Per message latency histograms, byte counts and hooks.
+
+    Hooks are called as before_send(name, buf) with each packed request
+    and after_recv(msg, buf) with each received message of a call.
+    """
+
+    def __init__(self):
+        self.messages = {}
+        self.calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.queue_max = 0
+        self.hooks = {h: [] for h in HOOKS}
+
+    def add_hook(self, event, callback):
+        if event not in self.hooks:
+            raise ValueError("No such hook {}".format(event))
+        self.hooks[event].append(callback)
+
+    def remove_hook(self, event, callback):
+        self.hooks[event].remove(callback)
+
+    def call(self, name):
+        """Return a CallTimer for a call of message name."""
+        return CallTimer(self, name)
+
+    def record(self, name, *durations):
+        """Record the durations of the phases of a call."""
+        try:
+            histograms = self.messages[name]
+        except KeyError:
+            histograms = self.messages[name] = [LatencyHistogram() for _ in PHASES]
+        for h, d in zip(histograms, durations):
+            h.record(d)
+        self.calls += 1
+
+    def queued(self, depth):
+        """Note the depth of the message queue after queueing a message."""
+        if depth > self.queue_max:
+            self.queue_max = depth
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "queue_max": self.queue_max,
+            "messages": {
+                name: {p: h.as_dict() for p, h in zip(PHASES, histograms)}
+                for name, histograms in self.messages.items()
+            },
+        }
@@ -0,0 +1,162 @@
+#
+# Copyright (c) 2024 Cisco and/or its affiliates.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Pool of VPP API connections sharing one set of API definitions."""
+
+import concurrent.futures
+import contextlib
+import functools
+import logging
+import queue
+import time
+
+from .vpp_papi import VPPApiClient, VPPApiError, VPPValueError
+
+logger = logging.getLogger("vpp_papi.pool")
+logger.addHandler(logging.NullHandler())
+
+
+class VPPApiClientPool:
+    """A pool of API connections to VPP.
+
+    Each connection has its own socket, sockclnt registration and reader
+    thread, but all of them share the API definitions loaded by the
+    first. Calls made through the api attribute run on whichever
+    connection is idle, so several threads can call VPP at once. submit()
+    runs a call on the pool's own threads and returns a
+    concurrent.futures.Future; asyncio code can await it through
+    asyncio.wrap_future().
+
+    Calls on different connections may be handled by VPP in any order.
+    Use connection() for a sequence of calls that depend on each other.
+    """
+
+    class _Api:
+        def __init__(self, pool):
+            self._pool = pool
+
+        def __getattr__(self, name):
+            # Raises AttributeError for unknown messages
+            getattr(self._pool.clients[0].api, name)
+            f = functools.partial(self._pool.call, name)
+            self.__dict__[name] = f
+            return f
+
+    def __init__(self, size=4, **kwargs):
+        """Create a pool of size connections.
+
+        The keyword arguments are passed to VPPApiClient.
+        """
+        if size < 1:
+            raise VPPValueError("Pool size must be at least 1")
+        self.size = size
+        self.kwargs = kwargs
+        self.clients = [VPPApiClient(**kwargs)]
+        self.idle = queue.Queue()
+        self.calls = [0] * size
+        self.busy = [0.0] * size
+        self.executor = None
+        self.connected = False
+        self.event_callback = None
+        self.api = self._Api(self)
+
+    def _add_client(self):
+        """Create a client sharing the definitions of the first."""
+        first = self.clients[0]
+        kwargs = {
+            k: v
+            for k, v in self.kwargs.items()
+            if k not in ("apifiles", "apidir", "api_cache_dir", "lazy")
+        }
+        kwargs["bootstrapapi"] = True
+        client = VPPApiClient(**kwargs)
+        client.bootstrapapi = False
+        client.apifiles = first.apifiles
+        client.messages = first.messages
+        client.services = first.services
+        if self.event_callback is not None:
+            client.register_event_callback(self.event_callback)
+        self.clients.append(client)
+
+    def connect(self, name, **kwargs):
+        """Open all connections, naming them name-0 to name-(size-1).
+
+        The keyword arguments are passed to VPPApiClient.connect().
+        """
+        for i in range(self.size):
+            if i == len(self.clients):
+                self._add_client()
+            try:
+                self.clients[i].connect("{}-{}".format(name, i), **kwargs)
+            except Exception:
+                for client in self.clients[:i]:
+                    client.disconnect()
+                self.idle = queue.Queue()
+                raise
+            self.idle.put(i)
+        self.connected = True
+        logger.debug("Connected %d connections as %s", self.size, name)
+        return 0
+
+    def disconnect(self):
+        """Close all connections."""
+        self.connected = False
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.idle = queue.Queue()
+        for client in self.clients:
+            client.disconnect()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Reserve an idle connection, yielding its VPPApiClient."""
+        if not self.connected:
+            raise VPPApiError("Not connected")
+        i = self.idle.get()
+        start = time.perf_counter()
+        try:
+            yield self.clients[i]
+        finally:
+            self.busy[i] += time.perf_counter() - start
+            self.calls[i] += 1
+            self.idle.put(i)
+
+    def call(self, name, **kwargs):
+        """Call an API function on an idle connection."""
+        with self.connection() as vpp:
+            return getattr(vpp.api, name)(**kwargs)
+
+    def submit(self, name, **kwargs):
+        """Call an API function on a pool thread, returning a Future."""
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix="vpp-papi-pool"
+            )
+        return self.executor.submit(self.call, name, **kwargs)
+
+    def register_event_callback(self, callback):
+        """Register a callback for async messages on every connection."""
+        self.event_callback = callback
+        for client in self.clients:
+            client.register_event_callback(callback)
+
+    def get_stats(self):
+        s = "\n=== API PAPI POOL STATISTICS ===\n"
+        s += "{:<12} {:>8} {:>10}\n".format("connection", "calls", "busy (s)")
+        for i in range(self.size):
+            s += "{:<12} {:>8} {:>10.3f}\n".format(i, self.calls[i], self.busy[i])
+        s += "{:<12} {:>8} {:>10.3f}\n".format("total", sum(self.calls), sum(self.busy))
+        return s
@@ -13,14 +13,20 @@
 # limitations under the License.
 #
 import collections
+import copy
 from enum import IntFlag
 import logging
 import socket
 import struct
 import sys
+import threading
 
 from . import vpp_format
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 #
 # Set log-level in application by doing e.g.:
@@ -46,24 +52,68 @@ def conversion_required(data, field_type):
 
 def conversion_packer(data, field_type):
     t = type(data).__name__
-    return types[field_type].pack(vpp_format.conversion_table[field_type][t](data))
+    p = types[field_type]
+    d = p.direct_conversion()
+    if d and t in d.packers:
+        return d.packers[t](data)
+    return p.pack(vpp_format.conversion_table[field_type][t](data))
 
 
-def conversion_unpacker(data, field_type):
+def conversion_unpacker(data, field_type, raw=False):
+    if raw and field_type in vpp_format.raw_conversion_unpacker_table:
+        return vpp_format.raw_conversion_unpacker_table[field_type](data)
     if field_type not in vpp_format.conversion_unpacker_table:
         return data
     return vpp_format.conversion_unpacker_table[field_type](data)
 
 
+def direct_unpack(p, data, offset, raw_addresses=False):
+    """Unpack and convert a value of type p straight from its wire format.
+
+    Returns None if p has no direct conversion.
+    """
+    d = p.direct_conversion()
+    if not d or len(data) - offset < p.size:
+        return None
+    if raw_addresses:
+        return d.unpack_raw(data, offset), p.size
+    return d.unpack(data, offset), p.size
+
+
 class Packer:
     options = {}
+    _direct = None
 
     def pack(self, data, kwargs):
         raise NotImplementedError
 
-    def unpack(self, data, offset, result=None, ntc=False):
+    def unpack(self, data, offset, result=None, ntc=False, raw_addresses=False):
         raise NotImplementedError
 
+    def compiled(self):
+        """Return the packer with a precompiled codec, if it has one.
+
+        The packer itself is left unchanged, as it may be shared through
+        the types registry; packers that have a codec return a compiled
+        copy.
+        """
+        return self
+
+    def _compiled_packer(self):
+        """Return a copy of the packer with its element packer compiled."""
+        packer = self.packer.compiled()
+        if packer is self.packer:
+            return self
+        c = copy.copy(self)
+        c.packer = packer
+        return c
+
+    def direct_conversion(self):
+        """Return the vpp_format.DirectConversion of the type, or None."""
+        if self._direct is None:
+            self._direct = vpp_format.direct_conversion(self) or False
+        return self._direct or None
+
     # override as appropriate in subclasses
     @staticmethod
     def _get_packer_with_options(f_type, options):
@@ -116,7 +166,7 @@ class BaseTypes(Packer):
                 data = 0
         return self.packer.pack(data)
 
-    def unpack(self, data, offset, result=None, ntc=False):
+    def unpack(self, data, offset, result=None, ntc=False, raw_addresses=False):
         return self.packer.unpack_from(data, offset)[0], self.packer.size
 
     @staticmethod
@@ -161,7 +211,7 @@ class String(Packer):
             return list.encode("ascii").ljust(self.limit, b"\x00")
         return self.length_field_packer.pack(len(list)) + list.encode("ascii")
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         if self.fixed:
             p = BaseTypes("u8", self.num)
             s = p.unpack(data, offset)
@@ -176,19 +226,47 @@ class String(Packer):
         return (x.decode("ascii", errors="replace"), size + length_field_size)
 
 
-types = {
-    "u8": BaseTypes("u8"),
-    "i8": BaseTypes("i8"),
-    "u16": BaseTypes("u16"),
-    "i16": BaseTypes("i16"),
-    "u32": BaseTypes("u32"),
-    "i32": BaseTypes("i32"),
-    "u64": BaseTypes("u64"),
-    "i64": BaseTypes("i64"),
-    "f64": BaseTypes("f64"),
-    "bool": BaseTypes("bool"),
-    "string": String,
-}
+class VPPTypes(dict):
+    """Registry of types by name.
+
+    Definitions added with vpp_add_lazy_type() are only constructed when
+    the type is first looked up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy = {}
+        # Reentrant, constructing a type looks up the types it refers to
+        self._lock = threading.RLock()
+
+    def __missing__(self, name):
+        with self._lock:
+            # Another thread may have constructed it meanwhile
+            if not dict.__contains__(self, name):
+                kind, msgdef = self.lazy[name]
+                lazy_constructors[kind](name, msgdef)
+                self.lazy.pop(name, None)
+            return dict.__getitem__(self, name)
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.lazy
+
+
+types = VPPTypes(
+    {
+        "u8": BaseTypes("u8"),
+        "i8": BaseTypes("i8"),
+        "u16": BaseTypes("u16"),
+        "i16": BaseTypes("i16"),
+        "u32": BaseTypes("u32"),
+        "i32": BaseTypes("i32"),
+        "u64": BaseTypes("u64"),
+        "i64": BaseTypes("i64"),
+        "f64": BaseTypes("f64"),
+        "bool": BaseTypes("bool"),
+        "string": String,
+    }
+)
 
 class_types = {}
 
@@ -200,6 +278,16 @@ def vpp_get_type(name):
         return None
 
 
+def vpp_add_lazy_type(name, kind, msgdef):
+    """Register a type definition to be constructed on first use.
+
+    kind is one of "enum", "union", "type" or "alias". Names that are
+    already known are left alone.
+    """
+    if name not in types:
+        types.lazy[name] = (kind, msgdef)
+
+
 class VPPSerializerValueError(ValueError):
     pass
 
@@ -231,7 +319,7 @@ class FixedList_u8(Packer):
                 'Packing failed for "{}" {}'.format(self.name, kwargs)
             )
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         if len(data[offset:]) < self.num:
             raise VPPSerializerValueError(
                 'Invalid array length for "{}" got {}'
@@ -267,17 +355,46 @@ class FixedList(Packer):
             b += self.packer.pack(e)
         return bytes(b)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         # Return a list of arguments
         result = []
         total = 0
         for e in range(self.num):
-            x, size = self.packer.unpack(data, offset, ntc=ntc)
+            x, size = self.packer.unpack(
+                data, offset, ntc=ntc, raw_addresses=raw_addresses
+            )
             result.append(x)
             offset += size
             total += size
         return result, total
 
+    def compiled(self):
+        flat = _flat_field(self.packer)
+        if flat is None:
+            return self._compiled_packer()
+        fmt, _, conv, length = flat
+        if length:
+            return self
+        s = struct.Struct(">%d%s" % (self.num, fmt))
+        generic_pack = FixedList.pack.__get__(self)
+
+        def pack(list, kwargs=None):
+            try:
+                return s.pack(*list)
+            except (struct.error, TypeError):
+                return generic_pack(list, kwargs)
+
+        def unpack(data, offset=0, result=None, ntc=False, raw_addresses=False):
+            values = s.unpack_from(data, offset)
+            if conv:
+                return [conv(v) for v in values], s.size
+            return list(values), s.size
+
+        c = copy.copy(self)
+        c.pack = pack
+        c.unpack = unpack
+        return c
+
     def __repr__(self):
         return "FixedList(name=%s, field_type=%s, num=%s)" % (
             self.name,
@@ -315,7 +432,7 @@ class VLAList(Packer):
             b += self.packer.pack(e)
         return bytes(b)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         # Return a list of arguments
         total = 0
 
@@ -328,12 +445,50 @@ class VLAList(Packer):
 
         r = []
         for e in range(result[self.index]):
-            x, size = self.packer.unpack(data, offset, ntc=ntc)
+            x, size = self.packer.unpack(
+                data, offset, ntc=ntc, raw_addresses=raw_addresses
+            )
             r.append(x)
             offset += size
             total += size
         return r, total
 
+    def compiled(self):
+        flat = _flat_field(self.packer)
+        if flat is None:
+            return self._compiled_packer()
+        fmt, _, conv, length = flat
+        if length or (self.packer.size == 1 and self.field_type == "u8"):
+            return self
+        fmt = ">%d" + fmt
+        size = self.packer.size
+        length_field = self.length_field
+        index = self.index
+        generic_pack = VLAList.pack.__get__(self)
+
+        def pack(lst, kwargs=None):
+            if not lst:
+                return b""
+            n = len(lst)
+            if n != kwargs[length_field]:
+                return generic_pack(lst, kwargs)
+            try:
+                return struct.pack(fmt % n, *lst)
+            except (struct.error, TypeError):
+                return generic_pack(lst, kwargs)
+
+        def unpack(data, offset=0, result=None, ntc=False, raw_addresses=False):
+            n = result[index]
+            values = struct.unpack_from(fmt % n, data, offset)
+            if conv:
+                return [conv(v) for v in values], n * size
+            return list(values), n * size
+
+        c = copy.copy(self)
+        c.pack = pack
+        c.unpack = unpack
+        return c
+
     def __repr__(self):
         return "VLAList(name=%s, field_type=%s, " "len_field_name=%s, index=%s)" % (
             self.name,
@@ -359,7 +514,7 @@ class VLAList_legacy(Packer):
             b += self.packer.pack(e)
         return bytes(b)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         total = 0
         # Return a list of arguments
         if (len(data) - offset) % self.packer.size:
@@ -369,12 +524,17 @@ class VLAList_legacy(Packer):
         elements = int((len(data) - offset) / self.packer.size)
         r = []
         for e in range(elements):
-            x, size = self.packer.unpack(data, offset, ntc=ntc)
+            x, size = self.packer.unpack(
+                data, offset, ntc=ntc, raw_addresses=raw_addresses
+            )
             r.append(x)
             offset += self.packer.size
             total += size
         return r, total
 
+    def compiled(self):
+        return self._compiled_packer()
+
     def __repr__(self):
         return "VLAList_legacy(name=%s, field_type=%s)" % (self.name, self.field_type)
 
@@ -417,7 +577,7 @@ class VPPEnumType(Packer):
 
         return types[self.enumtype].pack(data)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         x, size = types[self.enumtype].unpack(data, offset)
         return self.enum(x), size
 
@@ -480,16 +640,23 @@ class VPPUnionType(Packer):
         r[: len(b)] = b
         return r
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         r = []
         maxsize = 0
         for k, p in self.packers.items():
-            x, size = p.unpack(data, offset, ntc=ntc)
+            x, size = p.unpack(data, offset, ntc=ntc, raw_addresses=raw_addresses)
             if size > maxsize:
                 maxsize = size
             r.append(x)
         return self.tuple._make(r), maxsize
 
+    def compiled(self):
+        c = copy.copy(self)
+        c.packers = collections.OrderedDict(
+            (k, p.compiled()) for k, p in self.packers.items()
+        )
+        return c
+
     def __repr__(self):
         return "VPPUnionType(name=%s, msgdef=%r)" % (self.name, self.msgdef)
 
@@ -536,17 +703,25 @@ class VPPTypeAlias(Packer):
     def _get_packer_with_options(f_type, options):
         return VPPTypeAlias(f_type, types[f_type].msgdef, options=options)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         if ntc is False and self.name in vpp_format.conversion_unpacker_table:
+            r = direct_unpack(self, data, offset, raw_addresses)
+            if r is not None:
+                return r
             # Disable type conversion for dependent types
             ntc = True
             self.toplevelconversion = True
-        t, size = self.packer.unpack(data, offset, result, ntc=ntc)
+        t, size = self.packer.unpack(
+            data, offset, result, ntc=ntc, raw_addresses=raw_addresses
+        )
         if self.toplevelconversion:
             self.toplevelconversion = False
-            return conversion_unpacker(t, self.name), size
+            return conversion_unpacker(t, self.name, raw_addresses), size
         return t, size
 
+    def compiled(self):
+        return self._compiled_packer()
+
     def __repr__(self):
         return "VPPTypeAlias(name=%s, msgdef=%s, options=%s)" % (
             self.name,
@@ -621,6 +796,7 @@ class VPPType(Packer):
         self.tuple = collections.namedtuple(name, self.fields, rename=True)
         types[name] = self
         self.toplevelconversion = False
+        self._compiled = None
 
     def pack(self, data, kwargs=None):
         if not kwargs:
@@ -656,17 +832,20 @@ class VPPType(Packer):
 
         return bytes(b)
 
-    def unpack(self, data, offset=0, result=None, ntc=False):
+    def unpack(self, data, offset=0, result=None, ntc=False, raw_addresses=False):
         # Return a list of arguments
         result = []
         total = 0
         if ntc is False and self.name in vpp_format.conversion_unpacker_table:
+            r = direct_unpack(self, data, offset, raw_addresses)
+            if r is not None:
+                return r
             # Disable type conversion for dependent types
             ntc = True
             self.toplevelconversion = True
 
         for p in self.packers:
-            x, size = p.unpack(data, offset, result, ntc)
+            x, size = p.unpack(data, offset, result, ntc, raw_addresses)
             if type(x) is tuple and len(x) == 1:
                 x = x[0]
             result.append(x)
@@ -676,9 +855,253 @@ class VPPType(Packer):
 
         if self.toplevelconversion:
             self.toplevelconversion = False
-            t = conversion_unpacker(t, self.name)
+            t = conversion_unpacker(t, self.name, raw_addresses)
         return t, total
 
+    def compiled(self):
+        """Return a copy of the type with a precompiled codec.
+
+        Runs of consecutive fixed size scalar fields (base types, enums,
+        u8 arrays and plain aliases) are folded into a single
+        struct.Struct. Remaining fields are handled by their own packers,
+        which are compiled recursively. The codec produces the same
+        results as the generic path, which is still used for non-dict
+        input and to report packing errors.
+
+        The type itself keeps its generic codec, so that compiling for
+        one client does not change the types seen by others. The copy is
+        made once and shared by all callers.
+        """
+        if self._compiled is None:
+            c = copy.copy(self)
+            # Views of the copy decode with its compiled packers
+            c.__dict__.pop("_view_class", None)
+            c.packers = [p.compiled() for p in self.packers]
+            c._compiled = c
+            c._install_codec()
+            self._compiled = c
+        return self._compiled
+
+    def _install_codec(self):
+        """Replace pack and unpack of this instance with compiled ones."""
+        # A step is either (struct, fields, converters) for a run of
+        # scalar fields or (None, field name, (packer, nested)).
+        steps = []
+        for f_name, p in zip(self.fields, self.packers):
+            flat = _flat_field(p)
+            if flat is None:
+                steps.append((None, f_name, (p, isinstance(p, VPPType))))
+                continue
+            if not steps or steps[-1][0] is None:
+                steps.append(("", [], []))
+            fmt, default, conv, length = flat
+            run, fields, convs = steps[-1]
+            if conv:
+                convs.append((len(fields), conv))
+            fields.append((f_name, default, length))
+            steps[-1] = (run + fmt, fields, convs)
+        steps = [
+            (struct.Struct(">" + s), f, p) if s is not None else (s, f, p)
+            for s, f, p in steps
+        ]
+
+        name = self.name
+        make = self.tuple._make
+        generic_pack = VPPType.pack.__get__(self)
+        generic_unpack = VPPType.unpack.__get__(self)
+
+        def pack(data, kwargs=None):
+            if type(data) is not dict:
+                return generic_pack(data, kwargs)
+            if not kwargs:
+                kwargs = data
+            b = []
+            try:
+                for s, f, p in steps:
+                    if s is None:
+                        if p[1]:
+                            b.append(p[0].pack(data.get(f), kwargs.get(f)))
+                        else:
+                            b.append(p[0].pack(data.get(f), kwargs))
+                        continue
+                    values = []
+                    for f_name, default, length in f:
+                        v = data.get(f_name)
+                        if v is None:
+                            v = default
+                        elif length and len(v) > length:
+                            raise VPPSerializerValueError(f_name)
+                        values.append(v)
+                    b.append(s.pack(*values))
+            except Exception:
+                # Let the generic path produce the proper error
+                return generic_pack(data, kwargs)
+            return b"".join(b)
+
+        def unpack(data, offset=0, result=None, ntc=False, raw_addresses=False):
+            convert = False
+            if ntc is False and name in vpp_format.conversion_unpacker_table:
+                r = direct_unpack(self, data, offset, raw_addresses)
+                if r is not None:
+                    return r
+                # Disable type conversion for dependent types
+                convert = True
+                ntc = True
+            result = []
+            start = offset
+            try:
+                for s, f, p in steps:
+                    if s is None:
+                        x, size = p[0].unpack(data, offset, result, ntc, raw_addresses)
+                        if type(x) is tuple and len(x) == 1:
+                            x = x[0]
+                        result.append(x)
+                        offset += size
+                        continue
+                    values = s.unpack_from(data, offset)
+                    if p:
+                        values = list(values)
+                        for i, conv in p:
+                            values[i] = conv(values[i])
+                    result.extend(values)
+                    offset += s.size
+            except struct.error:
+                if convert:
+                    ntc = False
+                return generic_unpack(data, start, None, ntc, raw_addresses)
+            t = make(result)
+            if convert:
+                t = conversion_unpacker(t, name, raw_addresses)
+            return t, offset - start
+
+        self.pack = pack
+        self.unpack = unpack
+
+    def pack_columns(self, columns, template=None, prefix=b""):
+        """Pack a run of messages that differ only in a few fields.
+
+        template is a dict of the fields shared by all messages, as for
+        pack(); it is packed once. columns maps field paths to sequences
+        of values, one per message. A path names a field, with dots to
+        reach into nested types and list elements, e.g. "route.prefix"
+        or "route.paths.0.sw_if_index". Each value is packed into its
+        place in a copy of the packed template. NumPy arrays of integers
+        are written in one operation. prefix, e.g. a transport frame
+        header, is copied in front of every message.
+
+        Returns a bytearray of the messages, each len(prefix) plus the
+        template size long. Raises VPPSerializerValueError for fields
+        that vary in size or hold the length of a list.
+        """
+        if not columns:
+            raise VPPSerializerValueError("No columns to pack")
+        count = len(next(iter(columns.values())))
+        base = prefix + self.pack(template or {})
+        out = bytearray(base * count)
+        stride = len(base)
+        for path, values in columns.items():
+            if len(values) != count:
+                raise VPPSerializerValueError(
+                    "Column {} has {} values, expected {}".format(
+                        path, len(values), count
+                    )
+                )
+            offset, p, size = self._locate(path, template)
+            offset += len(prefix)
+            flat = _flat_field(p)
+            if flat and not flat[3] and numpy and isinstance(values, numpy.ndarray):
+                rows = numpy.frombuffer(out, numpy.uint8).reshape(count, stride)
+                column = numpy.asarray(values, ">" + flat[0])
+                rows[:, offset : offset + size] = column.view(numpy.uint8).reshape(
+                    count, size
+                )
+            elif flat and not flat[3]:
+                pack_into = struct.Struct(">" + flat[0]).pack_into
+                for v in values:
+                    pack_into(out, offset, v)
+                    offset += stride
+            else:
+                for v in values:
+                    b = p.pack(v, None)
+                    if len(b) != size:
+                        raise VPPSerializerValueError(
+                            "Invalid value for {}: {}".format(path, v)
+                        )
+                    out[offset : offset + size] = b
+                    offset += stride
+        return out
+
+    def _locate(self, path, data):
+        """Return the offset, packer and size of a field in pack(data)."""
+        t = self
+        offset = 0
+        for part in path.split("."):
+            if isinstance(t, VPPTypeAlias) and not isinstance(t.packer, BaseTypes):
+                t = t.packer
+            if isinstance(t, VPPType):
+                if part not in t.field_by_name:
+                    raise VPPSerializerValueError(
+                        "No field {} in {}".format(part, t.name)
+                    )
+                i = t.fields.index(part)
+                for f, p in zip(t.fields[:i], t.packers[:i]):
+                    arg = data.get(f) if data else None
+                    offset += len(p.pack(arg, arg if isinstance(p, VPPType) else data))
+                for p in t.packers:
+                    if isinstance(p, VLAList) and p.length_field == part:
+                        raise VPPSerializerValueError(
+                            "Field {} holds a list length".format(path)
+                        )
+                data = data.get(part) if data else None
+                t = t.packers[i]
+            elif isinstance(t, (FixedList, VLAList, VLAList_legacy)):
+                i = int(part)
+                if i >= (t.num if isinstance(t, FixedList) else len(data or ())):
+                    raise VPPSerializerValueError(
+                        "Index {} out of range in {}".format(path, t.name)
+                    )
+                element_size = _fixed_size(t.packer)
+                if element_size is None:
+                    raise VPPSerializerValueError(
+                        "Elements of {} vary in size".format(t.name)
+                    )
+                offset += i * element_size
+                data = data[i] if data else None
+                t = t.packer
+            else:
+                raise VPPSerializerValueError("Invalid field path {}".format(path))
+        size = _fixed_size(t)
+        if size is None:
+            raise VPPSerializerValueError("Field {} varies in size".format(path))
+        return offset, t, size
+
+    _view_class = None
+
+    def view(self, data, offset=0, ntc=False, raw_addresses=False):
+        """Return a lazy view of the value at offset in data.
+
+        The view decodes each field on first access, straight from data,
+        and otherwise behaves like the tuple returned by unpack(). Fields
+        that follow a variable length field are decoded by unpacking the
+        whole value once. data is referenced, not copied, and must not be
+        modified while the view is in use.
+        """
+        if ntc is False and self.name in vpp_format.conversion_unpacker_table:
+            return self.unpack(data, offset, None, ntc, raw_addresses)[0]
+        if self._view_class is None:
+            self._view_class = self._make_view_class()
+        return self._view_class(data, offset, ntc, raw_addresses)
+
+    def _make_view_class(self):
+        attrs = {"_type": self, "_fields": self.tuple._fields}
+        offset = 0
+        for i, (f_name, p) in enumerate(zip(self.tuple._fields, self.packers)):
+            attrs[f_name] = _ViewField(f_name, i, offset, p)
+            if offset is not None:
+                size = _fixed_size(p)
+                offset = None if size is None else offset + size
+        return type(self.name, (VPPTypeView,), attrs)
+
     def __repr__(self):
         return "%s(name=%s, msgdef=%s)" % (
             self.__class__.__name__,
@@ -687,5 +1110,146 @@ class VPPType(Packer):
         )
 
 
+class VPPTypeView:
+    """Base class of the views returned by VPPType.view()."""
+
+    _type = None
+    _fields = ()
+
+    def __init__(self, data, offset, ntc, raw_addresses=False):
+        self._data = data
+        self._offset = offset
+        self._ntc = ntc
+        self._raw_addresses = raw_addresses
+        self._tuple = None
+
+    def _unpack(self):
+        """Return the fully decoded tuple."""
+        if self._tuple is None:
+            t, _ = self._type.unpack(
+                self._data, self._offset, None, self._ntc, self._raw_addresses
+            )
+            self._tuple = t
+        return self._tuple
+
+    def _asdict(self):
+        return self._unpack()._asdict()
+
+    def _replace(self, **kwargs):
+        return self._unpack()._replace(**kwargs)
+
+    def __iter__(self):
+        return iter(self._unpack())
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return self._unpack()[index]
+
+    def __contains__(self, value):
+        return value in self._unpack()
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, VPPTypeView)):
+            return self._unpack() == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._unpack())
+
+    def __repr__(self):
+        return repr(self._unpack())
+
+
+class _ViewField:
+    """Decode one field of a VPPTypeView on first access."""
+
+    def __init__(self, name, index, offset, packer):
+        self.name = name
+        self.index = index
+        self.packer = packer
+        if isinstance(packer, (VLAList, VLAList_legacy)):
+            # The length is held by another field
+            offset = None
+        self.offset = offset
+        self.nested = isinstance(packer, VPPType)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.offset is None:
+            value = obj._unpack()[self.index]
+        elif self.nested:
+            value = self.packer.view(
+                obj._data, obj._offset + self.offset, obj._ntc, obj._raw_addresses
+            )
+        else:
+            value, _ = self.packer.unpack(
+                obj._data,
+                obj._offset + self.offset,
+                None,
+                obj._ntc,
+                obj._raw_addresses,
+            )
+            if type(value) is tuple and len(value) == 1:
+                value = value[0]
+        # Cache in the instance, which takes precedence from now on
+        obj.__dict__[self.name] = value
+        return value
+
+
+def _fixed_size(p):
+    """Return the size of a field of type p, or None if it varies."""
+    if isinstance(p, (VLAList, VLAList_legacy)):
+        return None
+    if isinstance(p, String):
+        return p.size if p.fixed else None
+    if isinstance(p, VPPTypeAlias):
+        return _fixed_size(p.packer)
+    if isinstance(p, FixedList):
+        return None if _fixed_size(p.packer) is None else p.size
+    if isinstance(p, VPPType):
+        if any(_fixed_size(x) is None for x in p.packers):
+            return None
+    return p.size
+
+
 class VPPMessage(VPPType):
     pass
+
+
+lazy_constructors = {
+    "enum": lambda name, t: VPPEnumType(t[0], t[1:]),
+    "union": lambda name, t: VPPUnionType(t[0], t[1:]),
+    "type": lambda name, t: VPPType(t[0], t[1:]),
+    "alias": VPPTypeAlias,
+}
+
+
+def _flat_field(p):
+    """Describe a fixed size scalar field that can be folded into a
+    struct.Struct with its neighbours.
+
+    Returns a (format, default, converter, length) tuple, where length is
+    the size of a u8 array and 0 for scalars, or None if the field needs
+    its own packer.
+    """
+    default = p.options["default"] if p.options and "default" in p.options else 0
+    if isinstance(p, VPPTypeAlias):
+        if (
+            p.name in vpp_format.conversion_table
+            or p.name in vpp_format.conversion_unpacker_table
+        ):
+            return None
+        p = p.packer
+    if isinstance(p, FixedList_u8):
+        return "%ds" % p.num, b"", None, p.num
+    if isinstance(p, VPPEnumType):
+        return types[p.enumtype].packer.format[1:], default, p.enum, 0
+    if isinstance(p, BaseTypes):
+        # f64 is packed in native byte order
+        if p._type in ("f64", "header") or p._elements:
+            return None
+        return p.packer.format[1:], default, None, 0
+    return None
@@ -39,6 +39,16 @@ stat['/if/rx'][:, 1].sum_packets() - returns the sum of packet counters for
                                      interface 1 on all threads
 stat['/if/rx-miss'][:, 1].sum() - returns the sum of packet counters for
                                   interface 1 on all threads for simple counters
+
+With NumPy installed, counters can also be copied out as arrays.
+stat.get_array('/if/rx') - returns an array shaped [threads, indexes, 2]
+stat.get_array('/if/rx').sum(axis=0) - returns the packets/octets for
+                                       every interface summed over threads
+stat.get_array('/if/rx-miss').sum(axis=1) - returns the per-thread totals
+
+A set of counters can also be polled in the background, calling back
+with only the counters that changed since the previous poll:
+stat.subscribe(['^/if/rx$', '^/err/'], callback, interval=1.0)
 """
 
 import os
@@ -49,6 +59,16 @@ from struct import Struct
 import time
 import unittest
 import re
+import bisect
+import functools
+import threading
+import asyncio
+from collections.abc import Mapping
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 def recv_fd(sock):
@@ -62,6 +82,7 @@ def recv_fd(sock):
 
 
 VEC_LEN_FMT = Struct("I")
+POINTER_FMT = Struct("P")
 
 
 def get_vec_len(stats, vector_offset):
@@ -125,6 +146,12 @@ class VPPStats:
         self.socketname = socketname
         self.timeout = timeout
         self.directory = {}
+        self.directory_by_idx = {}
+        self.directory_entries = []
+        self.directory_raw = b""
+        self.names = StatsNameIndex()
+        self.symlinks = {}
+        self.vectors = {}
         self.lock = StatsLock(self)
         self.connected = False
         self.size = 0
@@ -194,27 +221,84 @@ class VPPStats:
     elementfmt = "IQ128s"
 
     def refresh(self, blocking=True):
-        """Refresh directory vector cache (epoch changed)"""
-        directory = {}
-        directory_by_idx = {}
+        """Refresh directory vector cache (epoch changed).
+
+        Only the directory slots that changed since the previous refresh
+        are decoded again.
+        """
         while True:
             try:
                 with self.lock:
-                    self.last_epoch = self.epoch
-                    for i, direntry in enumerate(
-                        StatsVector(self, self.directory_vector, self.elementfmt)
-                    ):
-                        path_raw = direntry[2].find(b"\x00")
-                        path = direntry[2][:path_raw].decode("ascii")
-                        directory[path] = StatsEntry(direntry[0], direntry[1])
-                        directory_by_idx[i] = path
-                    self.directory = directory
-                    self.directory_by_idx = directory_by_idx
-                    return
+                    epoch = self.epoch
+                    vector = StatsVector(self, self.directory_vector, self.elementfmt)
+                    start = vector.vec_start
+                    raw = self.statseg[
+                        start : start + vector.elementsize * vector.vec_len
+                    ]
+                self._update_directory(raw, vector.struct)
+                # Only once read consistently, a failed read is retried
+                self.last_epoch = epoch
+                return
             except IOError:
                 if not blocking:
                     raise
 
+    DIRECTORY_CHUNK = 64
+
+    def _changed_slots(self, raw, size):
+        """Indexes of directory slots that differ from the previous refresh"""
+        old = self.directory_raw
+        if not old:
+            return list(range(len(raw) // size))
+        chunk = self.DIRECTORY_CHUNK * size
+        changed = []
+        for start in range(0, max(len(raw), len(old)), chunk):
+            end = start + chunk
+            if raw[start:end] == old[start:end]:
+                continue
+            for offset in range(start, end, size):
+                if raw[offset : offset + size] != old[offset : offset + size]:
+                    changed.append(offset // size)
+        return changed
+
+    def _update_directory(self, raw, direntry):
+        """Apply a freshly copied directory vector to the cached directory"""
+        size = direntry.size
+        changed = self._changed_slots(raw, size)
+        if not changed:
+            return
+        self.symlinks.clear()
+        self.vectors.clear()
+        directory = self.directory
+        entries = self.directory_entries
+        removed = set()
+        for i in changed:
+            if i < len(entries):
+                path = self.directory_by_idx.pop(i)
+                if directory.get(path) is entries[i]:
+                    del directory[path]
+                    removed.add(path)
+        del entries[len(raw) // size :]
+        added = []
+        for i in changed:
+            if i * size >= len(raw):
+                continue
+            stattype, statvalue, name = direntry.unpack_from(raw, i * size)
+            path = name[: name.find(b"\x00")].decode("ascii")
+            entry = StatsEntry(stattype, statvalue)
+            if i < len(entries):
+                entries[i] = entry
+            else:
+                entries.append(entry)
+            if path in removed:
+                removed.discard(path)
+            elif path not in directory:
+                added.append(path)
+            directory[path] = entry
+            self.directory_by_idx[i] = path
+        self.directory_raw = raw
+        self.names.update(directory, removed, added)
+
     def __getitem__(self, item, blocking=True):
         if not self.connected:
             self.connect()
@@ -236,9 +320,8 @@ class VPPStats:
         if not self.connected:
             self.connect()
 
-        errors = {k: v for k, v in self.directory.items() if k.startswith("/err/")}
         result = {}
-        for k in errors:
+        for k in self.names.prefixed("/err/"):
             try:
                 total = self[k].sum()
                 if total:
@@ -264,46 +347,458 @@ class VPPStats:
         return self.__getitem__(name, blocking).sum()
 
     def ls(self, patterns):
-        """Returns list of counters matching pattern"""
+        """Returns sorted list of counters matching pattern"""
         # pylint: disable=invalid-name
         if not self.connected:
             self.connect()
         if not isinstance(patterns, list):
             patterns = [patterns]
-        regex = [re.compile(i) for i in patterns]
         if self.last_epoch != self.epoch:
             self.refresh()
+        return self.names.match(patterns)
 
-        return [
-            k
-            for k, v in self.directory.items()
-            if any(re.match(pattern, k) for pattern in regex)
-        ]
+    def get_array(self, name, blocking=True):
+        """Return a counter as a NumPy array.
+
+        Simple counters are shaped [threads, indexes] and combined counters
+        [threads, indexes, 2] with packets and octets in the last dimension.
+        The data is copied out of the segment once, while holding the lock.
+        """
+        if numpy is None:
+            raise ImportError("get_array() requires numpy")
+        if not self.connected:
+            self.connect()
+        while True:
+            try:
+                if self.last_epoch != self.epoch:
+                    self.refresh(blocking)
+                with self.lock:
+                    return self.directory[name].get_array(self)
+            except IOError:
+                if not blocking:
+                    raise
 
     def dump(self, counters, blocking=True):
         """Given a list of counters return a dictionary of results"""
+        return dict(self.snapshot(counters, blocking))
+
+    def snapshot(self, counters, blocking=True):
+        """Read a set of counters consistently.
+
+        All counters are read under a single lock and epoch check and are
+        retried together, so they all come from the same point in time.
+        Returns a StatsSnapshot.
+        """
         if not self.connected:
             self.connect()
-        result = {}
-        for cnt in counters:
-            result[cnt] = self.__getitem__(cnt, blocking)
-        return result
+        while True:
+            try:
+                if self.last_epoch != self.epoch:
+                    self.refresh(blocking)
+                with self.lock:
+                    result = {}
+                    for cnt in counters:
+                        result[cnt] = self.directory[cnt].get_counter(self)
+                    return StatsSnapshot(result, self.lock.epoch)
+            except IOError:
+                if not blocking:
+                    raise
+
+    def subscribe(self, patterns, callback, interval=1.0, start=True):
+        """Poll the counters matching patterns every interval seconds.
+
+        callback is called with a StatsUpdate of the counters that changed
+        since the previous poll. Returns the StatsSubscription, polling
+        in a background thread if start is true. Otherwise, poll it from
+        an asyncio task with its run() coroutine, or call poll() directly.
+        Requires NumPy.
+        """
+        subscription = StatsSubscription(self, patterns, callback, interval)
+        if start:
+            subscription.start()
+        return subscription
+
+
+class StatsSnapshot(Mapping):
+    """Read-only set of counters read at the same point in time"""
+
+    def __init__(self, counters, epoch):
+        self._counters = counters
+        self.epoch = epoch
+        self.timestamp = time.time()
+        self.monotonic = time.monotonic()
+
+    def __getitem__(self, name):
+        return self._counters[name]
+
+    def __iter__(self):
+        return iter(self._counters)
+
+    def __len__(self):
+        return len(self._counters)
+
+    def __repr__(self):
+        return "StatsSnapshot(epoch={}, timestamp={}, {!r})".format(
+            self.epoch, self.timestamp, self._counters
+        )
+
+    def interval(self, previous):
+        """Seconds elapsed since an earlier snapshot"""
+        return self.monotonic - previous.monotonic
+
+    def delta(self, previous, name):
+        """Difference of a counter from an earlier snapshot"""
+        return _counter_op(
+            self._counters[name], previous[name], lambda new, old: new - old
+        )
+
+    def rate(self, previous, name):
+        """Per second rate of a counter since an earlier snapshot"""
+        interval = self.interval(previous)
+        return _counter_op(
+            self._counters[name],
+            previous[name],
+            lambda new, old: (new - old) / interval,
+        )
+
+
+class StatsUpdate(Mapping):
+    """Counters that changed between two polls of a StatsSubscription.
+
+    Maps counter names to their new values. Counters are NumPy arrays as
+    returned by VPPStats.get_array(); scalars and names are as returned
+    by VPPStats.__getitem__().
+    """
+
+    def __init__(self, values, deltas, interval, epoch):
+        self._values = values
+        self.deltas = deltas
+        self.interval = interval
+        self.epoch = epoch
+        self.timestamp = time.time()
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def delta(self, name):
+        """Change of a counter since the previous poll, as signed integers.
+
+        None for counters seen for the first time, counters that shrank
+        and name vectors.
+        """
+        return self.deltas.get(name)
+
+    def rate(self, name):
+        """Per second rate of a counter since the previous poll"""
+        delta = self.deltas.get(name)
+        if delta is None or not self.interval:
+            return None
+        return delta / self.interval
+
+
+class StatsSubscription:
+    """Poll a set of counters, reporting the ones that changed.
+
+    Each poll copies the raw data of every subscribed counter under a
+    single lock and epoch check. Only counters whose data differs from
+    the previous poll are decoded, and they are passed to the callback
+    with their deltas in a StatsUpdate. The first poll reports every
+    counter. Patterns are matched again when the directory changes.
+
+    The VPPStats object must not be used from other threads while it is
+    polled in the background.
+
+    In the background, a poll that finds the segment being updated is
+    retried at the next interval, up to max_failures times in a row.
+    Polling then stops; so it does on any other exception, from the
+    callback too. The exception is raised again by stop().
+    """
+
+    max_failures = 10
+
+    def __init__(self, stats, patterns, callback, interval=1.0):
+        if numpy is None:
+            raise ImportError("subscribe() requires numpy")
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        self.stats = stats
+        self.patterns = patterns
+        self.callback = callback
+        self.interval = interval
+        self.names = None
+        self.names_epoch = None
+        self.previous = {}
+        self.last_poll = None
+        self.thread = None
+        self.stopped = threading.Event()
+        self.error = None
+        self.failures = 0
+
+    def _read(self, blocking=True):
+        """Copy the raw data of all subscribed counters consistently"""
+        stats = self.stats
+        if not stats.connected:
+            stats.connect()
+        while True:
+            try:
+                if stats.last_epoch != stats.epoch:
+                    stats.refresh(blocking=blocking)
+                if self.names_epoch != stats.last_epoch:
+                    self.names = stats.names.match(self.patterns)
+                    self.names_epoch = stats.last_epoch
+                with stats.lock:
+                    cache = {}
+                    raw = {}
+                    for name in self.names:
+                        raw[name] = stats.directory[name].read_raw(stats, cache)
+                    return raw, stats.lock.epoch
+            except IOError:
+                if not blocking:
+                    raise
+
+    def poll(self, blocking=True):
+        """Read the counters once, calling back if any changed.
+
+        Returns the StatsUpdate, or None if nothing changed. If blocking
+        is false, raises IOError instead of retrying when the segment is
+        being updated.
+        """
+        raw, epoch = self._read(blocking)
+        now = time.monotonic()
+        interval = now - self.last_poll if self.last_poll is not None else 0.0
+        self.last_poll = now
+        previous = self.previous
+        current = {}
+        values = {}
+        deltas = {}
+        for name, data in raw.items():
+            old = previous.get(name)
+            if old is not None and old[0] == data:
+                current[name] = old
+                continue
+            value = _decode_raw(data)
+            current[name] = (data, value)
+            if old is None:
+                values[name] = value
+                continue
+            delta = _array_delta(value, old[1])
+            if delta is not None and not numpy.any(delta):
+                continue
+            values[name] = value
+            if delta is not None:
+                deltas[name] = delta
+        self.previous = current
+        if not values:
+            return None
+        update = StatsUpdate(values, deltas, interval, epoch)
+        self.callback(update)
+        return update
+
+    def _poll_once(self):
+        """Poll without blocking, counting consecutive failures"""
+        try:
+            self.poll(blocking=False)
+        except IOError:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                raise
+            return
+        self.failures = 0
+
+    def _run_thread(self):
+        deadline = time.monotonic()
+        try:
+            while not self.stopped.is_set():
+                self._poll_once()
+                deadline += self.interval
+                self.stopped.wait(max(deadline - time.monotonic(), 0))
+        except Exception as e:  # pylint: disable=broad-except
+            self.error = e
+
+    def start(self):
+        """Poll in a background thread until stop() is called"""
+        self.stopped.clear()
+        self.error = None
+        self.failures = 0
+        self.thread = threading.Thread(
+            target=self._run_thread, name="vpp-stats-subscription", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background thread.
+
+        Raises the exception that stopped polling early, if any.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    async def run(self):
+        """Poll from an asyncio task until the task is cancelled.
+
+        Polls are retried like in the background thread, the exception
+        that stops polling is raised.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        self.failures = 0
+        while True:
+            self._poll_once()
+            deadline += self.interval
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+
+
+def _decode_raw(data):
+    """Decode counter data copied by StatsEntry.read_raw()"""
+    if data[0] == 2 or data[0] == 3:
+        _, width, vectors, raw = data
+        lengths = [n for _, n in vectors]
+        shape = (len(lengths), max(lengths, default=0))
+        if width > 1:
+            shape += (width,)
+        array = numpy.zeros(shape, dtype=numpy.uint64)
+        offset = 0
+        for thread, length in enumerate(lengths):
+            array[thread, :length] = numpy.frombuffer(
+                raw, numpy.uint64, length * width, offset
+            ).reshape((length,) + shape[2:])
+            offset += length * width * 8
+        return array
+    if data[0] == 6:
+        return _decode_raw(data[2])[:, data[1]]
+    return data[1]
+
+
+def _array_delta(new, old):
+    """Signed difference of two readings of a counter, or None"""
+    if isinstance(new, numpy.ndarray):
+        if new.shape != old.shape:
+            if new.ndim != old.ndim or any(n < o for n, o in zip(new.shape, old.shape)):
+                return None
+            padded = numpy.zeros_like(new)
+            padded[tuple(slice(0, n) for n in old.shape)] = old
+            old = padded
+        return new.view(numpy.int64) - old.view(numpy.int64)
+    if isinstance(new, (int, float)):
+        return new - old
+    return None
+
+
+def _counter_op(new, old, op):
+    """Apply op element-wise to two readings of the same counter"""
+    if isinstance(new, (list, tuple)):
+        return [_counter_op(n, o, op) for n, o in zip(new, old)]
+    return op(new, old)
+
+
+def literal_prefix(pattern):
+    """Return the literal text that every re.match() of pattern starts with"""
+    if "|" in pattern:
+        return ""
+    prefix = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            c = pattern[i + 1 : i + 2]
+            if not c or c.isalnum():
+                break
+            i += 1
+        elif c in ".^$*+?{}[]()":
+            break
+        prefix.append(c)
+        i += 1
+    # A following quantifier may make the last character optional
+    if prefix and pattern[i : i + 1] in ("*", "?", "{"):
+        prefix.pop()
+    return "".join(prefix)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """Compile a pattern, returning it with its literal prefix.
+
+    pattern may also be an already compiled re.Pattern.
+    """
+    regex = re.compile(pattern)
+    if regex.flags & (re.IGNORECASE | re.VERBOSE) or not isinstance(regex.pattern, str):
+        # The literal text of the pattern is not what it matches
+        return regex, ""
+    return regex, literal_prefix(regex.pattern)
+
+
+class StatsNameIndex:
+    """Sorted index of directory names for prefix and pattern lookups"""
+
+    REBUILD_THRESHOLD = 1000
+
+    def __init__(self):
+        self.sorted = []
+
+    def update(self, directory, removed, added):
+        """Track names removed from and added to the directory"""
+        if len(removed) + len(added) > self.REBUILD_THRESHOLD:
+            self.sorted = sorted(directory)
+            return
+        for name in removed:
+            i = bisect.bisect_left(self.sorted, name)
+            if i < len(self.sorted) and self.sorted[i] == name:
+                del self.sorted[i]
+        for name in added:
+            bisect.insort(self.sorted, name)
+
+    def prefixed(self, prefix):
+        """Return the names starting with prefix"""
+        if not prefix:
+            return self.sorted
+        start = bisect.bisect_left(self.sorted, prefix)
+        end = bisect.bisect_left(self.sorted, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        return self.sorted[start:end]
+
+    def match(self, patterns):
+        """Return the sorted names matching any of the patterns"""
+        result = set()
+        for pattern in patterns:
+            regex, prefix = compile_pattern(pattern)
+            result.update(n for n in self.prefixed(prefix) if regex.match(n))
+        return sorted(result)
 
 
 class StatsLock:
-    """Stat segment optimistic locking"""
+    """Stat segment optimistic locking.
+
+    The lock can be nested. Only the outermost acquire records the epoch
+    and only the outermost release validates it, so everything read
+    inside one outer block is checked as a unit.
+    """
 
     def __init__(self, stats):
         self.stats = stats
         self.epoch = 0
+        self.depth = 0
 
     def __enter__(self):
-        acquired = self.acquire(blocking=True)
-        assert acquired, "Lock wasn't acquired, but blocking=True"
+        if self.depth == 0:
+            acquired = self.acquire(blocking=True)
+            assert acquired, "Lock wasn't acquired, but blocking=True"
+        self.depth += 1
         return self
 
     def __exit__(self, exc_type=None, exc_value=None, traceback=None):
-        self.release()
+        self.depth -= 1
+        if self.depth == 0:
+            self.release()
 
     def acquire(self, blocking=True, timeout=-1):
         """Acquire the lock. Await in progress to go false. Record epoch."""
@@ -360,9 +855,11 @@ class CombinedList(list):
 class StatsTuple(tuple):
     """A Combined vector tuple (packets, octets)"""
 
-    def __init__(self, data):
-        self.dictionary = {"packets": data[0], "bytes": data[1]}
-        super().__init__()
+    __slots__ = ()
+
+    @property
+    def dictionary(self):
+        return {"packets": self[0], "bytes": self[1]}
 
     def __repr__(self):
         return dict.__repr__(self.dictionary)
@@ -426,17 +923,18 @@ class StatsEntry:
     def simple(self, stats):
         """Simple counter"""
         counter = StatsSimpleList()
-        for threads in StatsVector(stats, self.value, "P"):
-            clist = [v[0] for v in StatsVector(stats, threads[0], "Q")]
-            counter.append(clist)
+        seg = stats.statseg
+        for offset, length in self.thread_vectors(stats, 1):
+            counter.append(array.array("Q", seg[offset : offset + length * 8]).tolist())
         return counter
 
     def combined(self, stats):
         """Combined counter"""
         counter = StatsCombinedList()
-        for threads in StatsVector(stats, self.value, "P"):
-            clist = [StatsTuple(cnt) for cnt in StatsVector(stats, threads[0], "QQ")]
-            counter.append(clist)
+        seg = stats.statseg
+        for offset, length in self.thread_vectors(stats, 2):
+            values = array.array("Q", seg[offset : offset + length * 16]).tolist()
+            counter.append(list(map(StatsTuple, zip(values[::2], values[1::2]))))
         return counter
 
     def name(self, stats):
@@ -452,16 +950,125 @@ class StatsEntry:
 
     def symlink(self, stats):
         """Symlink counter"""
+        target, index = self.symlink_target(stats)
+        return target.column(stats, index)
+
+    def symlink_target(self, stats):
+        """Return the entry a symlink points to and the index in it.
+
+        Resolved symlinks are cached until the directory changes.
+        """
+        try:
+            return stats.symlinks[self]
+        except KeyError:
+            pass
         b = self.SYMLINK_FMT2.pack(self.value)
         index1, index2 = self.SYMLINK_FMT1.unpack(b)
-        name = stats.directory_by_idx[index1]
-        return stats[name][:, index2]
+        stats.symlinks[self] = stats.directory_entries[index1], index2
+        return stats.symlinks[self]
+
+    COUNTER_FMT = Struct("Q")
+    COMBINED_FMT = Struct("QQ")
+
+    def column(self, stats, index):
+        """Return the counters of one index on all threads.
+
+        Reads only that index from each thread's vector.
+        """
+        if self.type == 2:
+            unpack = self.COUNTER_FMT.unpack_from
+            counter = SimpleList()
+        elif self.type == 3:
+            unpack = self.COMBINED_FMT.unpack_from
+            counter = CombinedList()
+        else:
+            return self.get_counter(stats)[:, index]
+        width = self.type - 1
+        seg = stats.statseg
+        for offset, length in self.thread_vectors(stats, width):
+            if index >= length:
+                raise IndexError("Index beyond end of vector")
+            value = unpack(seg, offset + index * width * 8)
+            counter.append(value[0] if width == 1 else StatsTuple(value))
+        return counter
 
     def get_counter(self, stats):
         """Return a list of counters"""
         if stats:
             return self.function(stats)
 
+    def thread_vectors(self, stats, width):
+        """Return the offset and length of the vector of each thread.
+
+        Must be called with the lock held. The result is cached until the
+        epoch changes, as VPP only moves vectors within a new epoch.
+        """
+        epoch = stats.lock.epoch
+        cached = stats.vectors.get(self)
+        if cached is not None and cached[0] == epoch:
+            return cached[1]
+        seg = stats.statseg
+        base = stats.base
+        outer = self.value - base
+        threads = VEC_LEN_FMT.unpack_from(seg, outer - 8)[0]
+        if outer + threads * 8 >= stats.size:
+            raise IOError("Vector overruns stats segment")
+        vectors = []
+        for i in range(threads):
+            offset = POINTER_FMT.unpack_from(seg, outer + i * 8)[0] - base
+            length = VEC_LEN_FMT.unpack_from(seg, offset - 8)[0]
+            if offset + length * width * 8 >= stats.size:
+                raise IOError("Vector overruns stats segment")
+            vectors.append((offset, length))
+        stats.vectors[self] = (epoch, vectors)
+        return vectors
+
+    def read_raw(self, stats, cache):
+        """Copy the counter out of the segment, undecoded.
+
+        Must be called with the lock held. Symlink targets are copied
+        once per cache.
+        """
+        if self.type == 2 or self.type == 3:
+            width = self.type - 1
+            vectors = self.thread_vectors(stats, width)
+            seg = stats.statseg
+            size = width * 8
+            raw = b"".join([seg[o : o + n * size] for o, n in vectors])
+            return (self.type, width, vectors, raw)
+        if self.type == 6:
+            target, index = self.symlink_target(stats)
+            if target not in cache:
+                cache[target] = target.read_raw(stats, cache)
+            return (6, index, cache[target])
+        return (self.type, self.get_counter(stats))
+
+    def counter_array(self, stats, width):
+        """Copy a per-thread counter vector into a [threads, indexes] array"""
+        vectors = self.thread_vectors(stats, width)
+        shape = (len(vectors), max((v[1] for v in vectors), default=0))
+        if width > 1:
+            shape += (width,)
+        array = numpy.zeros(shape, dtype=numpy.uint64)
+        for thread, (offset, length) in enumerate(vectors):
+            array[thread, :length] = numpy.frombuffer(
+                stats.statseg, numpy.uint64, length * width, offset
+            ).reshape((length,) + shape[2:])
+        return array
+
+    def get_array(self, stats):
+        """Return the counter as a NumPy array"""
+        if self.type == 2:
+            return self.counter_array(stats, 1)
+        if self.type == 3:
+            return self.counter_array(stats, 2)
+        if self.type == 6:
+            target, index = self.symlink_target(stats)
+            if target.type not in (2, 3):
+                raise ValueError("Not a counter: type {}".format(target.type))
+            return numpy.array(target.column(stats, index), dtype=numpy.uint64)
+        raise ValueError("Not a counter: type {}".format(self.type))
+
 
 class TestStats(unittest.TestCase):
     """Basic statseg tests"""
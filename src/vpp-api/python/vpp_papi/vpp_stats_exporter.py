@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2024 Cisco and/or its affiliates.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at:
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Export the VPP statistics segment to Prometheus.
+
+Serves the counters in the Prometheus text format on /metrics, reading
+them from the memory mapped stats segment. Nothing runs in VPP, unlike
+with the prom plugin, whose metric names and labels are kept:
+
+    /if/rx      vpp_if_rx_packets{thread="0",interface="1"} 10
+                vpp_if_rx_bytes{thread="0",interface="1"} 640
+    /if/drops   vpp_if_drops{thread="0",interface="1"} 2
+    /sys/...    vpp_sys_... 1.00
+    /if/names   vpp_if_names_info{index="1",name="pg0"} 1
+
+Parts of a path can be turned into labels with label patterns. Their
+named groups become labels and are cut out of the metric name. The
+default pattern turns /interfaces/pg0/rx into
+vpp_interfaces_rx_packets{interface="pg0",thread="0"}.
+
+The text of each counter is kept between scrapes and rendered again
+only when its data changed. Scrapes within max_age of the previous one
+are answered from the cached response without reading the segment.
+
+    python3 -m vpp_papi.vpp_stats_exporter --port 9482 -i '^/if/' -x '.*drops'
+"""
+
+import argparse
+import array
+import gzip
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .vpp_stats import VPPStats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LABEL_PATTERNS = [r"^/interfaces/(?P<interface>[^/]+)/"]
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9]")
+
+
+def metric_name(path, prefix="vpp"):
+    """Return the metric name for a stats path, as the prom plugin does"""
+    return prefix + _NAME_RE.sub("_", path)
+
+
+def escape_label(value):
+    """Escape a label value for the text format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_INDEX_SUFFIXES = {}
+
+
+def _index_suffixes(label, length):
+    """Return the end of the labels of the first length indexes.
+
+    Shared by all counters, so every index is formatted only once.
+    """
+    suffixes = _INDEX_SUFFIXES.setdefault(label, [])
+    if len(suffixes) < length:
+        suffixes.extend(',%s="%d"} ' % (label, i) for i in range(len(suffixes), length))
+    return suffixes
+
+
+class StatsFamily:
+    """How one stats path is rendered.
+
+    Holds the metric name and the labels taken from the path, and caches
+    the label prefix of every series, which only changes when the
+    vectors of the counter grow.
+    """
+
+    __slots__ = ("path", "name", "labels", "prefixes", "data", "text")
+
+    def __init__(self, path, name, labels):
+        self.path = path
+        self.name = name
+        self.labels = "".join('%s="%s",' % (k, escape_label(v)) for k, v in labels)
+        self.prefixes = {}
+        self.data = None
+        self.text = None
+
+    def series(self, suffix, index_label, lengths):
+        """Return the label prefixes of a per-thread counter.
+
+        One prefix for each index of each thread, in the order of the
+        counter vectors.
+        """
+        key = (suffix, index_label, lengths)
+        try:
+            return self.prefixes[key]
+        except KeyError:
+            pass
+        head = "%s%s{%sthread=" % (self.name, suffix, self.labels)
+        prefixes = []
+        for thread, length in enumerate(lengths):
+            thread_head = '%s"%d"' % (head, thread)
+            if index_label:
+                suffixes = _index_suffixes(index_label, length)
+                prefixes.extend(map(thread_head.__add__, suffixes[:length]))
+            else:
+                prefixes.extend([thread_head + "} "] * length)
+        if len(self.prefixes) > 8:
+            self.prefixes.clear()
+        self.prefixes[key] = prefixes
+        return prefixes
+
+
+def _symlink_column(data):
+    """Cut the index a symlink points to out of its target's data.
+
+    Threads whose vector does not reach the index count zero.
+    """
+    _, index, target = data
+    if target[0] != 2 and target[0] != 3:
+        return None
+    _, width, vectors, raw = target
+    size = width * 8
+    column = []
+    offset = 0
+    for _, length in vectors:
+        if index < length:
+            start = offset + index * size
+            column.append(raw[start : start + size])
+        else:
+            column.append(bytes(size))
+        offset += length * size
+    return (6, width, b"".join(column))
+
+
+def _lines(prefixes, values, used_only):
+    """Join series prefixes with their values"""
+    if used_only:
+        pairs = [(p, v) for p, v in zip(prefixes, values) if v]
+        if not pairs:
+            return ""
+        prefixes, values = zip(*pairs)
+    return "\n".join(map(str.__add__, prefixes, map(str, values))) + "\n"
+
+
+class StatsExporter:
+    """Render the stats segment in the Prometheus text format.
+
+    include and exclude are lists of regular expressions matched against
+    the start of the stats paths, as with VPPStats.ls(). Paths matching
+    any include and no exclude pattern are exported. With used_only, zero
+    counters are left out.
+    """
+
+    # Attempts at a consistent read of the segment before a scrape fails
+    read_attempts = 10
+
+    def __init__(
+        self,
+        stats,
+        include=None,
+        exclude=None,
+        label_patterns=None,
+        prefix="vpp",
+        used_only=False,
+        max_age=1.0,
+    ):
+        self.stats = stats
+        self.include = include or ["^/"]
+        self.exclude = [re.compile(p) for p in exclude or []]
+        self.label_patterns = [
+            re.compile(p)
+            for p in (LABEL_PATTERNS if label_patterns is None else label_patterns)
+        ]
+        self.prefix = prefix
+        self.used_only = used_only
+        self.max_age = max_age
+        self.families = {}
+        self.paths = None
+        self.paths_epoch = None
+        self.rendered = None
+        self.body = None
+        self.gzipped = None
+        self.scraped = None
+        self.lock = threading.Lock()
+
+    def _family(self, path):
+        family = self.families.get(path)
+        if family is None:
+            labels = []
+            name = path
+            for pattern in self.label_patterns:
+                m = pattern.search(name)
+                if not m:
+                    continue
+                groups = m.groupdict()
+                labels.extend(
+                    (label, groups[label])
+                    for label in sorted(groups, key=m.start)
+                    if groups[label] is not None
+                )
+                spans = sorted(m.span(g) for g in groups if groups[g] is not None)
+                for start, end in reversed(spans):
+                    name = name[:start] + name[end:]
+            name = re.sub("_+", "_", metric_name(name, self.prefix)).rstrip("_")
+            family = self.families[path] = StatsFamily(path, name, labels)
+        return family
+
+    def _match(self):
+        """Return the paths to export, matched again when the directory
+        changed"""
+        stats = self.stats
+        if self.paths_epoch != stats.last_epoch:
+            paths = stats.names.match(self.include)
+            if self.exclude:
+                paths = [p for p in paths if not any(x.match(p) for x in self.exclude)]
+            self.paths = paths
+            self.paths_epoch = stats.last_epoch
+            keep = set(paths)
+            self.families = {p: f for p, f in self.families.items() if p in keep}
+        return self.paths
+
+    def _read(self):
+        """Copy the raw data of all exported counters consistently.
+
+        Raises IOError if the segment kept changing for read_attempts
+        attempts.
+        """
+        stats = self.stats
+        if not stats.connected:
+            stats.connect()
+        for attempt in range(self.read_attempts):
+            try:
+                if stats.last_epoch != stats.epoch:
+                    stats.refresh(blocking=False)
+                paths = self._match()
+                with stats.lock:
+                    cache = {}
+                    directory = stats.directory
+                    return [(p, directory[p].read_raw(stats, cache)) for p in paths]
+            except IOError:
+                if attempt == self.read_attempts - 1:
+                    raise
+
+    def _render(self, family, data):
+        """Return the series of one counter, grouped by metric name"""
+        used_only = self.used_only
+        stattype = data[0] if data else 0
+        if stattype == 2 or stattype == 3:
+            _, width, vectors, raw = data
+            lengths = tuple(n for _, n in vectors)
+            values = array.array("Q", raw).tolist()
+            if width == 1:
+                prefixes = family.series("", "interface", lengths)
+                return [("", "counter", _lines(prefixes, values, used_only))]
+            result = []
+            for suffix, column in (("_packets", values[::2]), ("_bytes", values[1::2])):
+                prefixes = family.series(suffix, "interface", lengths)
+                result.append((suffix, "counter", _lines(prefixes, column, used_only)))
+            return result
+        if stattype == 6:
+            _, width, column = data
+            values = array.array("Q", column).tolist()
+            lengths = (1,) * (len(values) // width)
+            if width == 1:
+                prefixes = family.series("", None, lengths)
+                return [("", "counter", _lines(prefixes, values, used_only))]
+            prefixes = family.series("_packets", None, lengths)
+            result = [("_packets", "counter", _lines(prefixes, values[::2], used_only))]
+            prefixes = family.series("_bytes", None, lengths)
+            result.append(
+                ("_bytes", "counter", _lines(prefixes, values[1::2], used_only))
+            )
+            return result
+        if stattype == 1:
+            if used_only and not data[1]:
+                return [("", "gauge", "")]
+            labels = "{%s}" % family.labels[:-1] if family.labels else ""
+            return [("", "gauge", "%s%s %.2f\n" % (family.name, labels, data[1]))]
+        if stattype == 4:
+            lines = [
+                '%s_info{%sindex="%d",name="%s"} 1\n'
+                % (family.name, family.labels, i, escape_label(name))
+                for i, name in enumerate(data[1])
+            ]
+            return [("_info", "gauge", "".join(lines))]
+        return []
+
+    def render(self):
+        """Read the counters and return the text of all metrics.
+
+        Only counters whose data changed since the previous call are
+        rendered again.
+        """
+        metrics = {}
+        counters = self._read()
+        changed = self.paths is not self.rendered
+        for path, data in counters:
+            family = self._family(path)
+            if data[0] == 6:
+                data = _symlink_column(data)
+            if family.data != data:
+                family.text = self._render(family, data)
+                family.data = data
+                changed = True
+            for suffix, kind, text in family.text:
+                name = family.name + suffix
+                metric = metrics.get(name)
+                if metric is None:
+                    metric = metrics[name] = ["# TYPE %s %s\n" % (name, kind)]
+                metric.append(text)
+        if changed or self.body is None:
+            self.rendered = self.paths
+            self.body = "".join(["".join(m) for m in metrics.values()]).encode()
+            self.gzipped = None
+        return self.body
+
+    def scrape(self, gzipped=False):
+        """Return the response body, from cache if within max_age.
+
+        Safe to call from several threads.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.scraped is None or now - self.scraped >= self.max_age:
+                self.render()
+                self.scraped = now
+            if not gzipped:
+                return self.body
+            if self.gzipped is None:
+                self.gzipped = gzip.compress(self.body, compresslevel=1)
+            return self.gzipped
+
+    def serve(self, address="", port=9482):
+        """Serve /metrics until interrupted"""
+        server = ThreadingHTTPServer((address, port), StatsExporterHandler)
+        server.daemon_threads = True
+        server.exporter = self
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+
+class StatsExporterHandler(BaseHTTPRequestHandler):
+    """Answer scrapes on /metrics"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        try:
+            body = self.server.exporter.scrape(gzipped)
+        except IOError:
+            self.send_error(503, "Stats segment is being updated")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--socket", default=VPPStats.default_socketname)
+    parser.add_argument("--address", default="")
+    parser.add_argument("--port", type=int, default=9482)
+    parser.add_argument("-i", "--include", action="append", metavar="PATTERN")
+    parser.add_argument("-x", "--exclude", action="append", metavar="PATTERN")
+    parser.add_argument(
+        "-l",
+        "--label-pattern",
+        action="append",
+        metavar="PATTERN",
+        help="regular expression whose named groups become labels",
+    )
+    parser.add_argument("--prefix", default="vpp")
+    parser.add_argument("--used-only", action="store_true")
+    parser.add_argument("--max-age", type=float, default=1.0)
+    args = parser.parse_args()
+
+    stats = VPPStats(args.socket)
+    stats.connect()
+    exporter = StatsExporter(
+        stats,
+        include=args.include,
+        exclude=args.exclude,
+        label_patterns=args.label_pattern,
+        prefix=args.prefix,
+        used_only=args.used_only,
+        max_age=args.max_age,
+    )
+    try:
+        exporter.serve(args.address, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,6 @@ import socket
 import struct
 import threading
 import select
-import multiprocessing
 import queue
 import logging
 
@@ -21,6 +20,11 @@ class VppTransportSocketIOError(IOError):
 class VppTransport:
     VppTransportSocketIOError = VppTransportSocketIOError
 
+    # Replies received but not yet read by the caller. When full the
+    # message thread stops reading the socket, so a slow reader of a
+    # large dump makes VPP wait rather than the dump pile up here.
+    max_queued = 1024
+
     def __init__(self, parent, read_timeout, server_address):
         self.connected = False
         self.read_timeout = read_timeout if read_timeout > 0 else None
@@ -28,50 +32,72 @@ class VppTransport:
         self.server_address = server_address
         self.header = struct.Struct(">QII")
         self.message_table = {}
-        # These queues can be accessed async.
-        # They are always up, but replaced on connect.
-        # TODO: Use multiprocessing.Pipe instead of multiprocessing.Queue
-        # if possible.
-        self.sque = multiprocessing.Queue()
-        self.q = multiprocessing.Queue()
+        # The reply queue is only shared between the message thread and
+        # the caller, both in this process. It is always up, but replaced
+        # on connect.
+        self.q = queue.Queue(self.max_queued)
         # The following fields are set in connect().
+        # sque is a socket pair used to terminate the message thread.
+        self.sque = None
         self.message_thread = None
         self.socket = None
+        # Receive buffer state: a partially received message and
+        # complete messages not yet handed to the message thread.
+        self.rbuf = b""
+        self.pending = []
 
     def msg_thread_func(self):
+        sque = self.sque[0]
+        # Messages received along with the sockclnt_create reply
+        for msg in self.pending:
+            self._handle_msg(msg)
+        self.pending = []
         while True:
             try:
-                rlist, _, _ = select.select([self.socket, self.sque._reader], [], [])
+                rlist, _, _ = select.select([self.socket, sque], [], [])
             except (socket.error, ValueError):
                 # Terminate thread
                 logging.error("select failed")
-                self.q.put(None)
+                self._put(None)
                 return
 
             for r in rlist:
-                if r == self.sque._reader:
+                if r == sque:
                     # Terminate
-                    self.q.put(None)
+                    self._put(None)
                     return
 
                 elif r == self.socket:
                     try:
-                        msg = self._read()
-                        if not msg:
-                            self.q.put(None)
-                            return
+                        msgs = self._read_messages()
                     except socket.error:
-                        self.q.put(None)
+                        msgs = None
+                    if msgs is None:
+                        self._put(None)
                         return
-                    # Put either to local queue or if context == 0
-                    # callback queue
-                    if not self.do_async and self.parent.has_context(msg):
-                        self.q.put(msg)
-                    else:
-                        self.parent.msg_handler_async(msg)
+                    for msg in msgs:
+                        self._handle_msg(msg)
                 else:
                     raise VppTransportSocketIOError(2, "Unknown response from select")
 
+    def _handle_msg(self, msg):
+        # Put either to local queue or if context == 0
+        # callback queue
+        if not self.do_async and self.parent.has_context(msg):
+            self._put(msg)
+        else:
+            self.parent.msg_handler_async(msg)
+
+    def _put(self, msg):
+        """Queue a reply, waiting for room while still connected."""
+        while True:
+            try:
+                self.q.put(msg, timeout=0.1)
+                return
+            except queue.Full:
+                if not self.connected:
+                    return
+
     def connect(self, name, pfx, msg_handler, rx_qlen, do_async=False):
         # TODO: Reorder the actions and add "roll-backs",
         # to restore clean disconnect state when failure happens durng connect.
@@ -94,15 +120,10 @@ class VppTransport:
 
         self.connected = True
 
-        # Queues' feeder threads from previous connect may still be sending.
-        # Close and join to avoid any errors.
-        self.sque.close()
-        self.q.close()
-        self.sque.join_thread()
-        self.q.join_thread()
-        # Finally safe to replace.
-        self.sque = multiprocessing.Queue()
-        self.q = multiprocessing.Queue()
+        self.sque = socket.socketpair()
+        self.q = queue.Queue(self.max_queued)
+        self.rbuf = b""
+        self.pending = []
         self.message_thread = threading.Thread(target=self.msg_thread_func)
 
         # Initialise sockclnt_create
@@ -143,19 +164,23 @@ class VppTransport:
         except (IOError, self.parent.VPPApiError):
             pass
         self.connected = False
-        if self.socket is not None:
-            self.socket.close()
         if self.sque is not None:
-            self.sque.put(True)  # Terminate listening thread
+            self.sque[1].send(b"\0")  # Terminate listening thread
         if self.message_thread is not None and self.message_thread.is_alive():
             # Allow additional connect() calls.
             self.message_thread.join()
+        if self.sque is not None:
+            for s in self.sque:
+                s.close()
+            self.sque = None
+        if self.socket is not None:
+            self.socket.close()
         # Wipe message table, VPP can be restarted with different plugins.
         self.message_table = {}
         # Collect garbage.
         self.message_thread = None
         self.socket = None
-        # Queues will be collected after connect replaces them.
+        # The queue will be collected after connect replaces it.
         return rv
 
     def suspend(self):
@@ -184,11 +209,26 @@ class VppTransport:
         if not self.connected:
             raise VppTransportSocketIOError(1, "Not connected")
 
-        # Send header
+        # Send header and message with a single system call
         header = self.header.pack(0, len(buf), 0)
         try:
-            self.socket.sendall(header)
-            self.socket.sendall(buf)
+            sent = self.socket.sendmsg([header, buf])
+            if sent < len(header) + len(buf):
+                self.socket.sendall((header + bytes(buf))[sent:])
+        except socket.error as err:
+            raise VppTransportSocketIOError(1, "Sendall error: {err!r}".format(err=err))
+
+    def write_many(self, bufs):
+        """Send a list of binary-packed messages to VPP in one go."""
+        if not self.connected:
+            raise VppTransportSocketIOError(1, "Not connected")
+
+        b = bytearray()
+        for buf in bufs:
+            b += self.header.pack(0, len(buf), 0)
+            b += buf
+        try:
+            self.socket.sendall(b)
         except socket.error as err:
             raise VppTransportSocketIOError(1, "Sendall error: {err!r}".format(err=err))
 
@@ -209,18 +249,50 @@ class VppTransport:
             view = view[got:]
         return buf
 
+    read_chunk_size = 65536
+
+    def _read_messages(self):
+        """Receive what is available on the socket, up to read_chunk_size.
+
+        Return the list of complete messages received, possibly empty,
+        or None on error. Messages are memoryview slices of the received
+        chunk; only a trailing partial message is copied.
+        """
+        chunk = self.socket.recv(self.read_chunk_size)
+        if not chunk:
+            return None
+        data = self.rbuf + chunk if self.rbuf else chunk
+        view = memoryview(data)
+        size = len(data)
+        msgs = []
+        offset = 0
+        while size - offset >= 16:
+            (_, msglen, _) = self.header.unpack_from(data, offset)
+            if size - offset - 16 < msglen:
+                break
+            msgs.append(view[offset + 16 : offset + 16 + msglen])
+            offset += 16 + msglen
+        self.rbuf = bytes(view[offset:])
+
+        # Read the rest of a large message directly
+        if len(self.rbuf) >= 16:
+            (_, msglen, _) = self.header.unpack(self.rbuf[:16])
+            if msglen > self.read_chunk_size:
+                rest = self._read_fixed(msglen - (len(self.rbuf) - 16))
+                if not rest:
+                    return None
+                msgs.append(self.rbuf[16:] + rest)
+                self.rbuf = b""
+        return msgs
+
     def _read(self):
         """Read single complete message, return it or empty on error."""
-        hdr = self._read_fixed(16)
-        if not hdr:
-            return
-        (_, hdrlen, _) = self.header.unpack(hdr)  # If at head of message
-
-        # Read rest of message
-        msg = self._read_fixed(hdrlen)
-        if hdrlen == len(msg):
-            return msg
-        raise VppTransportSocketIOError(1, "Unknown socket read error")
+        while not self.pending:
+            msgs = self._read_messages()
+            if msgs is None:
+                return
+            self.pending = msgs
+        return self.pending.pop(0)
 
     def read(self, timeout=None):
         if not self.connected:
@@ -26,6 +26,7 @@ from abc import ABC, abstractmethod
 
 from config import config, max_vpp_cpus
 import hook as hookmodule
+import vpp_pool
 from vpp_lo_interface import VppLoInterface
 from vpp_papi_provider import VppPapiProvider
 import vpp_papi
@@ -271,6 +272,10 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
     logger = null_logger
     vapi_response_timeout = 5
     remove_configured_vpp_objects_on_tear_down = True
+    # may take over a VPP from the pool, with --vpp-pool; only for classes
+    # leaving no configuration vpp_pool.PooledVpp.reset() can't remove
+    use_vpp_pool = False
+    pooled_vpp = None
 
     @classmethod
     def has_tag(cls, tag):
@@ -496,6 +501,29 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
     def attach_vpp(cls):
         cls.vpp = DummyVpp()
 
+    @classmethod
+    def is_vpp_pooled(cls):
+        """if the test case class may use a VPP from the pool - return true"""
+        return (
+            config.vpp_pool
+            and cls.use_vpp_pool
+            and not (cls.step or cls.debug_gdb or cls.debug_gdbserver)
+            and not cls.debug_attach
+            and not getattr(cls, "running_vpp", False)
+        )
+
+    @classmethod
+    def checkout_vpp(cls):
+        cls.logger.debug(f"Assigned cpus: {cls.cpus}")
+        cls.pooled_vpp = vpp_pool.checkout(
+            cls.vpp_cmdline,
+            cls.tempdir,
+            cls.get_api_segment_prefix(),
+            cls.cpus,
+            cls.logger,
+        )
+        cls.vpp = cls.pooled_vpp
+
     @classmethod
     def run_vpp(cls):
         cls.logger.debug(f"Assigned cpus: {cls.cpus}")
@@ -559,18 +587,26 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
 
     @classmethod
     def get_stats_sock_path(cls):
+        if cls.pooled_vpp:
+            return cls.pooled_vpp.get_stats_sock_path()
         return "%s/stats.sock" % cls.tempdir
 
     @classmethod
     def get_api_sock_path(cls):
+        if cls.pooled_vpp:
+            return cls.pooled_vpp.get_api_sock_path()
         return "%s/api.sock" % cls.tempdir
 
     @classmethod
     def get_memif_sock_path(cls):
+        if cls.pooled_vpp:
+            return cls.pooled_vpp.get_memif_sock_path()
         return "%s/memif.sock" % cls.tempdir
 
     @classmethod
     def get_api_segment_prefix(cls):
+        if cls.pooled_vpp:
+            return cls.pooled_vpp.api_segment_prefix
         return os.path.basename(cls.tempdir)  # Only used for VAPI
 
     @classmethod
@@ -611,6 +647,7 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
             cls.logger.propagate = False
         cls.set_debug_flags(config.debug)
         cls.tempdir = cls.get_tempdir()
+        cls.pooled_vpp = None
         cls.create_file_handler()
         cls.file_handler.setFormatter(
             Formatter(fmt="%(asctime)s,%(msecs)03d %(message)s", datefmt="%H:%M:%S")
@@ -636,6 +673,8 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
         try:
             if cls.debug_attach:
                 cls.attach_vpp()
+            elif cls.is_vpp_pooled():
+                cls.checkout_vpp()
             else:
                 cls.run_vpp()
             cls.reporter.send_keep_alive(cls, "setUpClass")
@@ -644,7 +683,7 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
             )
             cls.vpp_stdout_deque = deque()
             cls.vpp_stderr_deque = deque()
-            if not cls.debug_attach:
+            if not cls.debug_attach and not cls.pooled_vpp:
                 cls.pump_thread_stop_flag = Event()
                 cls.pump_thread_wakeup_pipe = os.pipe()
                 cls.pump_thread = Thread(target=pump_output, args=(cls,))
@@ -685,6 +724,8 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
                         )
                     )
                 raise e
+            if cls.pooled_vpp:
+                cls.pooled_vpp.record_baseline(cls.vapi)
             if cls.debug_attach:
                 last_line = cls.vapi.cli("show thread").split("\n")[-2]
                 cls.vpp_worker_count = int(last_line.split(" ")[0])
@@ -737,6 +778,10 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
             cls.vpp_stderr_reader_thread.join()
 
         if hasattr(cls, "vpp"):
+            # a pooled VPP goes back to the pool only if it could be reset
+            pool_release = False
+            if cls.pooled_vpp and hasattr(cls, "vapi") and not cls.vpp_dead:
+                pool_release = cls.pooled_vpp.reset(cls.vapi, cls.logger)
             if hasattr(cls, "vapi"):
                 cls.logger.debug(cls.vapi.vpp.get_stats())
                 cls.logger.debug("Disconnecting class vapi client on %s", cls.__name__)
@@ -744,7 +789,19 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
                 cls.logger.debug("Deleting class vapi attribute on %s", cls.__name__)
                 del cls.vapi
             cls.vpp.poll()
-            if not cls.debug_attach and cls.vpp.returncode is None:
+            if cls.pooled_vpp:
+                # a pooled vpp writes its output to files of the pool
+                if hasattr(cls, "vpp_stdout_deque"):
+                    stdout, stderr = cls.pooled_vpp.output()
+                    cls.vpp_stdout_deque.append(stdout)
+                    cls.vpp_stderr_deque.append(stderr)
+                if pool_release:
+                    cls.logger.debug("Returning vpp to the pool")
+                    cls.pooled_vpp.release()
+                else:
+                    cls.logger.debug("Removing vpp from the pool")
+                    cls.pooled_vpp.retire(cls.tempdir)
+            elif not cls.debug_attach and cls.vpp.returncode is None:
                 cls.wait_for_coredump()
                 cls.logger.debug("Sending TERM to vpp")
                 cls.vpp.terminate()
@@ -755,7 +812,9 @@ class VppAsfTestCase(CPUInterface, unittest.TestCase):
                     cls.vpp.kill()
                     outs, errs = cls.vpp.communicate()
             cls.logger.debug("Deleting class vpp attribute on %s", cls.__name__)
-            if not cls.debug_attach:
+            if cls.pooled_vpp:
+                cls.pooled_vpp = None
+            elif not cls.debug_attach:
                 cls.vpp.stdout.close()
                 cls.vpp.stderr.close()
             del cls.vpp
@@ -0,0 +1,128 @@
+"""wait for capture files to change without polling"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event: wd, mask, cookie, len, followed by len bytes of name
+EVENT_HEADER = struct.Struct("iIII")
+
+# sleep between checks when inotify is not available
+POLL_INTERVAL = 0.001
+
+_libc = None
+
+
+def _inotify_libc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            libc = False
+        _libc = libc
+    return _libc
+
+
+class CaptureWatcher:
+    """Wait for files in a directory to be created or written to.
+
+    Uses inotify where available, so a waiting test sleeps until VPP
+    writes a capture instead of spinning on os.path.isfile(). Elsewhere,
+    wait() sleeps for a short interval.
+
+    Events are queued from the moment the watcher is created, so a
+    change between checking a file and calling wait() is not missed.
+    Changes to other files in the directory, such as the test log, are
+    remembered for their own waiters but do not end a wait.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        # names of the files changed and not waited for yet
+        self.changed = set()
+        libc = _inotify_libc()
+        if not libc:
+            return
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK) < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def wait(self, timeout, name):
+        """Wait up to timeout seconds for a change of file name.
+
+        :param name: name of the file in the directory
+        :returns: True if the file changed, False on timeout. Without
+                  inotify, always True after a short sleep.
+        """
+        if self.fd is None:
+            time.sleep(min(max(timeout, 0), POLL_INTERVAL))
+            return True
+        deadline = time.time() + timeout
+        while name not in self.changed:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if readable:
+                self.read_events()
+        self.changed.discard(name)
+        return True
+
+    def read_events(self):
+        """Remember the files named by the queued events"""
+        try:
+            while True:
+                data = os.read(self.fd, 4096)
+                if not data:
+                    break
+                offset = 0
+                while offset < len(data):
+                    _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset : offset + length].rstrip(b"\0")
+                    offset += length
+                    if name:
+                        self.changed.add(os.fsdecode(name))
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+_watchers = {}
+
+
+def get_capture_watcher(path):
+    """Return the watcher of a directory, shared by all its users"""
+    watcher = _watchers.get(path)
+    if watcher is None:
+        watcher = _watchers[path] = CaptureWatcher(path)
+    return watcher
+
+
+def close_capture_watcher(path):
+    watcher = _watchers.pop(path, None)
+    if watcher is not None:
+        watcher.close()
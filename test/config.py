@@ -202,6 +202,26 @@ parser.add_argument(
     "--sanity", action="store_true", help="perform sanity vpp run before running tests"
 )
 parser.add_argument("--api-preload", action="store_true", help="preload API files")
+parser.add_argument(
+    "--suite-history",
+    action="store",
+    help="file with run times of test suites from previous runs, used to "
+    "schedule the longest ones first (default: next to --venv-dir, "
+    "empty to disable)",
+)
+parser.add_argument(
+    "--discovery-index",
+    action="store",
+    help="file caching the test classes and methods found in test files, "
+    "so a filtered run loads only matching ones (default: next to "
+    "--venv-dir, empty to disable caching)",
+)
+parser.add_argument(
+    "--vpp-pool",
+    action="store_true",
+    help="reuse VPP instances between test classes with the same VPP "
+    "command line which set use_vpp_pool, resetting them in between",
+)
 
 parser.add_argument(
     "--force-foreground",
@@ -459,6 +479,12 @@ if config.venv_dir is None:
 if config.failed_dir is None:
     config.failed_dir = f"{config.tmp_dir}"
 
+if config.suite_history is None:
+    config.suite_history = f"{os.path.dirname(config.venv_dir)}/suite-history.json"
+
+if config.discovery_index is None:
+    config.discovery_index = f"{os.path.dirname(config.venv_dir)}/discovery-index.json"
+
 available_cpus = psutil.Process().cpu_affinity()
 num_cpus = len(available_cpus)
 
@@ -1,17 +1,265 @@
 #!/usr/bin/env python3
 
+import ast
 import sys
 import os
+import json
 import unittest
 import importlib
 
+# bases which contribute no test methods
+NO_TEST_BASES = {"object", "TestCase", "VppTestCase", "VppAsfTestCase"}
 
-def discover_tests(directory, callback):
+# decorators replacing a class, or its methods, by ones named differently
+RENAMING_DECORATORS = {"parameterized", "parameterized_class"}
+
+
+def _base_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _decorator_name(node):
+    """Return the name a decorator is looked up by: a for @a.b(c)"""
+    if isinstance(node, ast.Call):
+        node = node.func
+    while isinstance(node, ast.Attribute):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _renames(decorators):
+    return any(_decorator_name(d) in RENAMING_DECORATORS for d in decorators)
+
+
+def _statements(body):
+    """Yield module level statements, including those under if/try"""
+    for node in body:
+        yield node
+        if isinstance(node, ast.If):
+            yield from _statements(node.body)
+            yield from _statements(node.orelse)
+        elif isinstance(node, ast.Try):
+            yield from _statements(node.body)
+            for handler in node.handlers:
+                yield from _statements(handler.body)
+            yield from _statements(node.orelse)
+            yield from _statements(node.finalbody)
+
+
+def scan_test_file(path):
+    """Statically list the classes of a test file and their test methods.
+
+    A class is open if it may have test methods not visible in the file,
+    inherited from a class defined elsewhere or added at run time, and
+    renamed if it is replaced by classes of other names. Names imported
+    from other modules are listed too, they may be test classes found in
+    this module.
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    classes = {}
+    imports = []
+    star = False
+    dynamic = False
+    for node in _statements(tree.body):
+        if isinstance(node, ast.ClassDef):
+            methods = []
+            renamed_methods = False
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    methods.append(item.name)
+                    renamed_methods = renamed_methods or _renames(item.decorator_list)
+                elif isinstance(item, ast.Assign):
+                    methods.extend(
+                        t.id for t in item.targets if isinstance(t, ast.Name)
+                    )
+            classes[node.name] = {
+                "bases": [_base_name(b) for b in node.bases],
+                "methods": [m for m in methods if m.startswith("test_")],
+                "open": renamed_methods,
+                "renamed": _renames(node.decorator_list),
+            }
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name == "*":
+                    star = True
+                else:
+                    imports.append(alias.asname or alias.name)
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == "setattr"
+        ):
+            dynamic = True
+            break
+
+    def resolve(name, seen):
+        cls = classes[name]
+        methods = set(cls["methods"])
+        is_open = dynamic or cls["open"]
+        for base in cls["bases"]:
+            if base in classes and base not in seen:
+                base_methods, base_open = resolve(base, seen | {base})
+                methods |= base_methods
+                is_open = is_open or base_open
+            elif base not in NO_TEST_BASES:
+                is_open = True
+        return methods, is_open
+
+    result = {}
+    for name in classes:
+        methods, is_open = resolve(name, {name})
+        result[name] = {
+            "methods": sorted(methods),
+            "open": is_open,
+            "renamed": classes[name]["renamed"],
+        }
+    return {"classes": result, "imports": imports, "star": star}
+
+
+class DiscoveryIndex:
+    """Statically scanned test files, cached in a JSON file by mtime.
+
+    Lets discover_tests() skip importing modules which cannot contain
+    tests selected by a filter.
+    """
+
+    version = 2
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {}
+        self.seen = set()
+        self.dirty = False
+        # test files not imported by discover_tests()
+        self.skipped = 0
+        # class name: paths of the seen files with it as a test class
+        self._test_classes = None
+        if path is None:
+            return
+        try:
+            with open(path) as f:
+                cache = json.load(f)
+            if cache.get("version") == self.version:
+                self.files = cache["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, path):
+        """Return the scan of a test file, None if it cannot be parsed"""
+        path = os.path.abspath(path)
+        self.seen.add(path)
+        st = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["scan"]
+        try:
+            scan = scan_test_file(path)
+        except (SyntaxError, ValueError):
+            scan = None
+        self.files[path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "scan": scan}
+        self.dirty = True
+        self._test_classes = None
+        return scan
+
+    def scan_tree(self, directory):
+        """Scan all test files under directory"""
+        for root, _, files in os.walk(directory):
+            for f in files:
+                if f.startswith("test_") and f.endswith(".py"):
+                    self.get(os.path.join(root, f))
+
+    def is_test_class(self, name, path):
+        """if name is a class which may have tests in a seen test file other
+        than path - return true"""
+        if self._test_classes is None:
+            self._test_classes = {}
+            for p in self.seen:
+                scan = self.files[p]["scan"]
+                if scan is None:
+                    continue
+                for cls_name, cls in scan["classes"].items():
+                    if cls["open"] or cls["methods"]:
+                        self._test_classes.setdefault(cls_name, set()).add(p)
+        return bool(self._test_classes.get(name, set()) - {os.path.abspath(path)})
+
+    def save(self):
+        if self.path is None:
+            return
+        if set(self.files) != self.seen:
+            self.files = {p: e for p, e in self.files.items() if p in self.seen}
+            self.dirty = True
+        if not self.dirty:
+            return
+        tmp = "%s.%d" % (self.path, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": self.version, "files": self.files}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("Cannot save test discovery index %s: %s" % (self.path, e))
+        self.dirty = False
+
+
+def may_have_tests(scan, file_name, filter_cb, is_test_class=None):
+    """if the scanned file may have tests filter_cb accepts - return true
+
+    filter_cb(file_name, class_name, method_name) is asked about every
+    test method seen. Where the methods are not known, it is asked with
+    filter_cb.may_match(file_name, class_name) if it has that, class_name
+    None meaning any class. Imported names count as such classes only if
+    is_test_class(name) is true for them, if given.
+    """
+    if scan is None:
+        return True
+    may_match = getattr(filter_cb, "may_match", None)
+
+    def any_test(class_name):
+        return may_match is None or may_match(file_name, class_name)
+
+    for name, cls in scan["classes"].items():
+        if cls["renamed"]:
+            if any_test(None):
+                return True
+        elif cls["open"]:
+            if any_test(name):
+                return True
+        elif any(filter_cb(file_name, name, m) for m in cls["methods"]):
+            return True
+    if scan["star"]:
+        return any_test(None)
+    return any(
+        any_test(name)
+        for name in scan["imports"]
+        if is_test_class is None or is_test_class(name)
+    )
+
+
+def discover_tests(directory, callback, filter_cb=None, index=None):
+    """Call callback(file_name, cls, method) for every test in directory.
+
+    With filter_cb, modules found by the index not to have any test it
+    accepts are not imported, and their tests are not passed to callback.
+    """
+    if filter_cb is not None:
+        if index is None:
+            index = DiscoveryIndex()
+        # imported test classes are looked up among all test files
+        index.scan_tree(directory)
+    _discover_tests(directory, callback, filter_cb, index)
+
+
+def _discover_tests(directory, callback, filter_cb, index):
     do_insert = True
     for _f in os.listdir(directory):
         f = "%s/%s" % (directory, _f)
         if os.path.isdir(f):
-            discover_tests(f, callback)
+            _discover_tests(f, callback, filter_cb, index)
             continue
         if not os.path.isfile(f):
             continue
@@ -20,6 +268,11 @@ def discover_tests(directory, callback):
             do_insert = False
         if not _f.startswith("test_") or not _f.endswith(".py"):
             continue
+        if filter_cb is not None and not may_have_tests(
+            index.get(f), _f, filter_cb, lambda name: index.is_test_class(name, f)
+        ):
+            index.skipped += 1
+            continue
         name = "".join(f.split("/")[-1].split(".")[:-1])
         module = importlib.import_module(name)
         for name, cls in module.__dict__.items():
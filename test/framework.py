@@ -26,6 +26,7 @@ from struct import pack, unpack
 
 import scapy.compat
 from scapy.packet import Raw, Packet
+from capture_watcher import close_capture_watcher
 from vpp_pg_interface import VppPGInterface, is_ipv6_misc
 from vpp_sub_interface import VppSubInterface
 from vpp_lo_interface import VppLoInterface
@@ -107,11 +108,13 @@ class VppTestCase(VppAsfTestCase):
         cls.reset_packet_infos()
         cls._pcaps = []
         cls._old_pcaps = []
+        cls._pg_stopped = False
 
     @classmethod
     def tearDownClass(cls):
         cls.logger.debug("--- tearDownClass() for %s called ---" % cls.__name__)
         cls.reset_packet_infos()
+        close_capture_watcher(cls.tempdir)
         super(VppTestCase, cls).tearDownClass()
 
     @classmethod
@@ -143,17 +146,23 @@ class VppTestCase(VppAsfTestCase):
         if trace:
             cls.vapi.cli("clear trace")
             cls.vapi.cli("trace add pg-input 1000" + (" filter" if traceFilter else ""))
+        cls._pg_stopped = False
         cls.vapi.cli("packet-generator enable")
         # PG, when starts, runs to completion -
         # so let's avoid a race condition,
         # and wait a little till it's done.
         # Then clean it up  - and then be gone.
         deadline = time.time() + 300
+        delay = 0.001
         while cls.vapi.cli("show packet-generator").find("Yes") != -1:
-            cls.sleep(0.01)  # yield
+            time.sleep(delay)  # yield
+            delay = min(delay * 2, 0.01)
             if time.time() > deadline:
                 cls.logger.error("Timeout waiting for pg to stop")
                 break
+        else:
+            # VppPGInterface.wait_for_pg_stop() needn't ask again
+            cls._pg_stopped = True
         for intf, worker in cls._pcaps:
             cls.vapi.cli("packet-generator delete %s" % intf.get_cap_name(worker))
         cls._old_pcaps = cls._pcaps
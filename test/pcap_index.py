@@ -0,0 +1,211 @@
+"""read pcap captures without dissecting every packet up front"""
+
+import mmap
+import os
+import struct
+from decimal import Decimal
+
+from scapy.config import conf
+from scapy.data import MTU
+from scapy.utils import EDecimal
+
+# magic: (endian, nanosecond timestamps)
+PCAP_MAGIC = {
+    b"\xa1\xb2\xc3\xd4": (">", False),
+    b"\xd4\xc3\xb2\xa1": ("<", False),
+    b"\xa1\xb2\x3c\x4d": (">", True),
+    b"\x4d\x3c\xb2\xa1": ("<", True),
+}
+PCAP_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+
+
+class PcapIndex:
+    """Index of the packet records of a pcap file.
+
+    update() maps the file and records the packets added since the
+    previous update, up to the last complete one, as raw bytes. A packet
+    is dissected with scapy when first asked for, as PcapReader would.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            header = self.f.read(PCAP_HEADER_SIZE)
+            if len(header) < PCAP_HEADER_SIZE:
+                raise EOFError("Incomplete pcap header in %s" % path)
+            try:
+                endian, nano = PCAP_MAGIC[header[:4]]
+            except KeyError:
+                raise ValueError("Not a pcap capture file (bad magic: %r)" % header[:4])
+        except:
+            self.f.close()
+            raise
+        linktype = struct.unpack(endian + "I", header[20:24])[0]
+        self.ll_cls = conf.l2types.num2layer.get(linktype, conf.raw_layer)
+        self.time_unit = Decimal(10) ** Decimal(-9 if nano else -6)
+        self.record_header = struct.Struct(endian + "IIII")
+        self.inode = os.fstat(self.f.fileno()).st_ino
+        self.offset = PCAP_HEADER_SIZE
+        # raw records as (data, sec, usec, wirelen), or dissected packets
+        self.items = []
+
+    def update(self):
+        """Index the records added since the previous update.
+
+        :returns: number of new records
+        """
+        size = os.fstat(self.f.fileno()).st_size
+        offset = self.offset
+        if size < offset + RECORD_HEADER_SIZE:
+            return 0
+        items = self.items
+        before = len(items)
+        unpack = self.record_header.unpack_from
+        with mmap.mmap(self.f.fileno(), size, access=mmap.ACCESS_READ) as m:
+            while offset + RECORD_HEADER_SIZE <= size:
+                sec, usec, caplen, wirelen = unpack(m, offset)
+                start = offset + RECORD_HEADER_SIZE
+                end = start + caplen
+                if end > size:
+                    break
+                items.append((m[start : start + min(caplen, MTU)], sec, usec, wirelen))
+                offset = end
+        self.offset = offset
+        return len(items) - before
+
+    def raw(self, i):
+        """Return the bytes of packet i without dissecting it"""
+        item = self.items[i]
+        if type(item) is tuple:
+            return item[0]
+        return bytes(item)
+
+    def packet(self, i):
+        """Return packet i, dissecting it on first use"""
+        item = self.items[i]
+        if type(item) is not tuple:
+            return item
+        data, sec, usec, wirelen = item
+        try:
+            p = self.ll_cls(data)
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            p = conf.raw_layer(data)
+        p.time = EDecimal(sec + self.time_unit * usec)
+        p.wirelen = wirelen
+        self.items[i] = p
+        return p
+
+    def packets(self):
+        """Return all packets indexed so far, not yet dissected"""
+        return LazyPackets(self, range(len(self.items)))
+
+    def close(self):
+        self.f.close()
+
+
+def _dissecting(method):
+    """Wrap a list method to dissect the packets of LazyPackets first"""
+
+    def wrapper(self, *args):
+        self.dissect_all()
+        for arg in args:
+            if isinstance(arg, LazyPackets):
+                arg.dissect_all()
+        return method(self, *args)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class LazyPackets(list):
+    """A list of packets of a PcapIndex, dissected on first access.
+
+    Meant as the res of a scapy PacketList. Packets not accessed yet are
+    held as their position in the index, so len() and filtering on raw()
+    bytes need no dissection. A dissected packet replaces its position,
+    and list operations which would see the positions dissect all the
+    packets first, after which this is a plain list of packets.
+    """
+
+    def __init__(self, index, items):
+        super().__init__(items)
+        self._index = index
+
+    def _packet(self, i, item):
+        if type(item) is not int:
+            return item
+        p = self._index.packet(item)
+        list.__setitem__(self, i, p)
+        return p
+
+    def dissect_all(self):
+        """Dissect all packets not accessed yet"""
+        for i, item in enumerate(list.__iter__(self)):
+            if type(item) is int:
+                self._packet(i, item)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return LazyPackets(self._index, list.__getitem__(self, i))
+        if i < 0:
+            i += len(self)
+        return self._packet(i, list.__getitem__(self, i))
+
+    def __iter__(self):
+        for i, item in enumerate(list.__iter__(self)):
+            yield self._packet(i, item)
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def pop(self, i=-1):
+        p = self[i]
+        list.pop(self, i)
+        return p
+
+    def raw(self, i):
+        """Return the bytes of packet i without dissecting it"""
+        item = list.__getitem__(self, i)
+        if type(item) is int:
+            return self._index.raw(item)
+        return bytes(item)
+
+    def filter_out(self, fn, may_match=None):
+        """Return the packets for which fn is false.
+
+        may_match is a cheap test on raw bytes: packets it is false for
+        are kept without being dissected for fn.
+        """
+        keep = []
+        for i, item in enumerate(list.__iter__(self)):
+            if may_match is not None and not may_match(self.raw(i)):
+                keep.append(item)
+            elif not fn(self._packet(i, item)):
+                keep.append(self._packet(i, item))
+        return LazyPackets(self._index, keep)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    __add__ = _dissecting(list.__add__)
+    __mul__ = _dissecting(list.__mul__)
+    __rmul__ = _dissecting(list.__rmul__)
+    __contains__ = _dissecting(list.__contains__)
+    __eq__ = _dissecting(list.__eq__)
+    __ne__ = _dissecting(list.__ne__)
+    __lt__ = _dissecting(list.__lt__)
+    __le__ = _dissecting(list.__le__)
+    __gt__ = _dissecting(list.__gt__)
+    __ge__ = _dissecting(list.__ge__)
+    __repr__ = _dissecting(list.__repr__)
+    copy = _dissecting(list.copy)
+    count = _dissecting(list.count)
+    index = _dissecting(list.index)
+    remove = _dissecting(list.remove)
+    sort = _dissecting(list.sort)
@@ -2,6 +2,7 @@
 
 import sys
 import shutil
+import atexit
 import os
 import fnmatch
 import unittest
@@ -34,8 +35,10 @@ from log import (
     colorize,
     single_line_delim,
 )
-from discover_tests import discover_tests
+from discover_tests import discover_tests, DiscoveryIndex
 import sanity_run_vpp
+import vpp_pool
+from suite_scheduler import SuiteHistory, SuiteScheduler, is_solo
 from subprocess import check_output, CalledProcessError
 from util import check_core_path, get_core_path, is_core_present
 
@@ -157,7 +160,8 @@ def test_runner_wrapper(
         failfast=config.failfast,
         print_summary=False,
     ).run(suite)
-    finished_pipe.send(result.wasSuccessful())
+    # CPU time of this process and of the VPP it waited for
+    finished_pipe.send((result.wasSuccessful(), sum(os.times()[:4])))
     finished_pipe.close()
     keep_alive_pipe.close()
 
@@ -187,6 +191,7 @@ class TestCaseWrapper(object):
         self._last_test = None
         self.last_test_id = None
         self.vpp_pid = None
+        self.cpu_time = 0
         self.last_heard = time.time()
         self.core_detected_at = None
         self.testcases_by_id = {}
@@ -368,7 +373,6 @@ def process_finished_testsuite(
 
 def run_forked(testcase_suites):
     wrapped_testcase_suites = set()
-    solo_testcase_suites = []
 
     # suites are unhashable, need to use list
     results = []
@@ -378,6 +382,20 @@ def run_forked(testcase_suites):
     manager.start()
     tests_running = 0
     free_cpus = list(available_cpus)
+    scheduler = SuiteScheduler(
+        testcase_suites,
+        suite_history,
+        len(free_cpus),
+        max_concurrent_tests,
+        max_vpp_cpus,
+    )
+    predicted_makespan = scheduler.simulate()
+    unknown = sum(1 for s in testcase_suites if s not in suite_history)
+    print(
+        f"Predicted makespan is {predicted_makespan:.1f}s for "
+        f"{len(testcase_suites)} suite(s), {unknown} of them without history"
+    )
+    run_start = time.time()
 
     def on_suite_start(tc):
         nonlocal tests_running
@@ -396,33 +414,30 @@ def run_forked(testcase_suites):
         nonlocal wrapped_testcase_suites
         nonlocal unread_testcases
         nonlocal free_cpus
-        suite.assign_cpus(free_cpus[: suite.cpus_used])
-        free_cpus = free_cpus[suite.cpus_used :]
+        cpus = scheduler.cpus_needed(suite)
+        suite.assign_cpus(free_cpus[:cpus])
+        free_cpus = free_cpus[cpus:]
         wrapper = TestCaseWrapper(suite, manager)
+        wrapper.start_time = time.time()
+        wrapper.predicted_end = wrapper.start_time + scheduler.predict(suite)
+        wrapper.load = scheduler.load(suite)
+        wrapper.solo = is_solo(suite)
         wrapped_testcase_suites.add(wrapper)
         unread_testcases.add(wrapper)
         on_suite_start(suite)
 
-    def can_run_suite(suite):
-        return tests_running < max_concurrent_tests and (
-            suite.cpus_used <= len(free_cpus) or suite.cpus_used > max_vpp_cpus
-        )
-
-    while free_cpus and testcase_suites:
-        a_suite = testcase_suites[0]
-        if a_suite.is_tagged_run_solo:
-            a_suite = testcase_suites.pop(0)
-            solo_testcase_suites.append(a_suite)
-            continue
-        if can_run_suite(a_suite):
-            a_suite = testcase_suites.pop(0)
+    def run_suites():
+        while True:
+            running = [
+                (w.predicted_end, len(w.get_assigned_cpus()), w.load, w.solo)
+                for w in wrapped_testcase_suites
+            ]
+            a_suite = scheduler.pick(time.time(), running, len(free_cpus))
+            if a_suite is None:
+                break
             run_suite(a_suite)
-        else:
-            break
 
-    if tests_running == 0 and solo_testcase_suites:
-        a_suite = solo_testcase_suites.pop(0)
-        run_suite(a_suite)
+    run_suites()
 
     read_from_testcases = threading.Event()
     read_from_testcases.set()
@@ -436,7 +451,7 @@ def run_forked(testcase_suites):
     stop_run = False
 
     try:
-        while wrapped_testcase_suites or testcase_suites:
+        while wrapped_testcase_suites or scheduler.pending:
             finished_testcase_suites = set()
             for wrapped_testcase_suite in wrapped_testcase_suites:
                 while wrapped_testcase_suite.result_parent_end.poll():
@@ -455,7 +470,9 @@ def run_forked(testcase_suites):
                     wrapped_testcase_suite.last_heard = time.time()
 
                 if wrapped_testcase_suite.finished_parent_end.poll():
-                    wrapped_testcase_suite.finished_parent_end.recv()
+                    _, wrapped_testcase_suite.cpu_time = (
+                        wrapped_testcase_suite.finished_parent_end.recv()
+                    )
                     wrapped_testcase_suite.last_heard = time.time()
                     stop_run = (
                         process_finished_testsuite(
@@ -553,24 +570,18 @@ def run_forked(testcase_suites):
                 finished_unread_testcases.add(finished_testcase)
                 finished_testcase.stdouterr_queue.put(None)
                 on_suite_finish(finished_testcase)
+                if not finished_testcase.result.crashed:
+                    suite_history.record(
+                        finished_testcase.testcase_suite,
+                        join_end - finished_testcase.start_time,
+                        finished_testcase.cpu_time,
+                        finished_testcase.cpus_used,
+                    )
                 if stop_run:
-                    while testcase_suites:
-                        results.append(TestResult(testcase_suites.pop(0)))
-                elif testcase_suites:
-                    a_suite = testcase_suites[0]
-                    while a_suite and a_suite.is_tagged_run_solo:
-                        testcase_suites.pop(0)
-                        solo_testcase_suites.append(a_suite)
-                        if testcase_suites:
-                            a_suite = testcase_suites[0]
-                        else:
-                            a_suite = None
-                    if a_suite and can_run_suite(a_suite):
-                        testcase_suites.pop(0)
-                        run_suite(a_suite)
-                if solo_testcase_suites and tests_running == 0:
-                    a_suite = solo_testcase_suites.pop(0)
-                    run_suite(a_suite)
+                    while scheduler.pending:
+                        results.append(TestResult(scheduler.pending.pop(0)))
+                else:
+                    run_suites()
             time.sleep(0.1)
     except Exception:
         for wrapped_testcase_suite in wrapped_testcase_suites:
@@ -583,6 +594,11 @@ def run_forked(testcase_suites):
         manager.shutdown()
 
     handle_cores(failed_wrapped_testcases)
+    suite_history.save()
+    print(
+        f"Makespan was {time.time() - run_start:.1f}s, "
+        f"predicted {predicted_makespan:.1f}s"
+    )
     return results
 
 
@@ -701,9 +717,9 @@ class FilterByTestOption:
                 fn_match = fnmatch.fnmatch(file_name, filter_file_name)
                 if not fn_match:
                     return False
-            if filter_class_name and class_name != filter_class_name:
+            if filter_class_name and class_name not in (None, filter_class_name):
                 return False
-            if filter_func_name and func_name != filter_func_name:
+            if filter_func_name and func_name not in (None, filter_func_name):
                 return False
             return True
 
@@ -720,6 +736,10 @@ class FilterByTestOption:
 
         return False
 
+    def may_match(self, file_name, class_name=None):
+        """if some test of the class (or any class) may match - return true"""
+        return self(file_name, class_name, None)
+
 
 class FilterByClassList:
     def __init__(self, classes_with_filenames):
@@ -924,6 +944,11 @@ if __name__ == "__main__":
     if config.api_preload:
         VPPApiJSONFiles.load_api(apidir=config.extern_apidir + [config.vpp_install_dir])
 
+    if config.vpp_pool:
+        # pooled VPPs outlive the test classes, stop them with the run
+        vpp_pool.shutdown()
+        atexit.register(vpp_pool.shutdown)
+
     if config.sanity:
         print("Running sanity test case.")
         try:
@@ -937,6 +962,8 @@ if __name__ == "__main__":
 
     test_finished_join_timeout = 15
 
+    suite_history = SuiteHistory(config.suite_history or None)
+
     debug_gdb = config.debug in ["gdb", "gdbserver", "attach"]
     debug_core = config.debug == "core"
 
@@ -988,9 +1015,14 @@ if __name__ == "__main__":
     filter_cb = FilterByTestOption(filters)
 
     cb = SplitToSuitesCallback(filter_cb)
+    index = DiscoveryIndex(config.discovery_index or None)
+    # test classes may be imported from any of the directories
+    for d in config.test_src_dir:
+        index.scan_tree(d)
     for d in config.test_src_dir:
         print("Adding tests from directory tree %s" % d)
-        discover_tests(d, cb)
+        discover_tests(d, cb, filter_cb, index)
+    index.save()
 
     # suites are not hashable, need to use list
     suites = []
@@ -1014,10 +1046,15 @@ if __name__ == "__main__":
                 t.__class__.skipped_due_to_cpu_lack = True
         suites.append(testcase_suite)
 
-    print(
-        "%s out of %s tests match specified filters"
-        % (tests_amount, tests_amount + cb.filtered.countTestCases())
-    )
+    if index.skipped:
+        # the tests of files not loaded are not known, nor their number
+        print("%s tests match specified filters" % tests_amount)
+        print("%s test files without matching tests were not loaded" % index.skipped)
+    else:
+        print(
+            "%s out of %s tests match specified filters"
+            % (tests_amount, tests_amount + cb.filtered.countTestCases())
+        )
 
     if not config.extended:
         print("Not running extended tests (some tests will be skipped)")
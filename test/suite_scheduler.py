@@ -0,0 +1,210 @@
+"""schedule test suites using their run times from previous runs"""
+
+import json
+import os
+
+# weight of the latest run in the remembered run time of a suite
+HISTORY_WEIGHT = 0.5
+
+# assumed run time of a test when nothing is known about any suite
+DEFAULT_TEST_TIME = 1.0
+
+# CPU loads summed up may be off by rounding
+LOAD_EPSILON = 1e-6
+
+
+def suite_name(suite):
+    """Return the name a suite is remembered under: module.class"""
+    for test in suite:
+        cls = test.__class__
+        return "%s.%s" % (cls.__module__, cls.__name__)
+    return None
+
+
+def is_solo(suite):
+    """if the suite must run alone - return true"""
+    try:
+        return suite.is_tagged_run_solo
+    except AttributeError:
+        return any(test.is_tagged_run_solo() for test in suite)
+
+
+class SuiteHistory:
+    """Run time and CPU time of suites in previous runs, kept in a JSON file.
+
+    Times are kept per test, so a suite re-run with only its failed tests
+    is predicted in proportion.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.suites = {}
+        if path is None:
+            return
+        try:
+            with open(path) as f:
+                self.suites = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            print("Ignoring unreadable suite history %s" % path)
+
+    def __contains__(self, suite):
+        return suite_name(suite) in self.suites
+
+    def predict(self, suite):
+        """Return the expected run time of a suite in seconds"""
+        tests = suite.countTestCases()
+        entry = self.suites.get(suite_name(suite))
+        if entry is not None:
+            return entry["time_per_test"] * tests
+        if self.suites:
+            known = sorted(e["time_per_test"] for e in self.suites.values())
+            return known[len(known) // 2] * tests
+        return DEFAULT_TEST_TIME * tests
+
+    def cpu_load(self, suite):
+        """Return the number of CPUs a suite kept busy, None if not known"""
+        entry = self.suites.get(suite_name(suite))
+        if entry is None or not entry["time_per_test"] or "cpu_per_test" not in entry:
+            return None
+        return entry["cpu_per_test"] / entry["time_per_test"]
+
+    def record(self, suite, duration, cpu_time, cpus):
+        """Remember a run of a suite"""
+        tests = suite.countTestCases()
+        if not tests:
+            return
+        name = suite_name(suite)
+        entry = self.suites.get(name)
+        times = {"time_per_test": duration / tests, "cpu_per_test": cpu_time / tests}
+        if entry is None:
+            entry = self.suites[name] = dict(times, runs=0)
+        else:
+            for key, value in times.items():
+                entry[key] = HISTORY_WEIGHT * value + (1 - HISTORY_WEIGHT) * entry.get(
+                    key, value
+                )
+        entry["cpus"] = cpus
+        entry["runs"] += 1
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = "%s.%d" % (self.path, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.suites, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("Cannot save suite history %s: %s" % (self.path, e))
+
+
+class SuiteScheduler:
+    """Decide which suite to start next.
+
+    Solo suites go first, one at a time, while nothing else runs; the
+    others longest predicted run time first. A suite needs free CPUs to
+    pin VPP to, and its CPU load - the CPU time per second it used in
+    previous runs - must fit in what the running suites leave of all
+    CPUs. When the longest waiting suite doesn't fit, shorter suites may
+    start only if they are predicted to finish before it could start, or
+    leave enough for it then.
+    """
+
+    def __init__(self, suites, history, cpus, max_concurrent, max_vpp_cpus):
+        self.history = history
+        self.cpus = cpus
+        self.max_concurrent = max_concurrent
+        self.max_vpp_cpus = max_vpp_cpus
+        self.predicted = {id(s): history.predict(s) for s in suites}
+        self.loads = {id(s): self._load(s) for s in suites}
+        self.pending = sorted(
+            suites, key=lambda s: (not is_solo(s), -self.predicted[id(s)])
+        )
+
+    def predict(self, suite):
+        return self.predicted[id(suite)]
+
+    def load(self, suite):
+        return self.loads[id(suite)]
+
+    def _load(self, suite):
+        load = self.history.cpu_load(suite)
+        if load is None:
+            # assume an unknown suite keeps the CPUs it pins VPP to busy
+            load = max(self.cpus_needed(suite), 1)
+        # a suite loading more than all CPUs runs when nothing else does
+        return min(load, self.cpus)
+
+    def cpus_needed(self, suite):
+        # suites needing more than there is run with their tests skipped
+        return suite.cpus_used if suite.cpus_used <= self.max_vpp_cpus else 0
+
+    def pick(self, now, running, free_cpus):
+        """Return the suite to start now, if any, removing it from pending.
+
+        :param now: current time
+        :param running: (predicted end, cpus, load, solo) of the running
+                        suites
+        :param free_cpus: number of free CPUs
+        """
+        if not self.pending or len(running) >= self.max_concurrent:
+            return None
+        if any(solo for _, _, _, solo in running):
+            return None
+        head = self.pending[0]
+        if is_solo(head):
+            return self.pending.pop(0) if not running else None
+        free_load = self.cpus - sum(load for _, _, load, _ in running)
+        need, need_load = self.cpus_needed(head), self.load(head)
+        if need <= free_cpus and need_load <= free_load + LOAD_EPSILON:
+            return self.pending.pop(0)
+        # when will the head fit, and how much is spare then
+        shadow, spare, spare_load = float("inf"), 0, 0
+        available, available_load = free_cpus, free_load
+        for end, cpus, load, _ in sorted(running):
+            available += cpus
+            available_load += load
+            if available >= need and available_load >= need_load - LOAD_EPSILON:
+                shadow = end
+                spare, spare_load = available - need, available_load - need_load
+                break
+        for i, suite in enumerate(self.pending[1:], 1):
+            cpus, load = self.cpus_needed(suite), self.load(suite)
+            if cpus > free_cpus or load > free_load + LOAD_EPSILON:
+                continue
+            if now + self.predict(suite) <= shadow or (
+                cpus <= spare and load <= spare_load + LOAD_EPSILON
+            ):
+                return self.pending.pop(i)
+        return None
+
+    def simulate(self):
+        """Return the predicted makespan of running the pending suites"""
+        pending = list(self.pending)
+        now, free, running = 0.0, self.cpus, []
+        try:
+            while self.pending or running:
+                while True:
+                    suite = self.pick(now, running, free)
+                    if suite is None:
+                        break
+                    cpus = self.cpus_needed(suite)
+                    free -= cpus
+                    running.append(
+                        (
+                            now + self.predict(suite),
+                            cpus,
+                            self.load(suite),
+                            is_solo(suite),
+                        )
+                    )
+                if not running:
+                    break
+                running.sort()
+                now, cpus, _, _ = running.pop(0)
+                free += cpus
+        finally:
+            self.pending = pending
+        return now
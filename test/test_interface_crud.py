@@ -24,6 +24,8 @@ from config import config
 class TestLoopbackInterfaceCRUD(VppTestCase):
     """CRUD Loopback"""
 
+    use_vpp_pool = True
+
     @classmethod
     def setUpClass(cls):
         super(TestLoopbackInterfaceCRUD, cls).setUpClass()
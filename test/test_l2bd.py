@@ -16,6 +16,8 @@ from vpp_sub_interface import VppDot1QSubint, VppDot1ADSubint
 class TestL2bd(VppTestCase):
     """L2BD Test Case"""
 
+    use_vpp_pool = True
+
     @classmethod
     def setUpClass(cls):
         """
@@ -77,6 +77,8 @@ from util import Host, ppp
 class TestL2bdMultiInst(VppTestCase):
     """L2BD Multi-instance Test Case"""
 
+    use_vpp_pool = True
+
     @classmethod
     def setUpClass(cls):
         """
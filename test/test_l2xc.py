@@ -15,6 +15,8 @@ from util import Host, ppp
 class TestL2xc(VppTestCase):
     """L2XC Test Case"""
 
+    use_vpp_pool = True
+
     @classmethod
     def setUpClass(cls):
         """
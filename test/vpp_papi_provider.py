@@ -353,11 +353,12 @@ class VppPapiProvider(object):
     def connect(self):
         """Connect the API to VPP"""
         # This might be called before VPP is prepared to listen to the socket
-        retries = 0
+        deadline = time.time() + 60
+        delay = 0.001
         while not os.path.exists(self.test_class.get_api_sock_path()):
-            time.sleep(0.5)
-            retries += 1
-            if retries > 120:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            if time.time() > deadline:
                 break
         self.vpp.connect(self.name[:63])
         self.papi = self.vpp.api
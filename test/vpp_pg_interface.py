@@ -8,8 +8,10 @@ from traceback import format_exc, format_stack
 from sh import tshark
 from pathlib import Path
 
+from capture_watcher import get_capture_watcher
 from config import config
-from scapy.utils import wrpcap, rdpcap, PcapReader
+from pcap_index import PcapIndex
+from scapy.utils import wrpcap, PcapReader
 from scapy.plist import PacketList
 from vpp_interface import VppInterface
 from vpp_papi import VppEnum
@@ -47,6 +49,24 @@ def is_ipv6_misc(p):
     return False
 
 
+def may_be_ipv6_misc(data):
+    """Can raw packet bytes be one is_ipv6_misc() is true for?
+
+    A router advertisement starts with ICMPv6 type 134, code 0 and goes
+    to a multicast address, starting with 0xff. A router alert option is
+    type 5, length 2. Packets with neither byte sequence are not, and
+    the 0x86dd ethertype of IPv6 packets matches neither.
+    """
+    if b"\x05\x02" in data:
+        return True
+    return b"\x86\x00" in data and b"\xff" in data
+
+
+# cheap tests on raw bytes for capture filters, to skip dissecting
+# packets the filter can't be true for
+RAW_FILTERS = {is_ipv6_misc: may_be_ipv6_misc}
+
+
 class VppPGInterface(VppInterface):
     """
     VPP packet-generator interface
@@ -87,6 +107,11 @@ class VppPGInterface(VppInterface):
             return "%s/pg%u_wrk%u_in.pcap" % (self.test.tempdir, self.pg_index, worker)
         return "%s/pg%u_in.pcap" % (self.test.tempdir, self.pg_index)
 
+    @property
+    def capture_watcher(self):
+        """Watcher of the directory the capture files are written to"""
+        return get_capture_watcher(self.test.tempdir)
+
     @property
     def capture_cli(self):
         """CLI string to start capture on this interface"""
@@ -146,6 +171,8 @@ class VppPGInterface(VppInterface):
             self.out_path,
         )
         self._cap_name = "pcap%u-sw_if_index-%s" % (self.pg_index, self.sw_if_index)
+        self._pcap_reader = None
+        self._capture_index = None
 
     def remove_vpp_config(self):
         """delete Pg interface"""
@@ -208,9 +235,20 @@ class VppPGInterface(VppInterface):
         # disable the capture to flush the capture
         self.disable_capture()
         self.remove_old_pcap_file(self.out_path)
+        self.reset_capture_reader()
+        # watch for the capture file from before it can appear
+        self.capture_watcher
         # FIXME this should be an API, but no such exists atm
         self.test.vapi.cli(self.capture_cli)
         self._pcap_reader = None
+        # the pg may now be enabled other than by pg_start()
+        self.test._pg_stopped = False
+
+    def reset_capture_reader(self):
+        """Forget the packets read from a previous capture file"""
+        if self._capture_index is not None:
+            self._capture_index.close()
+        self._capture_index = None
 
     def disable_capture(self):
         self.test.vapi.cli("%s disable" % self.capture_cli)
@@ -239,6 +277,7 @@ class VppPGInterface(VppInterface):
         self.test.register_pcap(self, worker)
         # FIXME this should be an API, but no such exists atm
         self.test.vapi.cli(self.get_input_cli(nb_replays, worker))
+        self.test._pg_stopped = False
         self.link_pcap_file(self.get_in_path(worker), "inp", self.in_history_counter)
 
     def generate_debug_aid(self, kind):
@@ -256,21 +295,46 @@ class VppPGInterface(VppInterface):
             f.writelines(format_stack())
         self._out_assert_counter += 1
 
+    def _read_capture(self):
+        """Index the packets added to the capture file since the last read.
+
+        The file is read from where the previous read stopped, up to the
+        last complete packet, unless it was replaced or truncated.
+        Packets are dissected only when accessed.
+
+        :returns: LazyPackets of all packets in the capture file
+        """
+        st = os.stat(self.out_path)
+        index = self._capture_index
+        if index is not None:
+            if index.inode != st.st_ino or st.st_size < index.offset:
+                self.reset_capture_reader()
+                index = None
+        if index is None:
+            index = PcapIndex(self.out_path)
+            self._capture_index = index
+        index.update()
+        return index.packets()
+
     def _get_capture(self, timeout, filter_out_fn=is_ipv6_misc):
         """Helper method to get capture and filter it"""
         try:
             if not self.wait_for_capture_file(timeout):
                 return None
-            output = rdpcap(self.out_path)
-            self.test.logger.debug(f"Capture has {len(output.res)} packets")
+            packets = self._read_capture()
+            self.test.logger.debug(f"Capture has {len(packets)} packets")
         except:
             self.test.logger.debug(
-                "Exception in scapy.rdpcap (%s): %s" % (self.out_path, format_exc())
+                "Exception reading capture (%s): %s" % (self.out_path, format_exc())
             )
+            self.reset_capture_reader()
             return None
+        output = PacketList(packets, name=os.path.basename(self.out_path))
         before = len(output.res)
         if filter_out_fn:
-            output.res = [p for p in output.res if not filter_out_fn(p)]
+            output.res = packets.filter_out(
+                filter_out_fn, RAW_FILTERS.get(filter_out_fn)
+            )
         removed = before - len(output.res)
         if removed:
             self.test.logger.debug(
@@ -296,6 +360,7 @@ class VppPGInterface(VppInterface):
         remaining_time = timeout
         capture = None
         name = self.name if remark is None else "%s (%s)" % (self.name, remark)
+        partial = None
         based_on = "based on provided argument"
         if expected_count is None:
             expected_count = self.test.get_packet_count_for_if_idx(self.sw_if_index)
@@ -325,11 +390,18 @@ class VppPGInterface(VppInterface):
                     )
                     break
                 else:
-                    self.test.logger.debug(
-                        "Partial capture containing %s "
-                        "packets doesn't match expected "
-                        "count %s (yet?)" % (len(capture.res), expected_count)
+                    if len(capture.res) != partial:
+                        partial = len(capture.res)
+                        self.test.logger.debug(
+                            "Partial capture containing %s "
+                            "packets doesn't match expected "
+                            "count %s (yet?)" % (partial, expected_count)
+                        )
+                    # sleep until VPP writes more of the capture
+                    self.capture_watcher.wait(
+                        remaining_time - elapsed_time, os.path.basename(self.out_path)
                     )
+                    elapsed_time = time.time() - before
             elif expected_count == 0:
                 # bingo, got None as we expected - return empty capture
                 return PacketList()
@@ -372,6 +444,11 @@ class VppPGInterface(VppInterface):
         # pcap0-sw_if_inde     Yes           64       limit 64, ...
         #
         # also have a 5-minute timeout just in case things go terribly wrong...
+        #
+        # pg_start() waits for the streams it enables to finish, so there is
+        # nothing to wait for until a capture is enabled or a stream added
+        if getattr(self.test, "_pg_stopped", False):
+            return
         deadline = time.time() + 300
         while self.test.vapi.cli("show packet-generator").find("Yes") != -1:
             self._test.sleep(0.01)  # yield
@@ -398,10 +475,11 @@ class VppPGInterface(VppInterface):
             self.test.logger.debug("Capture file %s already exists" % self.out_path)
             self.link_pcap_file(self.out_path, "out", self.out_history_counter)
             return True
+        watcher = self.capture_watcher
         while time.time() < deadline:
             if os.path.isfile(self.out_path):
                 break
-            self._test.sleep(0)  # yield
+            watcher.wait(deadline - time.time(), os.path.basename(self.out_path))
         if os.path.isfile(self.out_path):
             self.test.logger.debug(
                 "Capture file appeared after %fs" % (time.time() - (deadline - timeout))
@@ -419,23 +497,23 @@ class VppPGInterface(VppInterface):
 
         :returns: True if enough data present, else False
         """
-        orig_pos = self._pcap_reader.f.tell()  # save file position
+        return self._enough_packet_data(self._pcap_reader)
+
+    @staticmethod
+    def _enough_packet_data(reader):
+        """Check if a whole packet can be read by a pcap reader"""
+        orig_pos = reader.f.tell()  # save file position
         enough_data = False
         # read packet header from pcap
         packet_header_size = 16
-        caplen = None
-        end_pos = None
-        hdr = self._pcap_reader.f.read(packet_header_size)
+        hdr = reader.f.read(packet_header_size)
         if len(hdr) == packet_header_size:
             # parse the capture length - caplen
-            sec, usec, caplen, wirelen = struct.unpack(
-                self._pcap_reader.endian + "IIII", hdr
-            )
-            self._pcap_reader.f.seek(0, 2)  # seek to end of file
-            end_pos = self._pcap_reader.f.tell()  # get position at end
+            sec, usec, caplen, wirelen = struct.unpack(reader.endian + "IIII", hdr)
+            end_pos = os.fstat(reader.f.fileno()).st_size
             if end_pos >= orig_pos + len(hdr) + caplen:
                 enough_data = True  # yay, we have enough data
-        self._pcap_reader.f.seek(orig_pos, 0)  # restore original position
+        reader.f.seek(orig_pos, 0)  # restore original position
         return enough_data
 
     def wait_for_packet(self, timeout, filter_out_fn=is_ipv6_misc):
@@ -473,9 +551,13 @@ class VppPGInterface(VppInterface):
         else:
             poll = True
             self.test.logger.debug("Polling for packet")
+        watcher = self.capture_watcher
         while time.time() < deadline or poll:
             if not self.verify_enough_packet_data_in_pcap():
-                self._test.sleep(0)  # yield
+                if not poll:
+                    watcher.wait(
+                        deadline - time.time(), os.path.basename(self.out_path)
+                    )
                 poll = False
                 continue
             p = self._pcap_reader.recv()
@@ -0,0 +1,432 @@
+"""keep VPP running between test classes
+
+With --vpp-pool, a test class setting use_vpp_pool does not start a VPP
+of its own but takes over an idle one from the pool, started earlier with the same command
+line by another class. Test classes run in separate processes, so the
+pool lives in the filesystem: each pooled VPP has a directory under
+<tmp-dir>/vpp-pool holding its sockets, output and a lock file. Whoever
+holds the lock uses that VPP; an unlocked VPP is idle if its directory
+is marked ready.
+
+When a class is done with a pooled VPP, the configuration it left behind
+is removed and the state of VPP compared with the one it had right
+after start. Only a VPP found back in that state is marked ready for the
+next class, any other is terminated.
+"""
+
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+from config import config
+
+# placeholders for the parts of a command line which differ between classes
+TEMPDIR = "{tempdir}"
+PREFIX = "{prefix}"
+
+# seconds the wrapper shell may take to record the exit status of VPP
+STATUS_DELAY = 1.0
+
+# interfaces created by the test framework, by name prefix, and how to
+# delete them
+DELETE_INTERFACE = (
+    ("pg", "pg_delete_interface"),
+    ("loop", "delete_loopback"),
+    ("bvi", "bvi_delete"),
+)
+
+
+def pool_dir():
+    return os.path.join(config.tmp_dir, "vpp-pool")
+
+
+def pool_key(cmdline, tempdir, prefix):
+    """Return the command line with the parts specific to a class replaced.
+
+    Classes whose VPP command lines have the same key can share a VPP.
+    CPUs are replaced by their number, the pooled VPP is re-pinned to the
+    CPUs assigned to the class taking it over.
+    """
+    key = []
+    cpus = False
+    for arg in cmdline:
+        if cpus:
+            arg = "{cpus:%d}" % len(arg.split(","))
+            cpus = False
+        elif arg in ("main-core", "corelist-workers"):
+            cpus = True
+        elif arg == prefix:
+            arg = PREFIX
+        else:
+            arg = arg.replace(tempdir, TEMPDIR)
+        key.append(arg)
+    return key
+
+
+def key_hash(key):
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()[:12]
+
+
+def fingerprint(vapi):
+    """Return the parts of VPP state a reset is verified against"""
+    tables = sorted([t.table.table_id, t.table.is_ip6] for t in vapi.ip_table_dump())
+    routes = {}
+    for table_id, is_ip6 in tables:
+        routes["%d/%d" % (table_id, is_ip6)] = sorted(
+            str(r.route.prefix) for r in vapi.ip_route_dump(table_id, is_ip6)
+        )
+    state = {
+        "interfaces": sorted(
+            [i.sw_if_index, i.interface_name] for i in vapi.sw_interface_dump()
+        ),
+        "tables": tables,
+        "routes": routes,
+        "bridge_domains": sorted(b.bd_id for b in vapi.bridge_domain_dump()),
+        "l2fib": vapi.cli("show l2fib"),
+        "packet_generator": vapi.cli("show packet-generator"),
+    }
+    # compare as stored
+    return json.loads(json.dumps(state))
+
+
+def _read(path):
+    """Return the content of a file, None if it is missing or empty"""
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _is_alive(pid):
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            # a zombie is not alive
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (FileNotFoundError, IndexError):
+        return False
+
+
+class PooledVpp:
+    """A VPP of the pool, checked out by one test class.
+
+    Stands in for the subprocess.Popen of a VPP started by the class.
+    The output of VPP goes to files in the pool directory, output() returns
+    what was written since the checkout.
+    """
+
+    stdout = None
+    stderr = None
+
+    def __init__(self, path, lock, wrapper=None):
+        self.path = path
+        self.lock = lock
+        self.wrapper = wrapper
+        self.pid = int(_read(self.file("pid")))
+        self.returncode = None
+        # when VPP was first found gone without an exit status
+        self.gone_since = None
+        baseline = _read(self.file("baseline.json"))
+        self.baseline = json.loads(baseline) if baseline else None
+        self.output_offsets = [self._size(name) for name in ("stdout", "stderr")]
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def _size(self, name):
+        try:
+            return os.path.getsize(self.file(name))
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def api_segment_prefix(self):
+        return os.path.basename(self.path)
+
+    def get_stats_sock_path(self):
+        return self.file("stats.sock")
+
+    def get_api_sock_path(self):
+        return self.file("api.sock")
+
+    def get_memif_sock_path(self):
+        return self.file("memif.sock")
+
+    def poll(self):
+        if self.returncode is None:
+            if self.wrapper is not None:
+                self.wrapper.poll()
+            status = _read(self.file("status"))
+            if status is None and not _is_alive(self.pid):
+                # the wrapper records the status once it has reaped VPP
+                if self.wrapper is not None and self.wrapper.returncode is not None:
+                    status = _read(self.file("status")) or "1"
+                elif self.gone_since is None:
+                    self.gone_since = time.time()
+                elif time.time() - self.gone_since > STATUS_DELAY:
+                    status = _read(self.file("status")) or "1"
+            if status is not None:
+                # like Popen, a VPP killed by a signal returns -signal
+                rc = int(status)
+                self.returncode = 128 - rc if rc > 128 else rc
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        delay = 0.001
+        while self.poll() is None:
+            if deadline is not None and time.time() > deadline:
+                raise subprocess.TimeoutExpired("vpp", timeout)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return self.returncode
+
+    def communicate(self, timeout=None):
+        self.wait(timeout)
+        return None, None
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def output(self):
+        """Return VPP output to stdout and stderr since the checkout"""
+        result = []
+        for name, offset in zip(("stdout", "stderr"), self.output_offsets):
+            with open(self.file(name), "rb") as f:
+                f.seek(offset)
+                result.append(f.read().decode("ascii", errors="backslashreplace"))
+        return result
+
+    def pin(self, cpus):
+        """Move the threads of VPP to the CPUs of the class using it"""
+        if not cpus:
+            return
+        for task in glob.glob("/proc/%d/task/*" % self.pid):
+            comm = _read(os.path.join(task, "comm")) or ""
+            cpu = {cpus[0]}
+            if comm.startswith("vpp_wk_") and len(cpus) > 1:
+                worker = comm[len("vpp_wk_") :]
+                if worker.isdigit():
+                    cpu = {cpus[1 + int(worker) % (len(cpus) - 1)]}
+            try:
+                os.sched_setaffinity(int(os.path.basename(task)), cpu)
+            except (OSError, ValueError):
+                pass
+
+    def record_baseline(self, vapi):
+        """Remember the state of a freshly started VPP"""
+        if self.baseline is None:
+            self.baseline = fingerprint(vapi)
+            with open(self.file("baseline.json"), "w") as f:
+                json.dump(self.baseline, f)
+
+    def reset(self, vapi, logger):
+        """Remove configuration left by a test class and verify the result.
+
+        :returns: True if VPP is back in its state after start
+        """
+        if self.baseline is None or self.poll() is not None:
+            return False
+        baseline = self.baseline
+        try:
+            known = {index for index, _ in baseline["interfaces"]}
+            # delete newest first, so indexes are handed out again in order
+            for i in sorted(
+                vapi.sw_interface_dump(), key=lambda i: i.sw_if_index, reverse=True
+            ):
+                if i.sw_if_index in known:
+                    continue
+                if i.sw_if_index != i.sup_sw_if_index:
+                    vapi.delete_subif(sw_if_index=i.sw_if_index)
+                    continue
+                for prefix, fn in DELETE_INTERFACE:
+                    if i.interface_name.startswith(prefix):
+                        getattr(vapi, fn)(sw_if_index=i.sw_if_index)
+                        break
+            for b in vapi.bridge_domain_dump():
+                if b.bd_id not in baseline["bridge_domains"]:
+                    vapi.bridge_domain_add_del_v2(bd_id=b.bd_id, is_add=False)
+            for t in vapi.ip_table_dump():
+                if [t.table.table_id, t.table.is_ip6] not in baseline["tables"]:
+                    vapi.ip_table_add_del(
+                        is_add=False,
+                        table={"table_id": t.table.table_id, "is_ip6": t.table.is_ip6},
+                    )
+            for cli in (
+                "clear trace",
+                "clear errors",
+                "clear interfaces",
+                "clear runtime",
+            ):
+                vapi.cli(cli)
+            state = fingerprint(vapi)
+        except Exception as e:
+            logger.info("Resetting pooled VPP failed: %s" % e)
+            return False
+        for name in baseline:
+            if state[name] != baseline[name]:
+                logger.info(
+                    "Pooled VPP state differs after reset in %s: %s != %s"
+                    % (name, state[name], baseline[name])
+                )
+                return False
+        return True
+
+    def release(self):
+        """Put a VPP which passed reset() back into the pool"""
+        open(self.file("ready"), "w").close()
+        self.lock.close()
+
+    def retire(self, tempdir=None):
+        """Stop VPP, keep its core file in tempdir, remove it from the pool"""
+        self.terminate()
+        try:
+            self.wait(5)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            self.wait()
+        if tempdir is not None and os.path.exists(self.file("core")):
+            shutil.move(self.file("core"), os.path.join(tempdir, "core"))
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.lock.close()
+
+
+def _lock(path):
+    """Return the open lock file of a pool directory, if it was free"""
+    try:
+        lock = open(os.path.join(path, "lock"), "a")
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    if not os.path.isdir(path):
+        # removed while we were locking
+        lock.close()
+        return None
+    return lock
+
+
+def _spawn(cmdline, path, logger):
+    os.chmod(path, 0o755)
+    # pid and status are moved into place, so they are never seen half written
+    script = (
+        "%s & echo $! > pid.new; mv pid.new pid; wait $!; "
+        "echo $? > status.new; mv status.new status" % shlex.join(cmdline)
+    )
+    logger.debug("Starting pooled VPP in %s" % path)
+    with open(os.path.join(path, "stdout"), "wb") as stdout, open(
+        os.path.join(path, "stderr"), "wb"
+    ) as stderr:
+        wrapper = subprocess.Popen(
+            ["/bin/sh", "-c", script],
+            cwd=path,
+            stdin=subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr,
+            start_new_session=True,
+        )
+    delay = 0.001
+    while _read(os.path.join(path, "pid")) is None:
+        if wrapper.poll() is not None and _read(os.path.join(path, "pid")) is None:
+            raise Exception("Failed to start pooled VPP in %s" % path)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+    return wrapper
+
+
+def checkout(cmdline, tempdir, prefix, cpus, logger):
+    """Return an idle pooled VPP started with cmdline, or start one.
+
+    :param cmdline: VPP command line of the class
+    :param tempdir: the class temporary directory used in cmdline
+    :param prefix: the api segment prefix used in cmdline
+    :param cpus: CPUs assigned to the class
+    """
+    key = pool_key(cmdline, tempdir, prefix)
+    name = key_hash(key)
+    root = pool_dir()
+    os.makedirs(root, exist_ok=True)
+    for path in sorted(glob.glob(os.path.join(root, name + "-*"))):
+        lock = _lock(path)
+        if lock is None:
+            continue
+        vpp = PooledVpp(path, lock) if _read(os.path.join(path, "pid")) else None
+        if vpp is None or not os.path.exists(vpp.file("ready")):
+            # left behind by a class which did not finish
+            if vpp is not None:
+                vpp.retire()
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+                lock.close()
+            continue
+        os.unlink(vpp.file("ready"))
+        if vpp.poll() is not None:
+            vpp.retire()
+            continue
+        vpp.pin(cpus)
+        logger.debug("Using pooled VPP in %s (pid %d)" % (path, vpp.pid))
+        return vpp
+
+    # prepare the directory under a name no one looks for, so it is
+    # locked by the time others see it
+    new = tempfile.mkdtemp(prefix=".new-", dir=root)
+    lock = _lock(new)
+    with open(os.path.join(new, "key.json"), "w") as f:
+        json.dump(key, f)
+    n = 0
+    while True:
+        path = os.path.join(root, "%s-%d" % (name, n))
+        try:
+            os.rename(new, path)
+            break
+        except OSError:
+            n += 1
+    instance_prefix = os.path.basename(path)
+    instance_cmdline = [
+        instance_prefix if arg == prefix else arg.replace(tempdir, path)
+        for arg in cmdline
+    ]
+    wrapper = _spawn(instance_cmdline, path, logger)
+    return PooledVpp(path, lock, wrapper)
+
+
+def shutdown():
+    """Stop all pooled VPPs, when the test run is over"""
+    root = pool_dir()
+    for pid_file in glob.glob(os.path.join(root, "*", "pid")):
+        try:
+            os.kill(int(_read(pid_file)), signal.SIGTERM)
+        except (ProcessLookupError, ValueError, TypeError):
+            pass
+    deadline = time.time() + 5
+    for pid_file in glob.glob(os.path.join(root, "*", "pid")):
+        pid = int(_read(pid_file) or 0)
+        while pid and _is_alive(pid) and time.time() < deadline:
+            time.sleep(0.01)
+        if pid and _is_alive(pid):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+    shutil.rmtree(root, ignore_errors=True)